@@ -0,0 +1,86 @@
+"""
+Benchmark of the extra_prec encodings in GainanovSAT:
+closing every clause by expand/reduce (default)
+vs. point order implications in the model (use_implications).
+
+Points are the subsets of range(m) of weight <= k (subset order),
+a vector is lower iff the union of its points has weight <= t.
+
+    python benchmarks/bench_implications.py -m 7 -k 3 -t 4
+"""
+import time
+import argparse
+from itertools import combinations
+
+from monolearn import LowerSetLearn, OracleFunction, ExtraPrec_LowerSet
+from monolearn import GainanovSAT
+from monolearn.utils import TimeStat
+
+
+def make_prec(m, k):
+    pts = [
+        tuple(int(i in sub) for i in range(m))
+        for w in range(k + 1) for sub in combinations(range(m), w)
+    ]
+    point2int = {pt: i for i, pt in enumerate(pts)}
+    return len(pts), ExtraPrec_LowerSet(pts, point2int)
+
+
+def run(n, prec, t, use_implications, solver):
+    def func(vec):
+        union = set().union(*(prec.int2point[i] for i in vec))
+        return len(union) <= t
+
+    TimeStat.reset_all()
+    counts = {"expand": 0, "reduce": 0}
+    expand, reduce = prec.expand, prec.reduce
+
+    def count(name, func):
+        def wrapped(vec):
+            counts[name] += 1
+            return func(vec)
+        return wrapped
+
+    prec.expand = count("expand", expand)
+    prec.reduce = count("reduce", reduce)
+    try:
+        system = LowerSetLearn(n=n, extra_prec=prec)
+        oracle = OracleFunction(func)
+        g = GainanovSAT(solver=solver)
+        g.use_implications = use_implications
+        g.init(system=system, oracle=oracle)
+        t0 = time.time()
+        g.learn()
+        elapsed = time.time() - t0
+    finally:
+        del prec.expand, prec.reduce
+
+    assert system.is_complete
+    print(
+        f"implications={use_implications!s:5}: {elapsed:8.3f}s, "
+        f"queries {oracle.n_queries}, "
+        f"lower {system.n_lower()} upper {system.n_upper()}, "
+        f"expand {counts['expand']} reduce {counts['reduce']}"
+    )
+    sat_stat = TimeStat.Stat["GainanovSAT.find_new_unknown"]
+    print(f"  find_new_unknown {sat_stat}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-m", type=int, default=7)
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("-t", type=int, default=4)
+    parser.add_argument("--solver", default="pysat/cadical153")
+    args = parser.parse_args()
+
+    n, prec = make_prec(args.m, args.k)
+    print(f"{n} points (m={args.m}, k={args.k}), threshold {args.t}")
+    base = run(n, prec, args.t, False, args.solver)
+    impl = run(n, prec, args.t, True, args.solver)
+    print(f"speedup: {base / impl:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
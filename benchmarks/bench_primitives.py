@@ -0,0 +1,312 @@
+"""
+Micro-benchmarks of the low-level primitives:
+SparseSet construction (validated / unchecked), | - <=,
+neibs_up / neibs_down, ExtraPrec_LowerSet.expand / reduce,
+dictify / undictify, the bz2 save / load round-trip of LowerSetLearn
+the SAT model initialization from a system (with / without the
+clause cache) and the Oracle inference lookups (vs. a cheap oracle).
+
+Each case is timed `--repeat` times (time per operation);
+results can be stored as a baseline and later runs checked against it:
+a case regresses when it is slower by more than --min-slowdown
+and the difference is significant (one-sided permutation test
+of the samples, p < --alpha).
+
+    python benchmarks/bench_primitives.py --save baseline.json
+    python benchmarks/bench_primitives.py --check baseline.json
+    python benchmarks/bench_primitives.py --size full -k save
+"""
+import os
+import gc
+import atexit
+import sys
+import json
+import shutil
+import time
+import random
+import argparse
+import tempfile
+from statistics import mean, median
+
+from monolearn import LowerSetLearn
+from monolearn.SparseSet import SparseSet
+from monolearn.utils import dictify, undictify
+
+from bench_implications import make_prec
+
+
+# (n, antichain size)
+SIZES = {
+    "small": ((16, 10**3), (64, 10**4), (512, 10**4)),
+    "full": ((16, 10**3), (64, 10**5), (128, 10**6), (512, 10**6)),
+}
+# point sets for ExtraPrec: n -> (m, k), subsets of range(m) of weight <= k
+PREC_SHAPES = {16: (5, 2), 64: (7, 3), 128: (8, 3), 512: (11, 4)}
+
+CASES = {}
+
+
+def case(name, cap=None):
+    """Register a benchmark: func(n, size) -> (run, number of ops)."""
+    def deco(func):
+        CASES[name] = func, cap
+        return func
+    return deco
+
+
+def random_vecs(n, size, rng):
+    top = min(n, 32)
+    return [
+        SparseSet._unchecked(sorted(rng.sample(range(n), rng.randrange(top))))
+        for _ in range(size)
+    ]
+
+
+@case("sparseset_new")
+def bench_new(n, size, rng):
+    lists = [list(vec) for vec in random_vecs(n, size, rng)]
+    for lst in lists:
+        rng.shuffle(lst)
+    return lambda: [SparseSet(lst) for lst in lists], size
+
+
+@case("sparseset_unchecked")
+def bench_unchecked(n, size, rng):
+    lists = [list(vec) for vec in random_vecs(n, size, rng)]
+    new = SparseSet._unchecked
+    return lambda: [new(lst) for lst in lists], size
+
+
+def _pairs(n, size, rng):
+    vecs = random_vecs(n, 2 * size, rng)
+    return list(zip(vecs[::2], vecs[1::2]))
+
+
+@case("sparseset_or")
+def bench_or(n, size, rng):
+    pairs = _pairs(n, size, rng)
+    return lambda: [a | b for a, b in pairs], size
+
+
+@case("sparseset_sub")
+def bench_sub(n, size, rng):
+    pairs = _pairs(n, size, rng)
+    return lambda: [a - b for a, b in pairs], size
+
+
+@case("sparseset_le")
+def bench_le(n, size, rng):
+    pairs = _pairs(n, size, rng)
+    # half of the pairs are comparable
+    pairs = [(a & b if i % 2 else a, b) for i, (a, b) in enumerate(pairs)]
+    return lambda: [a <= b for a, b in pairs], size
+
+
+@case("neibs_up", cap=10**4)
+def bench_neibs_up(n, size, rng):
+    vecs = random_vecs(n, size, rng)
+    return lambda: [list(vec.neibs_up(n)) for vec in vecs], size
+
+
+@case("neibs_down", cap=10**5)
+def bench_neibs_down(n, size, rng):
+    vecs = random_vecs(n, size, rng)
+    return lambda: [list(vec.neibs_down()) for vec in vecs], size
+
+
+def _prec_vecs(n, size, rng):
+    npts, prec = make_prec(*PREC_SHAPES[n])
+    vecs = [
+        SparseSet(rng.sample(range(npts), rng.randrange(1, 6)))
+        for _ in range(size)
+    ]
+    return prec, vecs
+
+
+@case("prec_expand", cap=10**3)
+def bench_expand(n, size, rng):
+    prec, vecs = _prec_vecs(n, size, rng)
+    return lambda: [prec.expand(vec) for vec in vecs], size
+
+
+@case("prec_reduce", cap=10**4)
+def bench_reduce(n, size, rng):
+    prec, vecs = _prec_vecs(n, size, rng)
+    return lambda: [prec.reduce(vec) for vec in vecs], size
+
+
+@case("dictify")
+def bench_dictify(n, size, rng):
+    data = set(random_vecs(n, size, rng))
+    return lambda: undictify(dictify(data)), size
+
+
+@case("save_load")
+def bench_save_load(n, size, rng):
+    system = LowerSetLearn(n=n)
+    for vec in random_vecs(n, size, rng):
+        system.add_lower(vec)
+    fd, filename = tempfile.mkstemp(suffix=".bz2")
+    os.close(fd)
+    atexit.register(os.remove, filename)
+
+    def run():
+        system.save_to_file(filename)
+        LowerSetLearn(n=n).load_from_file(filename)
+    return run, size
+
+
+def _inference_oracle(n, size, rng):
+    from monolearn import OracleFunction
+
+    tops = [set(vec) for vec in random_vecs(n, 10, rng)]
+    oracle = OracleFunction(lambda vec: any(set(vec) <= t for t in tops))
+    oracle.enable_inference(limit=size)
+    for vec in random_vecs(n, size, rng):
+        oracle(vec)
+    return oracle, random_vecs(n, size, rng)
+
+
+@case("inference_lookup", cap=10**4)
+def bench_inference_lookup(n, size, rng):
+    oracle, probes = _inference_oracle(n, size, rng)
+    return lambda: [oracle.begin(vec) for vec in probes], size
+
+
+@case("inference_query", cap=10**4)
+def bench_inference_query(n, size, rng):
+    """The (cheap) oracle of inference_lookup, for comparison."""
+    oracle, probes = _inference_oracle(n, size, rng)
+    return lambda: [oracle.evaluate(vec) for vec in probes], size
+
+def _sat_system(n, size, rng, cached):
+    from monolearn import GainanovSAT
+
+    # an antichain: distinct lower elements of the same weight
+    wt = min(n // 2, 8)
+    vecs = {SparseSet(rng.sample(range(n), wt)) for _ in range(size)}
+    tmpdir = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, tmpdir)
+    system = LowerSetLearn(n=n, file=os.path.join(tmpdir, "system.bz2"))
+    for vec in vecs:
+        system.add_lower(vec)
+    system.save()
+
+    def run():
+        g = GainanovSAT(solver="pysat/cadical153")
+        g.use_sat_cache = cached
+        g.init(system=system, oracle=None)
+        g.sat_init(init_sum=False)
+    return run, len(vecs)
+
+
+@case("sat_init", cap=10**4)
+def bench_sat_init(n, size, rng):
+    return _sat_system(n, size, rng, cached=False)
+
+
+@case("sat_init_cached", cap=10**4)
+def bench_sat_init_cached(n, size, rng):
+    return _sat_system(n, size, rng, cached=True)
+
+def measure(run, number, repeat):
+    """Seconds per operation, `repeat` samples (after a warm-up run)."""
+    run()
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - t0) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return samples
+
+
+def permutation_pvalue(base, new, rounds=10000, seed=0):
+    """
+    One-sided p-value of "new is slower than base"
+    (difference of means under random relabeling of the samples).
+    """
+    rng = random.Random(seed)
+    observed = mean(new) - mean(base)
+    pool = list(base) + list(new)
+    k = len(base)
+    hits = 0
+    for _ in range(rounds):
+        rng.shuffle(pool)
+        if mean(pool[k:]) - mean(pool[:k]) >= observed:
+            hits += 1
+    return (hits + 1) / (rounds + 1)
+
+
+def compare(base, results, alpha, min_slowdown):
+    """Print the comparison, return the regressed case keys."""
+    regressions = []
+    for key, samples in results.items():
+        if key not in base:
+            print(f"{key:36s} (no baseline)")
+            continue
+        old = base[key]
+        ratio = median(samples) / median(old)
+        pvalue = permutation_pvalue(old, samples)
+        bad = ratio > 1 + min_slowdown and pvalue < alpha
+        if bad:
+            regressions.append(key)
+        print(
+            f"{key:36s} {ratio:6.3f}x  p={pvalue:.4f}"
+            + ("  REGRESSION" if bad else "")
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--repeat", type=int, default=9)
+    parser.add_argument("-k", dest="select", default="",
+                        help="run only the cases containing this string")
+    parser.add_argument("--save", help="store the results as a baseline")
+    parser.add_argument("--check", help="compare with the baseline file")
+    parser.add_argument("--alpha", type=float, default=0.01)
+    parser.add_argument("--min-slowdown", type=float, default=0.10)
+    parser.add_argument("--seed", type=int, default=2024)
+    args = parser.parse_args()
+
+    results = {}
+    for name, (func, cap) in CASES.items():
+        for n, size in SIZES[args.size]:
+            if cap is not None:
+                size = min(size, cap)
+            key = f"{name}/n={n}/size={size}"
+            if args.select not in key or key in results:
+                continue
+            run, number = func(n, size, random.Random(args.seed))
+            samples = measure(run, number, args.repeat)
+            results[key] = samples
+            print(
+                f"{key:36s} {median(samples) * 1e6:10.3f} us/op "
+                f"(min {min(samples) * 1e6:.3f})"
+            )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(dict(python=sys.version, results=results), f, indent=1)
+        print(f"saved baseline to {args.save}")
+
+    if args.check:
+        with open(args.check) as f:
+            base = json.load(f)["results"]
+        print(f"\ncomparison with {args.check}:")
+        regressions = compare(base, results, args.alpha, args.min_slowdown)
+        if regressions:
+            print(f"{len(regressions)} regressions")
+            sys.exit(1)
+        print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import time
+
+from monolearn.SparseSet import SparseSet
+
+from .LowerSetLearn import Oracle
+from .Trace import Tracer
+
+
+class AsyncOracle(Oracle):
+    """
+    Oracle with an asynchronous _query (e.g. a request to a remote service).
+
+    The oracle owns an event loop, in which all its queries run,
+    so that connections opened by _query can be reused between calls.
+    Up to max_inflight queries are sent concurrently
+    by the learners (see LearnModule.learn_up/learn_down, LevelLearn),
+    identical concurrent queries share a single request.
+    Queries cancelled by all their waiters are cancelled
+    (counted in n_cancelled).
+    """
+    def __init__(self, max_inflight: int = 16):
+        import asyncio
+
+        super().__init__()
+        self.max_inflight = int(max_inflight)
+        assert self.max_inflight >= 1
+        self.loop = asyncio.new_event_loop()
+        self._inflight = {}
+        self.n_cancelled = 0
+
+    async def _query(self, vec: SparseSet):
+        raise NotImplementedError()
+
+    def run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def close(self):
+        self.loop.close()
+
+    def __call__(self, vec: SparseSet):
+        return self.run(self.acall(vec))
+
+    def call_many(self, vecs):
+        return self.run(self.acall_many(vecs))
+
+    async def acall(self, vec: SparseSet):
+        self.n_calls += 1
+        ret = self._lookup(vec)
+
+        tracer = Tracer.active
+        if tracer is not None and tracer.sample("query"):
+            t0 = time.perf_counter()
+            cached = ret is not None
+            if not cached:
+                ret = await self._fetch(vec)
+            tracer.emit(
+                "query",
+                weight=len(vec),
+                is_lower=bool(ret[0]),
+                latency=time.perf_counter() - t0,
+                cached=cached,
+            )
+            return ret
+
+        if ret is not None:
+            return ret
+        return await self._fetch(vec)
+
+    async def _fetch(self, vec: SparseSet):
+        import asyncio
+
+        entry = self._inflight.get(vec)
+        if entry is None:
+            self.n_queries += 1
+            task = asyncio.ensure_future(self._query(vec))
+            # [task, number of waiters]
+            entry = self._inflight[vec] = [task, 0]
+            task.add_done_callback(lambda task: self._done(vec, task))
+
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                entry[1] -= 1
+                if entry[1] == 0:
+                    task.cancel()
+            raise
+
+    def _done(self, vec, task):
+        del self._inflight[vec]
+        if task.cancelled():
+            self.n_cancelled += 1
+        elif task.exception() is None:
+            self._store(vec, task.result())
+
+    async def acall_many(self, vecs):
+        import asyncio
+
+        sem = asyncio.Semaphore(self.max_inflight)
+
+        async def call(vec):
+            async with sem:
+                return await self.acall(vec)
+
+        return await asyncio.gather(*[call(vec) for vec in vecs])
@@ -0,0 +1,141 @@
+import os
+import json
+import shutil
+import logging
+from array import array
+from tempfile import NamedTemporaryFile
+
+
+class ClauseRecords:
+    """
+    Clauses added to a model, as one flat int64 array of
+    (length, literal_1, ..., literal_length) records,
+    with a fingerprint of the system elements they encode.
+
+    The fingerprint is order independent (sum and xor of the element
+    hashes), so that elements can be added and removed in any order.
+    """
+    MASK = 2**64 - 1
+
+    def __init__(self):
+        self.lits = array("q")
+        self.n_clauses = 0
+        self.n_elements = 0
+        self._sum = 0
+        self._xor = 0
+
+    @classmethod
+    def of_system(cls, system):
+        """Empty records with the fingerprint of the stored elements."""
+        self = cls()
+        for vec in system.iter_lower():
+            self.add_element(True, vec)
+        for vec in system.iter_upper():
+            self.add_element(False, vec)
+        return self
+
+    def add_element(self, is_lower, vec):
+        h = hash((is_lower, vec)) & self.MASK
+        self._sum = (self._sum + h) & self.MASK
+        self._xor ^= h
+        self.n_elements += 1
+
+    def remove_element(self, is_lower, vec):
+        h = hash((is_lower, vec)) & self.MASK
+        self._sum = (self._sum - h) & self.MASK
+        self._xor ^= h
+        self.n_elements -= 1
+
+    def fingerprint(self):
+        return f"{self.n_elements}:{self._sum:016x}:{self._xor:016x}"
+
+    def add_clause(self, lits):
+        self.lits.append(len(lits))
+        self.lits.extend(lits)
+        self.n_clauses += 1
+
+    def clauses(self):
+        """
+        >>> records = ClauseRecords()
+        >>> records.add_clause((1, -3))
+        >>> records.add_clause(())
+        >>> list(records.clauses())
+        [[1, -3], []]
+        """
+        arr = self.lits
+        pos = 0
+        size = len(arr)
+        while pos < size:
+            end = pos + 1 + arr[pos]
+            yield arr[pos + 1:end].tolist()
+            pos = end
+
+
+class ClauseCache:
+    """
+    Snapshot of the SAT encoding of a system, stored next to the system file.
+
+    The body holds all clauses of the model as flat ClauseRecords,
+    literals are given over the model variables (+-(i+1) for x_i),
+    so that the cache does not depend on the solver variable numbering.
+    The JSON header identifies the encoding and the encoded elements
+    (their fingerprint): on a hit the clauses are added as they are,
+    with no per-element work (orbits, closures, clause construction).
+    On mismatch or a malformed body the cache is ignored.
+    """
+    VERSION = 3
+    log = logging.getLogger(f"{__name__}")
+
+    def __init__(self, filename: str, header: dict):
+        self.filename = filename
+        self.header = dict(header, version=self.VERSION)
+
+    def load(self, records: ClauseRecords):
+        """
+        Fill the (empty) records with the cached clauses if they encode
+        the elements of the records (same fingerprint), return True on a hit.
+        """
+        if not os.path.exists(self.filename):
+            return False
+
+        with open(self.filename, "rb") as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                header = None
+            if header != dict(self.header, elements=records.fingerprint()):
+                self.log.info(
+                    f"sat cache {self.filename}: header mismatch, ignoring"
+                )
+                return False
+            data = f.read()
+
+        arr = array("q")
+        n_clauses = 0
+        pos, size = 0, -1
+        if len(data) % arr.itemsize == 0:
+            arr.frombytes(data)
+            # validate the record lengths
+            pos = 0
+            size = len(arr)
+            while pos < size and arr[pos] >= 0:
+                pos += 1 + arr[pos]
+                n_clauses += 1
+        if pos != size:
+            self.log.warning(f"sat cache {self.filename}: malformed, ignoring")
+            return False
+        records.lits = arr
+        records.n_clauses = n_clauses
+        return True
+
+    def save(self, records: ClauseRecords):
+        header = dict(self.header, elements=records.fingerprint())
+        with NamedTemporaryFile() as f:
+            with open(f.name, "wb") as fw:
+                fw.write(json.dumps(header).encode() + b"\n")
+                records.lits.tofile(fw)
+            shutil.move(f.name, self.filename)
+            open(f.name, "w").close()
+        self.log.info(
+            f"saved sat cache {self.filename}: {records.n_clauses} clauses"
+        )
@@ -0,0 +1,213 @@
+import logging
+
+from monolearn.SparseSet import SparseSet
+
+from .utils import TimeStat, SubsumptionIndex
+from .LearnModule import LearnModule
+
+
+class DenseLearn(LearnModule):
+    """
+    Learning on bitmaps of the whole cube {0,1}^n
+    (subsets.DenseSet, optional dependency: monolearn[dense]),
+    for small n (up to ~25).
+
+    The known lower / upper regions are kept as DenseSets
+    (down- / up-closures of the learnt vectors, by bit operations),
+    unknowns are taken from the antichain of the complement of their union
+    (MinSet, MaxSet with sense="max", computed by bit operations):
+    of the minimal / maximal weight with sense="min" / "max",
+    up to `batch` per scan.
+    No SAT model is used.
+
+    With climb=True (default), unknowns are lifted / reduced
+    to primes (learn_up / learn_down) as in GainanovSAT.
+    With climb=False, answers are only marked in the bitmaps
+    (more oracle queries, no per-element overhead),
+    and the antichains of the regions (MaxSet / MinSet)
+    are exported to the system in bulk (every save_rate scans and at the end).
+    """
+    log = logging.getLogger(f"{__name__}")
+
+    def __init__(
+        self,
+        sense: str = None,  # min/max/None
+        climb: bool = True,
+        batch: int = 256,
+        save_rate: int = 100,
+        max_n: int = 30,
+    ):
+        assert sense in ("min", "max", None)
+        self.do_min = sense == "min"
+        self.do_max = sense == "max"
+        self.do_climb = climb
+        self.batch = int(batch)
+        self.save_rate = int(save_rate)
+        self.max_n = int(max_n)
+        # vectors learnt since the last scan (is_lower, vec)
+        self._fresh = None
+        # and their (lower, upper) indexes
+        self._fresh_index = None
+
+    def _learn(self):
+        from subsets import DenseSet
+
+        assert self.N <= self.max_n, f"n={self.N} is too large for bitmaps"
+        assert not self.use_point_prec, "extra_prec is not supported"
+
+        self.lower_region = DenseSet(self.N)
+        self.upper_region = DenseSet(self.N)
+        self.marked_meta = {}
+        self._reset_fresh()
+        for vec in self.system.iter_lower_full():
+            self._add_fresh(True, vec)
+        for vec in self.system.iter_upper_full():
+            self._add_fresh(False, vec)
+
+        self.itr = 0
+        try:
+            while True:
+                self.check_budget(n_queries=0)
+                if self.itr and self.itr % self.save_rate == 0:
+                    if not self.do_climb:
+                        self.export()
+                    self.system.save()
+                self.itr += 1
+
+                unknowns = self.scan()
+                if not unknowns:
+                    break
+                self.learn_unknowns(unknowns)
+        finally:
+            if not self.do_climb:
+                self.export()
+
+        self.log.info("no unknowns left, system is completed")
+        self.system.set_complete()
+        self.system.minimize()
+        self.system.save()
+        return True
+
+    def to_int(self, vec: SparseSet):
+        # index 0 is the most significant bit (as in binteger.Bin)
+        n1 = self.N - 1
+        return sum(1 << (n1 - i) for i in vec)
+
+    def from_int(self, x: int):
+        n1 = self.N - 1
+        return SparseSet._unchecked(
+            i for i in range(self.N) if x >> (n1 - i) & 1
+        )
+
+    def _on_system_add(self, is_lower, vec):
+        super()._on_system_add(is_lower, vec)
+        if self._fresh is not None:
+            for img in self.system.orbit(vec):
+                self._add_fresh(is_lower, img)
+
+    def _reset_fresh(self):
+        self._fresh = []
+        self._fresh_index = SubsumptionIndex(), SubsumptionIndex()
+
+    def _add_fresh(self, is_lower, vec):
+        self._fresh.append((is_lower, vec))
+        self._fresh_index[0 if is_lower else 1].add(vec)
+
+    def mark(self, is_lower, vec, meta=None):
+        """Record an answer in the bitmaps only (climb=False)."""
+        if meta is not None:
+            self.marked_meta[vec] = meta
+        for img in self.system.orbit(vec):
+            self._add_fresh(is_lower, img)
+
+    @TimeStat.log
+    def scan(self):
+        """Update the regions, return a batch of unknowns."""
+        for is_lower, vec in self._fresh:
+            if is_lower:
+                self.lower_region.set(self.to_int(vec))
+            else:
+                self.upper_region.set(self.to_int(vec))
+        self._reset_fresh()
+        self.lower_region = self.lower_region.LowerSet()
+        self.upper_region = self.upper_region.UpperSet()
+
+        unknown = (self.lower_region | self.upper_region).Complement()
+        if unknown.is_empty():
+            return []
+
+        # the extreme unknowns include all of the extreme weight,
+        # and the antichain is much smaller than the region
+        if self.do_max:
+            support = unknown.MaxSet().get_support()
+        else:
+            support = unknown.MinSet().get_support()
+        if self.do_min or self.do_max:
+            # a single weight: the answers do not dominate each other,
+            # and the lower (min) / upper (max) ones are primes
+            weights = [bin(x).count("1") for x in support]
+            best = min(weights) if self.do_min else max(weights)
+            support = [x for x, w in zip(support, weights) if w == best]
+        self.log.debug(
+            f"scan #{self.itr}: {len(support)} unknowns"
+            f" (stat: upper {self.n_upper}, lower {self.n_lower})"
+        )
+        return [self.from_int(x) for x in support[:self.batch]]
+
+    @TimeStat.log
+    def learn_unknowns(self, vecs):
+        if self.do_min or self.do_max:
+            # independent queries
+            answers = zip(vecs, self.call_oracle_many(vecs))
+        else:
+            answers = ((vec, None) for vec in vecs)
+
+        for vec, ret in answers:
+            # skip vectors dominated by the ones learnt during this batch
+            # (chains must start from unknowns)
+            if self.is_dominated(vec):
+                continue
+
+            is_lower, meta = self.query(vec) if ret is None else ret
+            if is_lower:
+                self.n_lower += 1
+            else:
+                self.n_upper += 1
+
+            if not self.do_climb:
+                self.mark(is_lower, vec, meta)
+            elif is_lower:
+                if self.do_max:
+                    self.add_lower(vec, meta, is_prime=True)
+                else:
+                    self.learn_up(vec, meta)
+            else:
+                if self.do_min:
+                    self.add_upper(vec, meta, is_prime=True)
+                else:
+                    self.learn_down(vec, meta)
+
+    def is_dominated(self, vec):
+        lower, upper = self._fresh_index
+        return lower.has_superset(vec) or upper.has_subset(vec)
+
+    @TimeStat.log
+    def export(self):
+        """Add the antichains of the known regions to the system."""
+        lower = self.lower_region
+        upper = self.upper_region
+        for is_lower, vec in self._fresh:
+            if is_lower:
+                lower.set(self.to_int(vec))
+            else:
+                upper.set(self.to_int(vec))
+
+        # the system elements come back through the listener
+        for x in lower.MaxSet():
+            vec = self.from_int(x)
+            self.add_lower(vec, self.marked_meta.pop(vec, None))
+        for x in upper.MinSet():
+            vec = self.from_int(x)
+            self.add_upper(vec, self.marked_meta.pop(vec, None))
+        self._reset_fresh()
+
@@ -16,8 +16,10 @@ class GainanovSAT(LearnModule):
         save_rate: int = 100,
         limit: int = None,
         start_level=None,
+        level_search: str = "gallop",  # gallop/linear
     ):
         assert sense in ("min", "max", None)
+        assert level_search in ("gallop", "linear")
         self.do_min = sense == "min"
         self.do_max = sense == "max"
         self.do_opt = sense in ("min", "max")
@@ -25,14 +27,21 @@ class GainanovSAT(LearnModule):
         self.save_rate = int(save_rate)
         self.limit = None if limit is None else int(limit)
         self.start_level = start_level
+        self.level_search = level_search
 
     def _learn(self):
+        if self.prepare():
+            return True
+        return self.run()
+
+    def prepare(self):
+        """Initialize the model, return True if the system is complete."""
         self.sat_init(init_sum=self.do_opt)
 
         self.level = None
         if self.do_opt:
             # check if not exhausted
-            if self.sat.solve() is False:
+            if self.sat_solve() is False:
                 self.log.info("already exhausted, exiting")
                 # if was not marked, we won't be here
                 # so mark
@@ -52,9 +61,23 @@ class GainanovSAT(LearnModule):
             self.log.info(f"starting at level {self.level}")
 
         self.itr = 0
-        while self.limit is None or self.itr < self.limit:
+        # unknowns / compatible unknowns before the current level
+        self._level_start = 0, 0
+        return False
+
+    def run(self, limit=None):
+        """
+        Learn up to `limit` more unknowns (default: self.limit),
+        return True if the system is complete.
+        """
+        if limit is None:
+            limit = self.limit
+        stop = None if limit is None else self.itr + limit
+        while stop is None or self.itr < stop:
             if self.itr and self.itr % self.save_rate == 0:
                 self.system.save()
+            # SAT solving may dominate, check the time budget between them
+            self.check_budget(n_queries=0)
             self.itr += 1
 
             unk = self.find_new_unknown()
@@ -69,23 +92,21 @@ class GainanovSAT(LearnModule):
 
     @TimeStat.log
     def find_new_unknown(self):
+        sol = None
         while True:
-            # <= level
-            self.log.debug(
-                f"itr #{self.itr}: optimizing (level={self.level})... "
-                f"stat: (upper: {self.n_upper}, lower: {self.n_lower})"
-            )
+            if sol is None:
+                # <= level
+                self.log.debug(
+                    f"itr #{self.itr}: optimizing (level={self.level})... "
+                    f"stat: (upper: {self.n_upper}, lower: {self.n_lower})"
+                )
 
-            assum = ()
-            if self.do_min:
-                # <= self.level
-                assum = [-self.xsum[i] for i in range(self.level + 1, len(self.xsum))]
-            elif self.do_max:
-                # >= self.level
-                assum = [self.xsum[i] for i in range(self.level + 1)]
+                assum = ()
+                if self.do_opt:
+                    assum = self.level_assumptions(self.level)
 
-            sol = self.sat.solve(assumptions=assum)
-            # self.log.debug(f"SAT solve: {bool(sol)}")
+                sol = self.sat_solve(assumptions=assum)
+                # self.log.debug(f"SAT solve: {bool(sol)}")
             if sol:
                 vec = SparseSet(
                     i for i, x in enumerate(self.xs) if sol.get(x, 0) == 1
@@ -100,28 +121,100 @@ class GainanovSAT(LearnModule):
 
             # no sol at current level
             if self.do_opt:
-                if self.do_min:
-                    self.level += 1
-                    if self.level > self.N:
-                        self.log.info("no new unknowns")
+                itr0, n_good0 = self._level_start
+                n_good = self.n_lower if self.do_min else self.n_upper
+                self.trace_level(
+                    "lower" if self.do_min else "upper",
+                    self.level,
+                    self.itr - 1 - itr0,
+                    n_good - n_good0,
+                )
+                self._level_start = self.itr - 1, n_good
+                if self.level_search == "gallop":
+                    sol = self.next_level_gallop()
+                    if sol is False:
                         return False
-                    self.log.info(f"increasing level to {self.level}")
-
-                elif self.do_max:
-                    self.level -= 1
-                    if self.level < 0:
-                        self.log.info("no new unknowns")
+                else:
+                    if not self.next_level_linear():
                         return False
-                    self.log.info(f"decreasing level to {self.level}")
-
-                # on each level change check if not done already
-                if self.sat.solve() is False:
-                    self.log.info(f"exhausted from level {self.level}")
-                    return False
+                    sol = None
             else:
                 return False
         assert 0
 
+    def level_assumptions(self, level):
+        if self.do_min:
+            # <= level
+            return [-self.xsum[i] for i in range(level + 1, len(self.xsum))]
+        # >= level
+        return [self.xsum[i] for i in range(level + 1)]
+
+    def next_level_linear(self):
+        """Step to the next level, return False if no unknowns are left."""
+        if self.do_min:
+            self.level += 1
+            if self.level > self.N:
+                self.log.info("no new unknowns")
+                return False
+            self.log.info(f"increasing level to {self.level}")
+
+        elif self.do_max:
+            self.level -= 1
+            if self.level < 0:
+                self.log.info("no new unknowns")
+                return False
+            self.log.info(f"decreasing level to {self.level}")
+
+        # on each level change check if not done already
+        if self.sat_solve() is False:
+            self.log.info(f"exhausted from level {self.level}")
+            return False
+        return True
+
+    def next_level_gallop(self):
+        """
+        Jump to the nearest level with unknowns,
+        return a solution of this weight
+        or False if no unknowns are left.
+        The weight of an unconstrained solution bounds the level,
+        the levels between are probed at distances 1, 2, 4, ...
+        from the exhausted one, then bisected.
+        """
+        sol = self.sat_solve()
+        if sol is False:
+            self.log.info(f"exhausted from level {self.level}")
+            return False
+
+        # lo: no unknowns, hi: has unknowns (sol is within (lo, hi])
+        lo = self.level
+        hi = sum(sol.get(x, 0) == 1 for x in self.xs)
+        step = 1 if self.do_min else -1
+        dist = 1
+        while abs(hi - lo) > dist:
+            probe = lo + step * dist
+            probe_sol = self.sat_solve(
+                assumptions=self.level_assumptions(probe)
+            )
+            if probe_sol:
+                hi, sol = probe, probe_sol
+                break
+            lo = probe
+            dist *= 2
+
+        while abs(hi - lo) > 1:
+            mid = (lo + hi) // 2
+            mid_sol = self.sat_solve(assumptions=self.level_assumptions(mid))
+            if mid_sol:
+                hi, sol = mid, mid_sol
+            else:
+                lo = mid
+
+        if abs(hi - self.level) > 1:
+            self.log.info(f"skipped levels {self.level + step}..{hi - step}")
+        self.level = hi
+        self.log.info(f"moving to level {self.level}")
+        return sol
+
     @TimeStat.log
     def learn_unknown(self, vec):
         is_lower, meta = self.query(vec)
@@ -130,15 +223,13 @@ class GainanovSAT(LearnModule):
             self.n_lower += 1
             if self.do_max:
                 self.log.debug(f"fast lower: wt {len(vec)} meta {meta}")
-                self.system.add_lower(vec, meta)
-                self.model_exclude_sub(vec)
+                self.add_lower(vec, meta)
             else:
                 self.learn_up(vec, meta)
         else:
             self.n_upper += 1
             if self.do_min:
                 self.log.debug(f"fast upper: wt {len(vec)} meta {meta}")
-                self.system.add_upper(vec, meta)
-                self.model_exclude_super(vec)
+                self.add_upper(vec, meta)
             else:
                 self.learn_down(vec, meta)
@@ -1,12 +1,18 @@
+import time
 import logging
-from random import shuffle
+from random import shuffle, Random
+from collections import deque
 
-from optisolveapi.milp import MILP
-from optisolveapi.sat import CNF
+from monolearn.SparseSet import SparseSet, WorkVector
 
-from monolearn.SparseSet import SparseSet
+from .utils import truncstr, TimeStat, SubsumptionIndex
+from .utils import memory_mb, peak_memory_mb
+from .ClauseCache import ClauseCache, ClauseRecords
+from .Trace import Tracer
 
-from .utils import truncstr, TimeStat
+
+class BudgetExceeded(Exception):
+    """A budget of the learning module ran out (caught in learn())."""
 
 
 class LearnModule:
@@ -14,6 +20,41 @@ class LearnModule:
 
     use_point_prec = True
     force_learn_complete = False
+    # keep a snapshot of the SAT encoding next to the system file
+    use_sat_cache = True
+    # remove dominated elements before encoding them
+    minimize_init = True
+    # number of chain steps of learn_up/learn_down evaluated in parallel
+    speculate = 0
+    executor = None
+    # with two-phase oracles (Oracle.LazyMeta), leave the meta of stored
+    # elements to system.fill_meta instead of requesting it on storing
+    lazy_meta = False
+    # with extra_prec: encode the point order as implications x_j -> x_i
+    # in the models instead of closing every clause (expand/reduce)
+    use_implications = False
+    # SAT encoding of the lower elements exclusion:
+    # "direct" - clause over the N-|vec| coordinates outside vec,
+    # "segment" - over O(|vec| log N) nodes of a segment tree
+    #             of auxiliary "some coordinate in range is 1" variables
+    lower_encoding = "direct"
+    # with symmetry: restrict the SAT models to orbit leaders
+    # by lex-leader constraints and encode only the stored elements,
+    # the clauses of their images are added when a model hits them
+    # (instead of all orbit images upfront); not with extra_prec,
+    # the leader of a closed vector needs not be closed
+    symmetry_breaking = True
+    # budgets (None = unlimited): wall-clock seconds, oracle queries,
+    # resident memory in MiB; learning stops cleanly when one runs out
+    time_limit = None
+    oracle_limit = None
+    memory_limit = None
+    # seconds between memory measurements
+    memory_check_interval = 1.0
+    # periodic progress reports (seconds, None = off), callback(progress)
+    progress_interval = None
+    progress_callback = None
+    progress_samples = 1000
 
     def init(self, system, oracle):
         self._options = self.__dict__.copy()
@@ -24,10 +65,22 @@ class LearnModule:
 
         self.milp = None
         self.sat = None
+        self._segments = None
+        self._sat_records = None
+        self._sat_records_dirty = False
+        # (lower, upper) indexes of the stored elements with lazy orbits
+        self._sat_orbits = None
+        self.n_sat_images = 0
 
         self.itr = 0
         self.n_upper = 0
         self.n_lower = 0
+        self.n_mispredicted = 0
+        self.budget_exceeded = None
+        # (lower, upper) indexes of the system for estimate_unknown,
+        # built on the first report and kept up to date by the listener
+        self._progress_index = None
+        self.start_budget()
 
         self.vec_full = SparseSet(range(self.N))
         self.vec_empty = SparseSet(())
@@ -35,6 +88,12 @@ class LearnModule:
         if self.system.extra_prec is None:
             self.use_point_prec = False
 
+        # AsyncOracle (duck-typed to avoid circular imports)
+        self.oracle_async = callable(getattr(oracle, "acall", None))
+
+        # new elements (by any learner) are added to the live models
+        self.system.add_listener(self._on_system_add)
+
     def learn(self, safe=True):
         if self.system.is_complete_lower \
            and self.system.is_complete_upper \
@@ -49,34 +108,252 @@ class LearnModule:
         self.system.log_info()
         self.log.info("---------------")
 
-        if safe:
-            try:
-                ret = self._learn()
-            except BaseException as error:
+        self.start_budget()
+        try:
+            ret = self._learn()
+        except BudgetExceeded as error:
+            self.log.warning(f"budget exceeded: {error}, stopping")
+            self.budget_exceeded = str(error)
+            ret = False
+        except BaseException as error:
+            if safe:
                 self.log.error(f"learning error {error}, saving")
                 self.system.save()
-                raise
-        else:
-            ret = self._learn()
+                self.sat_snapshot()
+            raise
 
         self.log.info("---------------")
+        if self.progress_interval is not None:
+            self.report_progress()
         self.log.info("finished, stat:")
         self.system.save()
+        self.sat_snapshot()
         self.log.info("===============")
         self.log.info("")
         return ret
 
+    def set_speculation(self, k: int, executor=None):
+        """
+        Evaluate the next k steps of learn_up/learn_down chains in parallel,
+        in the given executor (a thread pool of k workers by default).
+        Only Oracle.evaluate runs in the workers
+        (the oracle function must tolerate concurrent calls).
+        """
+        self.speculate = int(k)
+        self.executor = executor
+        return self
+
+    def set_budget(self, time: float = None, oracle: int = None,
+                   memory: float = None):
+        """
+        Stop learning (saving the system) after the given wall-clock time
+        (seconds), number of oracle queries or resident memory (MiB,
+        measured every memory_check_interval seconds; where the current
+        memory is unavailable, the peak, if it grew since the start).
+        Budgets count from the start of learn().
+        """
+        self.time_limit = None if time is None else float(time)
+        self.oracle_limit = None if oracle is None else int(oracle)
+        self.memory_limit = None if memory is None else float(memory)
+        return self
+
+    def set_progress(self, interval: float = 60.0, callback=None,
+                     samples: int = 1000):
+        """
+        Report progress (see progress()) every `interval` seconds
+        to the log and to callback(progress).
+        """
+        self.progress_interval = None if interval is None else float(interval)
+        self.progress_callback = callback
+        self.progress_samples = int(samples)
+        return self
+
+    def n_queries(self):
+        return getattr(self.oracle, "n_queries", 0)
+
+    def start_budget(self):
+        self._budget_start = (
+            time.time(),
+            self.n_queries(),
+            self.system.n_lower() + self.system.n_upper(),
+        )
+        self._progress_next = self._next_progress(self._budget_start[0])
+        self._memory_next = self._budget_start[0]
+        self._memory_peak = peak_memory_mb()
+
+    def share_budget(self, module: "LearnModule"):
+        """Make a helper module (driven by this one) use this budget."""
+        module.time_limit = self.time_limit
+        module.oracle_limit = self.oracle_limit
+        module.memory_limit = self.memory_limit
+        module._budget_start = self._budget_start
+        module._progress_next = None
+        module._memory_next = self._memory_next
+        module._memory_peak = self._memory_peak
+
+    def _next_progress(self, t):
+        if self.progress_interval is None:
+            return
+        return t + self.progress_interval
+
+    def check_budget(self, n_queries=1):
+        """
+        Raise BudgetExceeded if the budget does not allow
+        `n_queries` more oracle queries; reports progress when due.
+        """
+        t0, q0, _ = self._budget_start
+        now = time.time()
+        if self.time_limit is not None and now - t0 >= self.time_limit:
+            raise BudgetExceeded(f"time limit {self.time_limit}s")
+        if self.oracle_limit is not None:
+            if self.n_queries() - q0 + n_queries > self.oracle_limit:
+                raise BudgetExceeded(f"oracle limit {self.oracle_limit}")
+        if self.memory_limit is not None and now >= self._memory_next:
+            self._memory_next = now + self.memory_check_interval
+            memory = self.memory_used()
+            if memory is not None and memory >= self.memory_limit:
+                raise BudgetExceeded(f"memory limit {self.memory_limit}MiB")
+        if self._progress_next is not None and now >= self._progress_next:
+            self._progress_next = self._next_progress(now)
+            self.report_progress()
+
+    def memory_used(self):
+        """Memory (MiB) compared with memory_limit, see set_budget."""
+        memory = memory_mb()
+        if memory is not None:
+            return memory
+        # the peak never decreases, it counts only if reached by this run
+        memory = peak_memory_mb()
+        if memory is not None and memory > (self._memory_peak or 0):
+            return memory
+
+    def current_level(self):
+        return getattr(self, "level", None)
+
+    def estimate_unknown(self, samples: int = 1000):
+        """
+        Monte Carlo estimate of the fraction of the cube
+        not yet classified by the system.
+        """
+        if self.system.is_complete_lower or self.system.is_complete_upper:
+            return 0.0
+        if self._progress_index is None:
+            self._progress_index = (
+                SubsumptionIndex(self.system.iter_lower_full()),
+                SubsumptionIndex(self.system.iter_upper_full()),
+            )
+        lower, upper = self._progress_index
+        # own generator, not to disturb the learners' randomness
+        rand = Random(samples)
+        n_unknown = 0
+        for _ in range(samples):
+            bits = rand.getrandbits(self.N) if self.N else 0
+            vec = SparseSet._unchecked(
+                i for i in range(self.N) if bits >> i & 1
+            )
+            if not lower.has_superset(vec) and not upper.has_subset(vec):
+                n_unknown += 1
+        return n_unknown / samples
+
+    def progress(self):
+        t0, q0, p0 = self._budget_start
+        elapsed = time.time() - t0
+        n_elements = self.system.n_lower() + self.system.n_upper()
+        return dict(
+            module=type(self).__name__,
+            elapsed=elapsed,
+            queries=self.n_queries() - q0,
+            n_lower=self.system.n_lower(),
+            n_upper=self.system.n_upper(),
+            primes_per_minute=(n_elements - p0) * 60 / max(elapsed, 1e-6),
+            level=self.current_level(),
+            unknown=self.estimate_unknown(self.progress_samples),
+            memory=memory_mb() or peak_memory_mb(),
+        )
+
+    def report_progress(self):
+        progress = self.progress()
+        self.log.info(
+            f"progress: {progress['elapsed']:.1f}s, "
+            f"{progress['queries']} queries, "
+            f"lower {progress['n_lower']} upper {progress['n_upper']}, "
+            f"{progress['primes_per_minute']:.1f} primes/min, "
+            f"level {progress['level']}, "
+            f"unknown ~{progress['unknown']:.4f}"
+        )
+        if self.progress_callback is not None:
+            self.progress_callback(progress)
+        return progress
+
+    @property
+    def implied_prec(self):
+        """The point order is enforced by the models (use_implications)."""
+        return self.use_point_prec and self.use_implications
+
+    def query_vector(self, vec):
+        """
+        The form of vec asked from the oracle (reduced, canonical).
+        With implications the oracle is asked vec as it is:
+        the answers respect the point order either way.
+        """
+        if self.use_point_prec and not self.use_implications:
+            vec = self.system.extra_prec.reduce(vec)
+        return self.system.canonical(vec)
+
     @TimeStat.log
     def query(self, vec):
-        if self.use_point_prec:
-            vec = self.system.extra_prec.reduce(vec)
-        return self.call_oracle(vec)
+        self.check_budget()
+        return self.oracle(self.query_vector(vec))
 
     @TimeStat.log
     def call_oracle(self, vec):
-        return self.oracle(vec)
+        self.check_budget()
+        # symmetric images share the oracle answer (and cache entry)
+        return self.oracle(self.system.canonical(vec))
+
+    @TimeStat.log
+    def call_oracle_many(self, vecs):
+        """Independent queries, possibly evaluated concurrently/batched."""
+        self.check_budget(n_queries=len(vecs))
+        if self.system.symmetry:
+            vecs = list(map(self.system.canonical, vecs))
+        call_many = getattr(self.oracle, "call_many", None)
+        if call_many is None:
+            return [self.oracle(vec) for vec in vecs]
+        return call_many(vecs)
+
+    @TimeStat.log
+    async def aquery(self, vec):
+        self.check_budget()
+        return await self.oracle.acall(self.query_vector(vec))
+
+    def add_lower(self, vec, meta=None, is_prime=False):
+        # with implications the vectors are stored as learnt:
+        # maximal lower ones are closed, minimal upper ones reduced,
+        # and the clauses of the others stay valid (see closed_lower)
+        self.system.add_lower(
+            vec, meta=self.resolve_meta(vec, meta), is_prime=is_prime,
+            normalize=not self.implied_prec,
+        )
+
+    def add_upper(self, vec, meta=None, is_prime=False):
+        self.system.add_upper(
+            vec, meta=self.resolve_meta(vec, meta), is_prime=is_prime,
+            normalize=not self.implied_prec,
+        )
+
+    def resolve_meta(self, vec, meta):
+        """Request the lazy meta of a vector about to be stored."""
+        if meta is not self.oracle.LazyMeta or self.lazy_meta:
+            return meta
+        if self.system.is_known_lower(vec) or self.system.is_known_upper(vec):
+            return meta
+        return self.oracle.get_meta(self.query_vector(vec))
 
     def milp_init(self, maximization=True, init=True):
+        # solver backends are loaded only when needed
+        from optisolveapi.milp import MILP
+
         if maximization:
             self.milp = MILP.maximization(solver=self.solver)
         else:
@@ -86,10 +363,15 @@ class LearnModule:
         self.xsum = self.milp.var_int("xsum", lb=2, ub=self.N)
         self.milp.add_constraint(sum(self.xs) == self.xsum)
 
+        if self.use_point_prec and self.use_implications:
+            for i, j in self.system.extra_prec.cover_relations():
+                self.milp.add_constraint(self.xs[j] <= self.xs[i])
+
         if maximization is not None:
             self.milp.set_objective(self.xsum)
 
         if init:
+            self.minimize_system()
             self.log.info(
                 "milp: initializing "
                 f"feasible constraints: {self.system.n_lower()}"
@@ -107,6 +389,8 @@ class LearnModule:
             self.log.info("milp: initialization done")
 
     def sat_init(self, init_sum=True, init=True):
+        from optisolveapi.sat import CNF
+
         self.log.info("sat: initializing constraints")
         self.sat = CNF.new(solver=self.solver)
 
@@ -114,50 +398,395 @@ class LearnModule:
         if init_sum:
             self.xsum = self.sat.Card(self.xs)
 
+        # lazy orbit clauses: no MILP model to keep in sync
+        self._sat_orbits = None
+        if self.symmetry_breaking and self.system.symmetry \
+           and not self.use_point_prec and self.milp is None:
+            self._sat_orbits = SubsumptionIndex(), SubsumptionIndex()
+
+        # variables of clause literals (+-(i+1)): xs, then auxiliary
+        self.sat_vars = list(self.xs)
+        self._segments = None
+        if self.lower_encoding == "segment":
+            self.sat_init_segments()
+        else:
+            assert self.lower_encoding == "direct", self.lower_encoding
+
+        if self.use_point_prec and self.use_implications:
+            covers = self.system.extra_prec.cover_relations()
+            self.log.info(f"sat: adding {len(covers)} point order implications")
+            self.sat.add_clauses(
+                [[-self.xs[j], self.xs[i]] for i, j in covers]
+            )
+
+        if self._sat_orbits is not None:
+            self.sat_init_symmetry_breaking()
+
         if init:
-            self.log.info(
-                "sat: initializing "
-                f"feasible constraints: {self.system.n_lower()}"
+            self.sat_init_system()
+
+    def sat_init_symmetry_breaking(self):
+        """
+        Lex-leader constraints x <= perm(x) (bit strings x_0 x_1 ...)
+        for the generators and the known transpositions (i j),
+        i < j (simply x_i -> x_j) of the symmetry:
+        the smallest vector of every orbit satisfies them,
+        and the system is invariant,
+        so an unknown vector exists iff an unknown leader does.
+        """
+        symmetry = self.system.symmetry
+        clauses = [
+            [-self.xs[i], self.xs[j]] for i, j in symmetry.transpositions()
+        ]
+        true = self.sat.var()
+        clauses.append([true])
+        for perm in symmetry.generators:
+            # y = perm(x): y_perm[i] = x_i
+            ys = [None] * self.N
+            for i, j in enumerate(perm):
+                ys[j] = self.xs[i]
+            # eq: the prefixes of x and y are equal
+            eq = true
+            for x, y in zip(self.xs, ys):
+                if x == y:
+                    continue
+                clauses.append([-eq, -x, y])
+                nxt = self.sat.var()
+                clauses.append([-eq, x, y, nxt])
+                clauses.append([-eq, -x, -y, nxt])
+                eq = nxt
+        self.sat.add_clauses(clauses)
+        self.log.info(f"sat: {len(clauses)} symmetry breaking clauses")
+
+    def sat_init_segments(self):
+        """
+        Segment tree over the coordinates: a node variable implies
+        one of its children (y -> y_left | y_right), leaves are the xs.
+        Any model of xs extends to the node variables
+        (as ORs of their ranges), so the encoding is equisatisfiable.
+        """
+        self._segments = {}
+        clauses = []
+
+        def build(lo, hi):
+            if hi - lo == 1:
+                lit = lo + 1
+            else:
+                mid = (lo + hi) // 2
+                left = build(lo, mid)
+                right = build(mid, hi)
+                var = self.sat.var()
+                self.sat_vars.append(var)
+                lit = len(self.sat_vars)
+                clauses.append([
+                    -var, self.sat_vars[left - 1], self.sat_vars[right - 1],
+                ])
+            self._segments[lo, hi] = lit
+            return lit
+
+        if self.N:
+            build(0, self.N)
+        self.sat.add_clauses(clauses)
+        self.log.info(f"sat: segment tree with {len(clauses)} nodes")
+
+    def _segment_cover(self, a, b, out, lo=0, hi=None):
+        """Append the node literals covering the range [a, b)."""
+        if hi is None:
+            hi = self.N
+        if b <= lo or hi <= a:
+            return
+        if a <= lo and hi <= b:
+            out.append(self._segments[lo, hi])
+            return
+        mid = (lo + hi) // 2
+        self._segment_cover(a, b, out, lo, mid)
+        self._segment_cover(a, b, out, mid, hi)
+
+    def sat_solve(self, assumptions=()):
+        """
+        Model (dict) of an unknown vector under the assumptions, or False.
+        With lazy orbits, models hitting an image of a stored element
+        get the clause of that image and the solver is called again.
+        """
+        while True:
+            sol = self._sat_solve(assumptions)
+            if not sol or self._sat_orbits is None \
+               or not self.sat_exclude_image(sol):
+                return sol
+
+    def _sat_solve(self, assumptions):
+        tracer = Tracer.active
+        if tracer is None or not tracer.sample("sat"):
+            return self.sat.solve(assumptions=assumptions)
+        t0 = time.perf_counter()
+        sol = self.sat.solve(assumptions=assumptions)
+        tracer.emit(
+            "sat",
+            assumptions=len(assumptions),
+            time=time.perf_counter() - t0,
+            result=bool(sol),
+        )
+        return sol
+
+    def sat_exclude_image(self, sol):
+        """
+        Add the clause of an image of a stored element excluding
+        the model, return False if there is none.
+        """
+        vec = SparseSet._unchecked(
+            i for i, x in enumerate(self.xs) if sol.get(x, 0) == 1
+        )
+        lower, upper = self._sat_orbits
+        for img in self.system.orbit(vec):
+            for top in lower.supersets(img):
+                for cand in self.system.orbit(top):
+                    if vec <= cand:
+                        self.n_sat_images += 1
+                        self._model_exclude_sub(cand)
+                        return True
+            for bot in upper.subsets(img):
+                for cand in self.system.orbit(bot):
+                    if cand <= vec:
+                        self.n_sat_images += 1
+                        self._model_exclude_super(cand)
+                        return True
+        return False
+
+    def trace_level(self, side, level, n_total, n_good):
+        tracer = Tracer.active
+        if tracer is not None and tracer.sample("level"):
+            tracer.emit(
+                "level",
+                side=side, level=level, n_total=n_total, n_good=n_good,
             )
+
+    def sat_cache(self):
+        if not self.use_sat_cache or not self.system.file:
+            return
+        extra_prec = None
+        if self.use_point_prec:
+            extra_prec = self.system.extra_prec.key()
+        return ClauseCache(
+            self.system.file + ".sat",
+            header=dict(
+                n=self.N,
+                extra_prec=extra_prec,
+                implications=bool(self.use_implications),
+                symmetry_breaking=self._sat_orbits is not None,
+                symmetry=self.system.symmetry and self.system.symmetry.key(),
+                encoding=self.lower_encoding,
+            ),
+        )
+
+    @TimeStat.log
+    def sat_init_system(self, chunk=10000):
+        """
+        Add clauses for all elements of the system
+        (and their images under the symmetry, unless symmetry_breaking),
+        reusing the cached encoding if it covers exactly these elements
+        (then the system is not minimized, see minimize_init).
+        """
+        cache = self.sat_cache()
+        self._sat_records = None
+        if cache:
+            # the elements as saved, before minimization
+            records = ClauseRecords.of_system(self.system)
+            if cache.load(records):
+                self._sat_records = records
+
+        if self._sat_records is None:
+            self.minimize_system()
+            self.sat_encode_system(chunk)
+            self.n_sat_cached = 0
+            if cache:
+                self._sat_records_dirty = True
+                self.sat_snapshot()
+            return
+
+        records = self._sat_records
+        self.log.info(f"sat: adding {records.n_clauses} cached clauses")
+        clauses = []
+        for lits in records.clauses():
+            clauses.append(self.sat_clause(lits))
+            if len(clauses) >= chunk:
+                self.sat.add_clauses(clauses)
+                clauses = []
+        self.sat.add_clauses(clauses)
+        if self._sat_orbits is not None:
+            for vec in self.system.iter_lower():
+                self._sat_orbits[0].add(vec)
             for vec in self.system.iter_upper():
-                self.model_exclude_super(vec)
+                self._sat_orbits[1].add(vec)
+
+        # the system is minimized when the encoding is rebuilt
+        self.n_init_eliminated = 0
+        self.n_sat_cached = records.n_elements
+        self.log.info(
+            f"sat: initialization done, {records.n_elements} elements "
+            "from cache"
+        )
 
+    def sat_encode_system(self, chunk=10000):
+        if self.use_sat_cache and self.system.file:
+            self._sat_records = ClauseRecords()
+        clauses = []
+        for is_lower, vecs in (
+            (False, self.system.iter_upper()),
+            (True, self.system.iter_lower()),
+        ):
             self.log.info(
                 "sat: initializing "
-                f"infeasible constraints: {self.system.n_upper()}"
+                f"{'lower' if is_lower else 'upper'} constraints: "
+                f"{self.system.n_lower() if is_lower else self.system.n_upper()}"
             )
-            for vec in self.system.iter_lower():
-                self.model_exclude_sub(vec)
-
-            self.log.info("sat: initialization done")
+            for vec in vecs:
+                if self._sat_records is not None:
+                    self._sat_records.add_element(is_lower, vec)
+                for img in self.sat_images(is_lower, vec):
+                    if is_lower:
+                        lits = self.clause_exclude_sub(img)
+                    else:
+                        lits = self.clause_exclude_super(img)
+                    if self._sat_records is not None:
+                        self._sat_records.add_clause(lits)
+                    clauses.append(self.sat_clause(lits))
+                    if len(clauses) >= chunk:
+                        self.sat.add_clauses(clauses)
+                        clauses = []
+        self.sat.add_clauses(clauses)
+        self.log.info("sat: initialization done")
+
+    def minimize_system(self):
+        self.n_init_eliminated = 0
+        if not self.minimize_init:
+            return
+        n_lower, n_upper = self.system.minimize()
+        self.n_init_eliminated = n_lower + n_upper
+        self.log.info(
+            "model: minimization eliminated "
+            f"{self.n_init_eliminated} clauses "
+            f"(lower {n_lower}, upper {n_upper})"
+        )
 
-    def model_exclude_sub(self, vec):
-        if self.use_point_prec:
+    def sat_snapshot(self):
+        """Save the current SAT encoding to the cache (if changed)."""
+        if self._sat_records is None or not self._sat_records_dirty:
+            return
+        self.sat_cache().save(self._sat_records)
+        self._sat_records_dirty = False
+
+    def sat_clause(self, lits):
+        vs = self.sat_vars
+        return [vs[lit - 1] if lit > 0 else -vs[-lit - 1] for lit in lits]
+
+    def _on_system_add(self, is_lower, vec):
+        if self._progress_index is not None:
+            index = self._progress_index[0 if is_lower else 1]
+            for img in self.system.orbit(vec):
+                index.add(img)
+        if self.sat is None and self.milp is None:
+            return
+        if is_lower:
+            self.model_exclude_sub(vec)
+        else:
+            self.model_exclude_super(vec)
+
+    def closed_lower(self, vec):
+        """
+        Lower vec closed under the point order.
+        In the implications mode vec is taken as it is: the learnt
+        maximal lower elements are closed (the oracle respects the order)
+        and for others the clause is weaker but still valid,
+        as the models are closed.
+        """
+        if self.use_point_prec and not self.use_implications:
             vec = self.system.extra_prec.expand(vec)
+        return vec
+
+    def closed_upper(self, vec):
+        """
+        Upper vec in reduced form. In the implications mode vec is taken
+        as it is: any form excludes the same closed models.
+        """
+        if self.use_point_prec and not self.use_implications:
+            vec = self.system.extra_prec.reduce(vec)
+        return vec
+
+    def clause_exclude_sub(self, vec):
+        """
+        Clause (over model variables, +-(i+1) for x_i)
+        excluding the subsets of the lower vec.
+        """
+        vec = self.closed_lower(vec)
+        if self._segments is not None:
+            # the gaps between the coordinates of vec
+            lits = []
+            prev = 0
+            for i in vec:
+                self._segment_cover(prev, i, lits)
+                prev = i + 1
+            self._segment_cover(prev, self.N, lits)
+            return tuple(lits)
+        return tuple(i + 1 for i in vec.iter_missing(self.N))
+
+    def clause_exclude_super(self, vec):
+        """
+        Clause (over model variables, +-(i+1) for x_i)
+        excluding the supersets of the upper vec.
+        """
+        vec = self.closed_upper(vec)
+        return tuple(-(i + 1) for i in vec)
+
+    def sat_images(self, is_lower, vec):
+        """
+        Images of the stored vec to encode: all the orbit,
+        or only vec with symmetry breaking (then it is indexed).
+        """
+        if self._sat_orbits is None:
+            return self.system.orbit(vec)
+        self._sat_orbits[0 if is_lower else 1].add(vec)
+        return (vec,)
 
+    def model_exclude_sub(self, vec):
+        if self.sat and self._sat_records is not None:
+            self._sat_records.add_element(True, vec)
+            self._sat_records_dirty = True
+        # orbit clauses: exclude the images of vec
+        for img in self.sat_images(True, vec):
+            self._model_exclude_sub(img)
+
+    def _model_exclude_sub(self, vec):
         if self.milp:
+            vec = self.closed_lower(vec)
             self.milp.add_constraint(
                 sum(self.xs[i] for i in range(self.N) if i not in vec) >= 1
             )
 
         if self.sat:
-            self.sat.add_clause(tuple(
-                self.xs[i] for i in self.vec_full - vec
-            ))
+            lits = self.clause_exclude_sub(vec)
+            self.sat.add_clause(self.sat_clause(lits))
+            if self._sat_records is not None:
+                self._sat_records.add_clause(lits)
 
     def model_exclude_super(self, vec):
-        if self.use_point_prec:
-            vec = self.system.extra_prec.reduce(vec)
+        if self.sat and self._sat_records is not None:
+            self._sat_records.add_element(False, vec)
+            self._sat_records_dirty = True
+        for img in self.sat_images(False, vec):
+            self._model_exclude_super(img)
 
+    def _model_exclude_super(self, vec):
         if self.milp:
+            vec = self.closed_upper(vec)
             self.milp.add_constraint(
                 sum(self.xs[i] for i in vec) <= len(vec) - 1
             )
 
         if self.sat:
-            self.sat.add_clause(tuple(
-                -self.xs[i] for i in vec
-            ))
+            lits = self.clause_exclude_super(vec)
+            self.sat.add_clause(self.sat_clause(lits))
+            if self._sat_records is not None:
+                self._sat_records.add_clause(lits)
 
     @TimeStat.log
     def learn_down(self, vec: SparseSet, meta=None):
@@ -169,26 +798,15 @@ class LearnModule:
             f"learning down from upper wt {len(vec)}: {truncstr(vec)}"
         )
 
+        work = WorkVector(vec)
         inds = list(vec)
         shuffle(inds)
-        for i in inds:
-            new_vec = vec - i
-            assert not self.system.is_known_upper(new_vec)
-            if self.system.is_known_lower(new_vec):
-                continue
-
-            is_lower, new_meta = self.query(new_vec)
-            if is_lower:
-                continue
-
-            vec = new_vec
-            meta = new_meta
+        vec, meta = self.climb(work, inds, False, vec, meta)
 
         assert not self.system.is_known_lower(vec)
         assert not self.system.is_known_upper(vec)
 
-        self.system.add_upper(vec, meta=meta, is_prime=True)
-        self.model_exclude_super(vec)
+        self.add_upper(vec, meta=meta, is_prime=True)
         self.log.debug(
             f"learnt minimal upper vec wt {len(vec)}: {truncstr(vec)}"
         )
@@ -203,26 +821,202 @@ class LearnModule:
             f"learning up from lower wt {len(vec)}: {truncstr(vec)}"
         )
 
-        inds = list(self.vec_full - vec)
+        work = WorkVector(vec)
+        inds = list(work.iter_missing(self.N))
         shuffle(inds)
+        vec, meta = self.climb(work, inds, True, vec, meta)
+
+        assert not self.system.is_known_lower(vec)
+        assert not self.system.is_known_upper(vec)
+
+        self.add_lower(vec, meta=meta, is_prime=True)
+        self.log.debug(
+            f"learnt maximal lower vec wt {len(vec)}: {truncstr(vec)}"
+        )
+
+    def climb(self, work: WorkVector, inds, up: bool, vec, meta):
+        """
+        Greedy chain from vec: try to add (up) / remove (down)
+        the given indices one by one, keeping the changes that
+        stay lower (up) / upper (down).
+        Returns the final vector and its meta.
+        """
+        if self.oracle_async:
+            return self.oracle.run(
+                self._climb_async(work, inds, up, vec, meta)
+            )
+        if self.speculate > 1:
+            return self._climb_speculative(work, inds, up, vec, meta)
+
         for i in inds:
-            new_vec = vec | i
-            assert not self.system.is_known_lower(new_vec)
-            if self.system.is_known_upper(new_vec):
+            new_vec = self._climb_candidate(work, i, up)
+            if new_vec is None:
                 continue
 
             is_lower, new_meta = self.query(new_vec)
-            if not is_lower:
+            if is_lower != up:
                 continue
 
+            if up:
+                work.add(i)
+            else:
+                work.discard(i)
             vec = new_vec
             meta = new_meta
+        return vec, meta
+
+    def _climb_candidate(self, work: WorkVector, i, up: bool):
+        """next vector of the chain, None if its answer is known"""
+        # flip i in place only to build the candidate
+        work.push(i)
+        new_vec = work.freeze()
+        work.undo()
+        if up:
+            assert not self.system.is_known_lower(new_vec)
+            if self.system.is_known_upper(new_vec):
+                return
+        else:
+            assert not self.system.is_known_upper(new_vec)
+            if self.system.is_known_lower(new_vec):
+                return
+        return new_vec
+
+    def _climb_speculative(self, work: WorkVector, inds, up: bool, vec, meta):
+        """
+        Speculative climb in an executor:
+        the next `speculate` candidates are evaluated in parallel,
+        assuming that the vector does not change (rejections, which is
+        the common case near the frontier).
+        The answers are consumed in order, the consistent prefix is kept,
+        and on the first accepted candidate the rest is discarded
+        (mispredicted, computed for the old vector) and re-issued.
+        The result is the same as of the sequential chain.
+        Only Oracle.evaluate runs in the executor (see Oracle.begin),
+        the budget, caches and counters are handled in this thread.
+        """
+        if self.executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(self.speculate)
+
+        inds = deque(inds)
+        pending = deque()
+        # discarded evaluations that were already running
+        stale = deque()
+        try:
+            while inds or pending:
+                # the answers are valid (only not needed), record them
+                while stale and stale[0][2].done():
+                    self._finish_query(stale.popleft())
+
+                while inds and len(pending) < self.speculate:
+                    i = inds.popleft()
+                    new_vec = self._climb_candidate(work, i, up)
+                    if new_vec is not None:
+                        query = self._begin_query(
+                            new_vec, len(pending) + len(stale),
+                        )
+                        pending.append((i, new_vec, query))
+                if not pending:
+                    break
+
+                i, new_vec, query = pending.popleft()
+                is_lower, new_meta = self._finish_query(query)
+                if is_lower != up:
+                    continue
+
+                if up:
+                    work.add(i)
+                else:
+                    work.discard(i)
+                vec = new_vec
+                meta = new_meta
+
+                self.n_mispredicted += len(pending)
+                while pending:
+                    j, _, query = pending.pop()
+                    inds.appendleft(j)
+                    if query[2] is not None and not query[2].cancel():
+                        stale.append(query)
+        finally:
+            for _, _, query in pending:
+                if query[2] is not None and not query[2].cancel():
+                    stale.append(query)
+            for query in stale:
+                if query[2].exception() is None:
+                    self._finish_query(query)
+        return vec, meta
+
+    def _begin_query(self, vec, n_pending):
+        """
+        Start a speculative query (see Oracle.begin).
+        Returns (vec, cached answer, future of the answer, start time).
+        """
+        # the queries in flight are not counted yet
+        self.check_budget(n_queries=1 + n_pending)
+        vec = self.query_vector(vec)
+
+        ret = self.oracle.begin(vec)
+        if ret is not None:
+            return vec, ret, None, None
+        t0 = time.perf_counter()
+        return vec, None, self.executor.submit(self.oracle.evaluate, vec), t0
+
+    def _finish_query(self, query):
+        vec, ret, future, t0 = query
+        if future is None:
+            return ret
+        ret = future.result()
+        self.oracle.finish(vec, ret, latency=time.perf_counter() - t0)
+        return ret
 
-        assert not self.system.is_known_lower(vec)
-        assert not self.system.is_known_upper(vec)
-
-        self.system.add_lower(vec, meta=meta, is_prime=True)
-        self.model_exclude_sub(vec)
-        self.log.debug(
-            f"learnt maximal lower vec wt {len(vec)}: {truncstr(vec)}"
-        )
+    async def _climb_async(self, work: WorkVector, inds, up: bool, vec, meta):
+        """
+        Speculative climb for asynchronous oracles:
+        the next candidates are queried concurrently (up to max_inflight),
+        assuming that the vector does not change (rejections).
+        When a candidate is accepted, the queries in flight
+        were made for the old vector and are cancelled and re-issued.
+        The result is the same as of the sequential chain.
+        """
+        import asyncio
+
+        window = self.oracle.max_inflight
+        inds = deque(inds)
+        pending = deque()
+        cancelled = []
+        try:
+            while inds or pending:
+                while inds and len(pending) < window:
+                    i = inds.popleft()
+                    new_vec = self._climb_candidate(work, i, up)
+                    if new_vec is not None:
+                        task = asyncio.ensure_future(self.aquery(new_vec))
+                        pending.append((i, new_vec, task))
+                if not pending:
+                    break
+
+                i, new_vec, task = pending.popleft()
+                is_lower, new_meta = await task
+                if is_lower != up:
+                    continue
+
+                if up:
+                    work.add(i)
+                else:
+                    work.discard(i)
+                vec = new_vec
+                meta = new_meta
+
+                # mispredicted
+                self.n_mispredicted += len(pending)
+                while pending:
+                    j, _, task = pending.pop()
+                    task.cancel()
+                    cancelled.append(task)
+                    inds.appendleft(j)
+        finally:
+            for _, _, task in pending:
+                task.cancel()
+                cancelled.append(task)
+            await asyncio.gather(*cancelled, return_exceptions=True)
+        return vec, meta
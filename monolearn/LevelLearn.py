@@ -1,21 +1,89 @@
 import logging
+from itertools import combinations
 
-from .utils import TimeStat
+from monolearn.SparseSet import SparseSet, WorkVector
+
+from .utils import TimeStat, SubsumptionIndex, binomial
 from .LearnModule import LearnModule
 
 
 class LevelLearn(LearnModule):
+    """
+    Level-by-level generation of the lower set from the bottom
+    (levels_lower levels) and of the upper set from the top
+    (levels_upper levels), using the level caches of the oracle.
+
+    window_lower / window_upper = (a, b) generate only the levels
+    a..b (see learn_lower_window / learn_upper_window);
+    the unknowns of the first window level are found by the SAT `solver`,
+    `window_batch` at a time; the vectors of the first level dominated by
+    the known elements are generated directly up to `window_seed_limit`
+    (with repetitions), beyond it by the SAT solver as well.
+    """
     log = logging.getLogger(f"{__name__}")
 
-    def __init__(self, levels_lower=0, levels_upper=0):
+    def __init__(self, levels_lower=0, levels_upper=0,
+                 window_lower=None, window_upper=None,
+                 solver: str = None, window_batch: int = 1024,
+                 window_seed_limit: int = 10**5):
         self.levels_lower = int(levels_lower)
         self.levels_upper = int(levels_upper)
+        self.window_lower = window_lower
+        self.window_upper = window_upper
+        self.solver = solver
+        self.window_batch = int(window_batch)
+        self.window_seed_limit = int(window_seed_limit)
+        # known elements of the system during window generation
+        self._known = None
+
+    def init(self, system, oracle):
+        super().init(system, oracle)
+        # per generated level: side, level, n_total, n_good
+        self.level_stats = []
+        self.exhausted_lower = False
+        self.exhausted_upper = False
+
+    def step_lower(self):
+        """Generate the next lower level, return its stats (None if none)."""
+        cache = self.oracle._lower_cache
+        current = -1 if cache.range is None else cache.range[1]
+        n_stats = len(self.level_stats)
+        if not self.exhausted_lower and current < self.N:
+            self.learn_lower(up_to=max(current + 1, 1))
+        if len(self.level_stats) > n_stats:
+            return self.level_stats[-1]
+        self.exhausted_lower = True
+
+    def step_upper(self):
+        """Generate the next upper level, return its stats (None if none)."""
+        cache = self.oracle._upper_cache
+        current = self.N + 1 if cache.range is None else cache.range[0]
+        n_stats = len(self.level_stats)
+        if not self.exhausted_upper and current > 0:
+            self.learn_upper(down_to=min(current - 1, self.N - 1))
+        if len(self.level_stats) > n_stats:
+            return self.level_stats[-1]
+        self.exhausted_upper = True
+
+    def current_level(self):
+        if self.level_stats:
+            return self.level_stats[-1]["level"]
+
+    def _add_stats(self, side, level, n_total, n_good):
+        self.level_stats.append(dict(
+            side=side, level=level, n_total=n_total, n_good=n_good,
+        ))
+        self.trace_level(side, level, n_total, n_good)
 
     def _learn(self):
         if self.levels_lower:
             self.learn_lower(up_to=self.levels_lower - 1)
         if self.levels_upper:
             self.learn_upper(down_to=self.N - self.levels_upper + 1)
+        if self.window_lower:
+            self.learn_lower_window(*self.window_lower)
+        if self.window_upper:
+            self.learn_upper_window(*self.window_upper)
 
     @TimeStat.log
     def learn_lower(self, up_to):
@@ -32,55 +100,60 @@ class LevelLearn(LearnModule):
 
             is_lower, meta = self.call_oracle(vec)
             if is_lower:
-                self.system.meta[vec] = meta
-                cache.add(vec, meta)
-            cache.set_range(0, 0)
+                if meta is not self.oracle.UnknownMeta \
+                   and meta is not self.oracle.LazyMeta:
+                    self.system.meta[vec] = meta
+                self.oracle.add_to_level(True, vec, meta)
+            self.oracle.set_level_range(True, 0, 0)
             current = 0
 
         if not cache.has(self.vec_empty):
             self.log.warning("0-vector is not in lower set, trivial set")
+            self.exhausted_lower = True
             return
 
         for l in range(current + 1, up_to + 1):
             self.log.info(f"generating support, height={l}/{up_to}")
 
             n_good = 0
-            n_total = 0
 
             # cache stores only lower vectors
             # only check new vectors that are compatible with lowers
             # can be checked by counting refs
             to_check = {}
             for prev in cache.iter_weight(l - 1):
-                for up in prev.neibs_up(n=self.N):
+                for up in WorkVector(prev).neibs_up(self.N):
                     to_check.setdefault(up, 0)
                     to_check[up] += 1
 
-            for vec, cnt in to_check.items():
-                assert len(vec) == l
-                if cnt != l:
-                    continue
-
-                n_total += 1
+            vecs = [vec for vec, cnt in to_check.items() if cnt == l]
+            del to_check
+            n_total = len(vecs)
 
-                is_lower, meta = self.call_oracle(vec)
+            rets = self.call_oracle_many(vecs)
+            for vec, (is_lower, meta) in zip(vecs, rets):
+                assert len(vec) == l
                 if is_lower:
-                    self.system.meta[vec] = meta
-                    cache.add(vec, meta)
+                    if meta is not self.oracle.UnknownMeta \
+                       and meta is not self.oracle.LazyMeta:
+                        self.system.meta[vec] = meta
+                    self.oracle.add_to_level(True, vec, meta)
                     n_good += 1
                 else:
                     # print("upper", vec)
-                    self.system.add_upper(vec, meta=meta, is_prime=True)
+                    self.add_upper(vec, meta=meta, is_prime=True)
 
             self.log.info(
                 f"generated support, height={l}/{up_to}: "
                 f"lower {n_good}/{n_total} compatible "
                 f"(frac. {(n_good+1)/(n_total+1):.3f})"
             )
-            cache.set_range(0, l)
+            self.oracle.set_level_range(True, 0, l)
+            self._add_stats("lower", l, n_total, n_good)
 
             if n_good == 0:
                 self.log.warning(f"exhausted lower at level {l}/{up_to}")
+                self.exhausted_lower = True
                 break
 
     @TimeStat.log
@@ -98,57 +171,302 @@ class LevelLearn(LearnModule):
 
             is_lower, meta = self.call_oracle(vec)
             if not is_lower:
-                self.system.meta[vec] = meta
-                cache.add(vec, meta)
-            cache.set_range(self.N, self.N)
+                if meta is not self.oracle.UnknownMeta \
+                   and meta is not self.oracle.LazyMeta:
+                    self.system.meta[vec] = meta
+                self.oracle.add_to_level(False, vec, meta)
+            self.oracle.set_level_range(False, self.N, self.N)
             current = self.N
 
         if not cache.has(self.vec_full):
             self.log.warning("full-vector is not in the upper set, trivial set")
+            self.exhausted_upper = True
             return
 
         for l in reversed(range(down_to, current)):
             self.log.info(f"generating support, height={l} to {down_to}")
 
             n_good = 0
-            n_total = 0
 
             # cache stores only lower vectors
             # only check new vectors that are compatible with lowers
             # can be checked by counting refs
             to_check = {}
             for prev in cache.iter_weight(l + 1):
-                for down in prev.neibs_down():  # (n=self.N):
+                for down in WorkVector(prev).neibs_down():
                     to_check.setdefault(down, 0)
                     to_check[down] += 1
 
-            for vec, cnt in to_check.items():
-                assert len(vec) == l
-                if cnt != self.N - l:
-                    continue
-
-                n_total += 1
+            vecs = [vec for vec, cnt in to_check.items() if cnt == self.N - l]
+            del to_check
+            n_total = len(vecs)
 
-                is_lower, meta = self.call_oracle(vec)
+            rets = self.call_oracle_many(vecs)
+            for vec, (is_lower, meta) in zip(vecs, rets):
+                assert len(vec) == l
                 if not is_lower:
-                    self.system.meta[vec] = meta
-                    cache.add(vec, meta)
+                    if meta is not self.oracle.UnknownMeta \
+                       and meta is not self.oracle.LazyMeta:
+                        self.system.meta[vec] = meta
+                    self.oracle.add_to_level(False, vec, meta)
                     n_good += 1
                 else:
                     # print("upper", vec)
-                    self.system.add_lower(vec, meta=meta, is_prime=True)
+                    self.add_lower(vec, meta=meta, is_prime=True)
 
             self.log.info(
                 f"generated support, height={l} to {down_to}: "
                 f"upper {n_good}/{n_total} compatible "
                 f"(frac. {(n_good+1)/(n_total+1):.3f})"
             )
-            cache.set_range(l, self.N)
+            self.oracle.set_level_range(False, l, self.N)
+            self._add_stats("upper", l, n_total, n_good)
 
             if n_good == 0:
                 self.log.warning(f"exhausted upper at level {l} (to {down_to})")
+                self.exhausted_upper = True
+                break
+
+    def learn_lower_window(self, a, b):
+        """
+        Generate the lower levels a..b (from a up).
+        Level a is seeded from the system (see _seed_window_level),
+        the next ones are built
+        from the lower vectors of the previous level as in learn_lower.
+        Vectors dominated by the known elements of the system
+        are classified without queries,
+        and only the current and the previous levels are kept
+        (the oracle level cache is not used).
+        Lower vectors without lower vectors above them on the next level
+        are added to the system (maximal),
+        upper vectors above a full lower level are added as minimal.
+        """
+        assert 0 <= a <= b <= self.N
+        self._learn_window(range(a, b + 1), True)
+
+    def learn_upper_window(self, a, b):
+        """Generate the upper levels b..a (from b down), see above."""
+        assert 0 <= a <= b <= self.N
+        self._learn_window(range(b, a - 1, -1), False)
+
+    @TimeStat.log
+    def _learn_window(self, levels, lower: bool):
+        side = "lower" if lower else "upper"
+        self._known = (
+            SubsumptionIndex(self.system.iter_lower_full()),
+            SubsumptionIndex(self.system.iter_upper_full()),
+        )
+        try:
+            prev = None
+            for l in levels:
+                self.log.info(f"generating {side} window level {l}")
+                if prev is None:
+                    level, n_total = self._seed_window_level(l, lower)
+                else:
+                    cands = self._window_candidates(prev, l, lower)
+                    level, n_total = self._check_window_level(
+                        cands, lower, is_prime=True,
+                    )
+                n_good = len(level)
+                self.log.info(
+                    f"generated {side} window level {l}: "
+                    f"{n_good}/{n_total} compatible "
+                    f"(frac. {(n_good+1)/(n_total+1):.3f})"
+                )
+                self._add_stats(side, l, n_total, n_good)
+
+                if prev is not None:
+                    self._add_window_primes(prev, level, lower)
+                if n_good == 0:
+                    self.log.warning(f"exhausted {side} at level {l}")
+                    if lower:
+                        self.exhausted_lower = True
+                    else:
+                        self.exhausted_upper = True
+                    break
+                prev = level
+        finally:
+            self._known = None
+
+    def _seed_window_level(self, l, lower: bool):
+        """
+        The lower (upper) vectors of weight l, without enumerating the level:
+        the vectors of weight l are found by SAT (excluding the known
+        elements of the other side and the vectors found so far),
+        the ones dominated by the known lower (upper) elements
+        are taken without queries, the others are queried.
+        While their number is at most window_seed_limit, the dominated
+        vectors are generated directly (weight-l subsets / supersets
+        of the known elements) and excluded from the SAT model instead.
+        Vectors of the other side whose neighbours towards the level
+        are all in it are added as prime.
+        Returns the level (vec -> meta) and the number of vectors visited.
+        """
+        from optisolveapi.sat import CNF
+
+        known_lower, known_upper = self._known
+        known = known_lower if lower else known_upper
+        level = {}
+        seeded = self._seed_size(l, lower) <= self.window_seed_limit
+        if seeded and lower:
+            for vec in known_lower:
+                for sub in combinations(vec, l):
+                    level.setdefault(SparseSet._unchecked(sub), None)
+        elif seeded:
+            for vec in known_upper:
+                if len(vec) > l:
+                    continue
+                missing = list(vec.iter_missing(self.N))
+                for extra in combinations(missing, l - len(vec)):
+                    level.setdefault(vec | SparseSet._unchecked(extra), None)
+        n_total = len(level)
+
+        sat = CNF.new(solver=self.solver)
+        xs = [sat.var() for _ in range(self.N)]
+        xsum = sat.Card(xs)
+        if seeded or not lower:
+            for vec in known_lower:
+                sat.add_clause([xs[i] for i in vec.iter_missing(self.N)])
+        if seeded or lower:
+            for vec in known_upper:
+                sat.add_clause([-xs[i] for i in vec])
+        # weight exactly l
+        assum = [xsum[i] for i in range(l + 1)]
+        assum += [-xsum[i] for i in range(l + 1, len(xsum))]
+
+        other = []
+        while True:
+            todo = []
+            while len(todo) < self.window_batch:
+                sol = sat.solve(assumptions=assum)
+                if not sol:
+                    break
+                vec = SparseSet._unchecked(
+                    i for i, x in enumerate(xs) if sol.get(x, 0) == 1
+                )
+                # the images share the answer
+                for img in self.system.orbit(vec):
+                    sat.add_clause([-xs[i] for i in img])
+                if lower:
+                    dominated = known.has_superset(vec)
+                else:
+                    dominated = known.has_subset(vec)
+                if dominated:
+                    n_total += 1
+                    for img in self.system.orbit(vec):
+                        level[img] = None
+                else:
+                    todo.append(vec)
+            if not todo:
                 break
 
+            n_total += len(todo)
+            rets = self.call_oracle_many(todo)
+            for vec, (is_lower, meta) in zip(todo, rets):
+                if is_lower == lower:
+                    for img in self.system.orbit(vec):
+                        level[img] = meta
+                else:
+                    other.append((vec, meta))
+
+        for vec, meta in other:
+            is_prime = self._is_level_prime(vec, level, lower)
+            if lower:
+                self.add_upper(vec, meta=meta, is_prime=is_prime)
+            else:
+                self.add_lower(vec, meta=meta, is_prime=is_prime)
+        return level, n_total
+
+    def _seed_size(self, l, lower: bool):
+        """Number of vectors (with repetitions) seeding level l directly."""
+        if lower:
+            return sum(binomial(len(vec), l) for vec in self._known[0])
+        return sum(
+            binomial(self.N - len(vec), l - len(vec))
+            for vec in self._known[1]
+        )
+
+    def _is_level_prime(self, vec, level, lower: bool):
+        """
+        Whether all neighbours of vec (of the other side) towards the
+        lower (upper) level are lower (upper): below (above) a vector
+        of the level or a known element.
+        """
+        known_lower, known_upper = self._known
+        if lower:
+            for nb in WorkVector(vec).neibs_down():
+                if known_lower.has_superset(nb):
+                    continue
+                ups = WorkVector(nb).neibs_up(self.N)
+                if not any(up in level for up in ups):
+                    return False
+        else:
+            for nb in WorkVector(vec).neibs_up(self.N):
+                if known_upper.has_subset(nb):
+                    continue
+                downs = WorkVector(nb).neibs_down()
+                if not any(down in level for down in downs):
+                    return False
+        return True
+
+    def _window_candidates(self, prev, l, lower: bool):
+        # all neighbours towards prev must be in prev
+        to_check = {}
+        for vec in prev:
+            work = WorkVector(vec)
+            neibs = work.neibs_up(self.N) if lower else work.neibs_down()
+            for nb in neibs:
+                to_check[nb] = to_check.get(nb, 0) + 1
+        need = l if lower else self.N - l
+        return [vec for vec, cnt in to_check.items() if cnt == need]
+
+    def _check_window_level(self, cands, lower: bool, is_prime: bool):
+        known_lower, known_upper = self._known
+        level = {}
+        n_total = 0
+        todo = []
+        for vec in cands:
+            n_total += 1
+            if known_upper.has_subset(vec):
+                if not lower:
+                    level[vec] = None
+            elif known_lower.has_superset(vec):
+                if lower:
+                    level[vec] = None
+            else:
+                todo.append(vec)
+
+        rets = self.call_oracle_many(todo) if todo else ()
+        for vec, (is_lower, meta) in zip(todo, rets):
+            if is_lower == lower:
+                level[vec] = meta
+            elif is_lower:
+                self.add_lower(vec, meta=meta, is_prime=is_prime)
+            else:
+                self.add_upper(vec, meta=meta, is_prime=is_prime)
+        return level, n_total
+
+    def _add_window_primes(self, prev, level, lower: bool):
+        extended = set()
+        for vec in level:
+            work = WorkVector(vec)
+            neibs = work.neibs_down() if lower else work.neibs_up(self.N)
+            extended.update(neibs)
+        for vec, meta in prev.items():
+            if vec in extended:
+                continue
+            if lower:
+                self.add_lower(vec, meta=meta, is_prime=True)
+            else:
+                self.add_upper(vec, meta=meta, is_prime=True)
+
+    def _on_system_add(self, is_lower, vec):
+        super()._on_system_add(is_lower, vec)
+        if self._known is not None:
+            index = self._known[0 if is_lower else 1]
+            for img in self.system.orbit(vec):
+                index.add(img)
+
 
 class UnknownMeta:
     pass
@@ -171,6 +489,8 @@ class LevelCache:
         if self.range is None or not self.range[0] <= len(vec) <= self.range[1]:
             # can not check
             return
+        if len(vec) >= len(self.cache):
+            return False
         return vec in self.cache[len(vec)]
 
     def set_range(self, start, end):
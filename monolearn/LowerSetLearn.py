@@ -1,18 +1,27 @@
 import os
+import json
 import shutil
-# import json
+import hashlib
 # import gzip
 import bz2
+import time
 import logging
+import weakref
 from tempfile import NamedTemporaryFile
 
-from collections import Counter
+from collections import Counter, OrderedDict
+from itertools import chain
 from queue import Queue
 
 from monolearn.SparseSet import SparseSet
-from monolearn.utils import loads, dumps
+from monolearn.utils import (
+    dumps, JSONStreamReader, iter_undictify,
+    maximal_sets, minimal_sets, SubsumptionIndex,
+)
 
 from .LevelLearn import LevelCache
+from .Trace import Tracer
+from .Symmetry import Symmetry
 
 
 class ExtraPrec:
@@ -22,6 +31,15 @@ class ExtraPrec:
     def expand(self, vec: SparseSet):
         return vec
 
+    def cover_relations(self):
+        """Pairs (i, j) of coordinates where j covers i (i < j)."""
+        return ()
+
+    def key(self):
+        """Digest of the cover relations (identifies cached encodings)."""
+        covers = json.dumps(sorted(self.cover_relations()))
+        return hashlib.sha1(covers.encode()).hexdigest()
+
 
 class LowerSetLearn:
     DATA_VERSION = 4
@@ -32,11 +50,17 @@ class LowerSetLearn:
         n: int,
         file: str = None,
         extra_prec: ExtraPrec = None,
+        symmetry: Symmetry = None,
     ):
         self.n = int(n)
 
         self.file = file
         self.extra_prec = extra_prec
+        # stored elements are canonical orbit representatives
+        self.symmetry = symmetry
+        assert not (extra_prec and symmetry), \
+            "extra_prec with symmetry is not supported"
+        assert symmetry is None or symmetry.n == self.n
 
         # "final" vectors, ideally prime elements
         # but not always practical to check/push
@@ -46,11 +70,48 @@ class LowerSetLearn:
         self.is_complete_upper = False
 
         self.meta = {}  # info per elements of lower/upper
+        # stored elements with meta not computed yet (Oracle.LazyMeta)
+        self.meta_pending = set()
+
+        # callbacks (is_lower, vec) on new elements, e.g. running SAT models
+        self._listeners = []
 
         self.saved = False
         if self.file and os.path.exists(self.file):
             self.load()
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_listeners"] = []
+        return state
+
+    def add_listener(self, callback):
+        """
+        Call callback(is_lower, vec) on each new stored element.
+        Bound methods are referenced weakly.
+        """
+        if hasattr(callback, "__self__"):
+            ref = weakref.WeakMethod(callback)
+        else:
+            ref = lambda: callback  # noqa: E731
+        self._listeners.append(ref)
+
+    def remove_listener(self, callback):
+        self._listeners = [
+            ref for ref in self._listeners if ref() not in (None, callback)
+        ]
+
+    def _notify(self, is_lower, vec):
+        dead = False
+        for ref in self._listeners:
+            callback = ref()
+            if callback is None:
+                dead = True
+            else:
+                callback(is_lower, vec)
+        if dead:
+            self._listeners = [ref for ref in self._listeners if ref()]
+
     @property
     def is_complete(self):
         return self.is_complete_lower and self.is_complete_upper
@@ -73,6 +134,70 @@ class LowerSetLearn:
             vec: meta for vec, meta in self.meta.items()
             if vec in self._lower or vec in self._upper
         }
+        self.meta_pending = {
+            vec for vec in self.meta_pending
+            if vec in self._lower or vec in self._upper
+        }
+
+    def get_meta(self, vec, oracle: "Oracle" = None):
+        """Meta of a stored element, computed now if pending."""
+        vec = self.canonical(vec)
+        if oracle is not None and vec in self.meta_pending:
+            self.fill_meta(oracle, vecs=[vec])
+        return self.meta.get(vec)
+
+    def fill_meta(self, oracle: "Oracle", vecs=None, batch_size: int = 1024,
+                  missing: bool = False):
+        """
+        Compute the pending meta (of elements stored with Oracle.LazyMeta)
+        in batches by oracle.get_meta_many;
+        with missing=True also of all stored elements without meta
+        (e.g. after loading the system, pending meta is not saved).
+        Returns the number of computed meta.
+        """
+        if vecs is None:
+            vecs = list(self.meta_pending)
+            if missing:
+                vecs.extend(
+                    vec for vec in chain(self._lower, self._upper)
+                    if vec not in self.meta and vec not in self.meta_pending
+                )
+        for i in range(0, len(vecs), batch_size):
+            batch = vecs[i:i+batch_size]
+            for vec, meta in zip(batch, oracle.get_meta_many(batch)):
+                if meta is not None:
+                    self.meta[vec] = meta
+                self.meta_pending.discard(vec)
+            self.saved = False
+            self.log.debug(f"filled meta {i + len(batch)}/{len(vecs)}")
+        return len(vecs)
+
+    def minimize(self):
+        """
+        Remove non-prime elements dominated by other stored elements
+        (subsets of other lower / supersets of other upper elements).
+        Returns the numbers of removed lower and upper elements.
+        """
+        if self.symmetry:
+            # dominated by images of other elements
+            lower = maximal_sets(self.iter_lower_full())
+            upper = minimal_sets(self.iter_upper_full())
+            lower = set(map(self.canonical, lower))
+            upper = set(map(self.canonical, upper))
+        else:
+            lower = maximal_sets(self._lower)
+            upper = minimal_sets(self._upper)
+        n_lower = len(self._lower) - len(lower)
+        n_upper = len(self._upper) - len(upper)
+        if n_lower or n_upper:
+            self._lower = set(lower)
+            self._upper = set(upper)
+            self.clean()
+            self.saved = False
+            self.log.info(
+                f"minimized: removed {n_lower} lower, {n_upper} upper"
+            )
+        return n_lower, n_upper
 
     def save(self):
         if self.file and not self.saved:
@@ -98,7 +223,7 @@ class LowerSetLearn:
         prevn = self.n
         with bz2.open(filename, "rt") as f:
             try:
-                data = loads(f.read())
+                data = self._load_stream(JSONStreamReader(f))
             except EOFError as err:
                 self.log.error(f"loading system {filename} failed: {err}")
                 return False
@@ -108,12 +233,61 @@ class LowerSetLearn:
             self.is_complete_lower, self.is_complete_upper,
             self.meta, self.n,
         ) = data
-        assert version == self.DATA_VERSION, "system format updated?"
         assert self.n == prevn
         self.log.info(f"loaded state from file {filename}")
         return True
 
+    @classmethod
+    def _load_stream(cls, reader):
+        """
+        Parse the saved tuple (see save_to_file) incrementally,
+        building the sets element by element,
+        so that the whole JSON document is never held in memory.
+        """
+        fields = reader.iter_array()
+
+        next(fields)
+        version = reader.value()
+        assert version == cls.DATA_VERSION, "system format updated?"
+
+        next(fields)
+        lower = set(iter_undictify(reader))
+        next(fields)
+        upper = set(iter_undictify(reader))
+
+        next(fields)
+        is_complete_lower = reader.value()
+        next(fields)
+        is_complete_upper = reader.value()
+
+        next(fields)
+        meta = dict(iter_undictify(reader))
+
+        next(fields)
+        n = reader.value()
+
+        assert list(fields) == [], "unexpected data in the system file"
+        return (
+            version,
+            lower, upper,
+            is_complete_lower, is_complete_upper,
+            meta, n,
+        )
+
     def save_to_file(self, filename):
+        tracer = Tracer.active
+        if tracer is not None and tracer.sample("save"):
+            t0 = time.perf_counter()
+            self._save_to_file(filename)
+            tracer.emit(
+                "save",
+                bytes=os.path.getsize(filename),
+                time=time.perf_counter() - t0,
+            )
+        else:
+            self._save_to_file(filename)
+
+    def _save_to_file(self, filename):
         data = (
             self.DATA_VERSION,
             self._lower, self._upper,
@@ -148,41 +322,67 @@ class LowerSetLearn:
         if self.is_complete_upper:
             self.log.info("  system is complete for upper!")
 
+    def canonical(self, vec):
+        if self.symmetry:
+            return self.symmetry.canonical(vec)
+        return vec
+
+    def orbit(self, vec):
+        if self.symmetry:
+            return self.symmetry.orbit(vec)
+        return (vec,)
+
     def is_known_lower(self, vec):
-        return vec in self._lower
+        return self.canonical(vec) in self._lower
 
     def is_known_upper(self, vec):
-        return vec in self._upper
+        return self.canonical(vec) in self._upper
 
-    def add_lower(self, vec, meta=None, is_prime=False):
+    def add_lower(self, vec, meta=None, is_prime=False, normalize=True):
         assert isinstance(vec, SparseSet)
+        if meta is Oracle.UnknownMeta:
+            meta = None
 
-        if self.extra_prec:
+        # normalize=False: vec is already in the stored form
+        # (e.g. from models closed under the point order)
+        if self.extra_prec and normalize:
             vec = self.extra_prec.expand(vec)
+        vec = self.canonical(vec)
 
         # in case of interrupt, consistency is kept
         if not self.is_known_lower(vec):
             self.saved = False
 
-            if meta is not None:
+            if meta is Oracle.LazyMeta:
+                self.meta_pending.add(vec)
+            elif meta is not None:
                 self.meta[vec] = meta
 
             self._lower.add(vec)
+            self._notify(True, vec)
 
-    def add_upper(self, vec, meta=None, is_prime=False):
+    def add_upper(self, vec, meta=None, is_prime=False, normalize=True):
         assert isinstance(vec, SparseSet)
+        if meta is Oracle.UnknownMeta:
+            meta = None
 
-        if self.extra_prec:
+        # normalize=False: vec is already in the stored form
+        # (e.g. from models closed under the point order)
+        if self.extra_prec and normalize:
             vec = self.extra_prec.reduce(vec)
+        vec = self.canonical(vec)
 
         # in case of interrupt, consistency is kept
         if not self.is_known_upper(vec):
             self.saved = False
 
-            if meta is not None:
+            if meta is Oracle.LazyMeta:
+                self.meta_pending.add(vec)
+            elif meta is not None:
                 self.meta[vec] = meta
 
             self._upper.add(vec)
+            self._notify(False, vec)
 
     def iter_lower(self):
         return iter(self._lower)
@@ -190,6 +390,18 @@ class LowerSetLearn:
     def iter_upper(self):
         return iter(self._upper)
 
+    def iter_lower_full(self):
+        """Stored elements with all their images under the symmetry."""
+        if not self.symmetry:
+            return iter(self._lower)
+        return chain.from_iterable(map(self.orbit, self._lower))
+
+    def iter_upper_full(self):
+        """Stored elements with all their images under the symmetry."""
+        if not self.symmetry:
+            return iter(self._upper)
+        return chain.from_iterable(map(self.orbit, self._upper))
+
     def n_lower(self):
         return len(self._lower)
 
@@ -205,6 +417,25 @@ class ExtraPrec_LowerSet(ExtraPrec):
     def __init__(self, int2point: list, point2int: map):
         self.int2point = [support(v) for v in int2point]
         self.point2int = {support(v): i for v, i in point2int.items()}
+        self._covers = None
+
+    def cover_relations(self):
+        """
+        >>> pts = [(0, 0), (1, 0), (0, 1), (1, 1)]
+        >>> prec = ExtraPrec_LowerSet(pts, {pt: i for i, pt in enumerate(pts)})
+        >>> sorted(prec.cover_relations())
+        [(0, 1), (0, 2), (1, 3), (2, 3)]
+        """
+        if self._covers is None:
+            covers = []
+            pts = self.int2point
+            for j, q in enumerate(pts):
+                below = [i for i, p in enumerate(pts) if p < q]
+                for i in below:
+                    if not any(pts[i] < pts[k] for k in below):
+                        covers.append((i, j))
+            self._covers = covers
+        return self._covers
 
     def reduce(self, vec: SparseSet):
         """MaxSet"""
@@ -241,26 +472,148 @@ class ExtraPrec_LowerSet(ExtraPrec):
         return SparseSet(res)
 
 
+class OracleInference:
+    """
+    Answers implied by monotonicity from recent oracle answers
+    (see Oracle.enable_inference), kept as antichains:
+    maximal lower / minimal upper vectors, at most `limit` (oldest evicted).
+
+    Lookups are timed against the oracle queries: every `check_every`
+    lookups, if they took longer than the queries they saved,
+    the inference is switched off (cheap oracles).
+    """
+    check_every = 1000
+    log = logging.getLogger(f"{__name__}:OracleInference")
+
+    def __init__(self, limit: int):
+        self.lower = SubsumptionIndex()
+        self.upper = SubsumptionIndex()
+        # (is_lower, vec) in the order of addition
+        self.order = OrderedDict()
+        self.limit = int(limit)
+        self.active = True
+        self.n_lookups = 0
+        self.n_hits = 0
+        self.t_lookups = 0.0
+        self.n_timed = 0
+        self.t_queries = 0.0
+
+    def lookup(self, vec: SparseSet):
+        """is_lower if implied by the kept answers, else None."""
+        if not self.active:
+            return
+        t0 = time.perf_counter()
+        ret = None
+        if self.lower.has_superset(vec):
+            ret = True
+        elif self.upper.has_subset(vec):
+            ret = False
+        self.t_lookups += time.perf_counter() - t0
+        self.n_lookups += 1
+        if ret is not None:
+            self.n_hits += 1
+        if self.n_lookups % self.check_every == 0 and not self.pays_off():
+            self.log.info(
+                f"lookups take {self.t_lookups:.3f}s, saved queries "
+                f"{self.saved_time():.3f}s: switching off"
+            )
+            self.active = False
+            self.lower = SubsumptionIndex()
+            self.upper = SubsumptionIndex()
+            self.order.clear()
+        return ret
+
+    def saved_time(self):
+        """Estimated time of the queries answered by lookups."""
+        if not self.n_timed:
+            return
+        return self.n_hits * self.t_queries / self.n_timed
+
+    def pays_off(self):
+        saved = self.saved_time()
+        return saved is None or self.t_lookups <= saved
+
+    def add_query_time(self, latency: float):
+        self.t_queries += latency
+        self.n_timed += 1
+
+    def store(self, vec: SparseSet, is_lower: bool):
+        """Keep an oracle answer."""
+        if not self.active:
+            return
+        if is_lower:
+            if self.lower.has_superset(vec):
+                return
+            implied = self.lower.subsets(vec)
+            index = self.lower
+        else:
+            if self.upper.has_subset(vec):
+                return
+            implied = self.upper.supersets(vec)
+            index = self.upper
+        for old in implied:
+            index.remove(old)
+            del self.order[is_lower, old]
+        index.add(vec)
+        self.order[is_lower, vec] = None
+        if len(self.order) > self.limit:
+            (is_lower, old), _ = self.order.popitem(last=False)
+            (self.lower if is_lower else self.upper).remove(old)
+
+
 class Oracle:
     class UnknownMeta:
         pass
 
+    # meta is computed on demand (get_meta) for two-phase oracles
+    class LazyMeta:
+        pass
+
     def __init__(self):
         self._lower_cache = LevelCache()
         self._upper_cache = LevelCache()
         self._cache = {}
+        self._inference = None
         self.n_calls = 0
         self.n_queries = 0
+        self.n_inferred = 0
+        self.n_meta = 0
 
     def disable_cache(self):
         self._cache = None
 
+    def enable_inference(self, limit: int = 100000):
+        """
+        Answer queries implied by monotonicity from recent answers:
+        subsets of a known lower vector are lower,
+        supersets of a known upper vector are upper.
+        Keeps (up to `limit`, oldest evicted) answers in antichain indexes:
+        an answer implied by a kept one is not added, and the kept ones
+        implied by a new answer are removed.
+        Inferred answers have UnknownMeta and are counted in n_inferred
+        (not in n_queries). Switched off if the lookups cost more than
+        the queries they save (see OracleInference).
+        """
+        self._inference = OracleInference(limit)
+
     def clean(self, levels=True, main=True):
         if levels:
             self._lower_cache = LevelCache()
             self._upper_cache = LevelCache()
         if main:
             self._cache = {}
+            if self._inference is not None:
+                self.enable_inference(limit=self._inference.limit)
+
+    def add_to_level(self, is_lower: bool, vec: SparseSet, meta=None):
+        """Store an answer in the level cache (see LevelLearn)."""
+        cache = self._lower_cache if is_lower else self._upper_cache
+        cache.add(vec, meta)
+
+    def set_level_range(self, is_lower: bool, start: int, end: int):
+        """Mark the levels start..end of the level cache as complete."""
+        cache = self._lower_cache if is_lower else self._upper_cache
+        cache.set_range(start, end)
 
     @property
     def data(self):
@@ -279,7 +632,149 @@ class Oracle:
         ) = data
 
     def __call__(self, vec: SparseSet):
+        tracer = Tracer.active
+        if tracer is not None and tracer.sample("query"):
+            t0 = time.perf_counter()
+            n_queries = self.n_queries
+            ret = self._call(vec)
+            self._trace_query(
+                tracer, vec, ret,
+                latency=time.perf_counter() - t0,
+                cached=self.n_queries == n_queries,
+            )
+            return ret
+        return self._call(vec)
+
+    @staticmethod
+    def _trace_query(tracer, vec, ret, latency, cached):
+        tracer.emit(
+            "query",
+            weight=len(vec),
+            is_lower=bool(ret[0]),
+            latency=latency,
+            cached=cached,
+        )
+
+    def begin(self, vec: SparseSet):
+        """
+        Call split for concurrent evaluation (e.g. speculative climbs):
+        begin(vec) gives the cached answer, or None;
+        then evaluate(vec) computes the answer (in any thread),
+        and finish(vec, ret) records it (in the thread of begin).
+        Evaluations dropped before finish are not counted.
+        """
+        self.n_calls += 1
+        ret = self._lookup(vec)
+        if ret is not None:
+            tracer = Tracer.active
+            if tracer is not None and tracer.sample("query"):
+                self._trace_query(tracer, vec, ret, latency=0.0, cached=True)
+        return ret
+
+    def evaluate(self, vec: SparseSet):
+        """The answer of the function only (see begin)."""
+        return self._query(vec)
+
+    def finish(self, vec: SparseSet, ret, latency: float = 0.0):
+        """Record an evaluated answer (see begin)."""
+        self.n_queries += 1
+        if latency:
+            self._timed(latency)
+        self._store(vec, ret)
+        tracer = Tracer.active
+        if tracer is not None and tracer.sample("query"):
+            self._trace_query(tracer, vec, ret, latency=latency, cached=False)
+
+    def _call(self, vec: SparseSet):
         self.n_calls += 1
+        ret = self._lookup(vec)
+        if ret is not None:
+            return ret
+
+        self.n_queries += 1
+        t0 = time.perf_counter()
+        ret = self._query(vec)
+        self._timed(time.perf_counter() - t0)
+        self._store(vec, ret)
+        return ret
+
+    def call_many(self, vecs):
+        """
+        Answer several independent queries,
+        the uncached ones are evaluated together by _query_many.
+        """
+        rets = [None] * len(vecs)
+        todo = {}
+        for pos, vec in enumerate(vecs):
+            self.n_calls += 1
+            ret = self._lookup(vec)
+            if ret is None:
+                todo.setdefault(vec, []).append(pos)
+            else:
+                rets[pos] = ret
+
+        self.n_queries += len(todo)
+        uniq = list(todo)
+        t0 = time.perf_counter()
+        answers = self._query_many(uniq)
+        # batched: the latency is amortized over the batch
+        latency = (time.perf_counter() - t0) / max(len(uniq), 1)
+        for vec, ret in zip(uniq, answers):
+            self._timed(latency)
+            self._store(vec, ret)
+            for pos in todo[vec]:
+                rets[pos] = ret
+
+        tracer = Tracer.active
+        if tracer is not None:
+            for vec, ret in zip(vecs, rets):
+                if tracer.sample("query"):
+                    cached = vec not in todo
+                    self._trace_query(
+                        tracer, vec, ret,
+                        latency=0.0 if cached else latency,
+                        cached=cached,
+                    )
+        return rets
+
+    def _query_many(self, vecs):
+        """Evaluate several vectors (override for vectorized evaluation)."""
+        return [self._query(vec) for vec in vecs]
+
+    def get_meta(self, vec: SparseSet):
+        return self.get_meta_many([vec])[0]
+
+    def get_meta_many(self, vecs):
+        """
+        Meta of the given vectors: cached if known,
+        otherwise computed by _meta_many (counted in n_meta).
+        """
+        rets = [None] * len(vecs)
+        todo = {}
+        for pos, vec in enumerate(vecs):
+            ret = self._cache.get(vec) if self._cache else None
+            if ret is not None and ret[1] is not self.LazyMeta:
+                rets[pos] = ret[1]
+            else:
+                todo.setdefault(vec, []).append(pos)
+
+        self.n_meta += len(todo)
+        uniq = list(todo)
+        for vec, meta in zip(uniq, self._meta_many(uniq)):
+            if self._cache and vec in self._cache:
+                self._cache[vec] = self._cache[vec][0], meta
+            for pos in todo[vec]:
+                rets[pos] = meta
+        return rets
+
+    def _meta(self, vec: SparseSet):
+        raise NotImplementedError()
+
+    def _meta_many(self, vecs):
+        return [self._meta(vec) for vec in vecs]
+
+    def _lookup(self, vec: SparseSet):
+        """Cached answer (is_lower, meta) or None."""
         if self._cache and vec in self._cache:
             return self._cache[vec]
 
@@ -291,11 +786,23 @@ class Oracle:
             meta = self._upper_cache.meta.get(vec, self.UnknownMeta)
             return False, meta
 
-        self.n_queries += 1
-        ret = self._query(vec)
+        if self._inference is not None:
+            is_lower = self._inference.lookup(vec)
+            if is_lower is not None:
+                self.n_inferred += 1
+                return is_lower, self.UnknownMeta
+
+    def _store(self, vec: SparseSet, ret):
         if self._cache is not None:
             self._cache[vec] = ret
-        return ret
+
+        if self._inference is not None:
+            self._inference.store(vec, ret[0])
+
+    def _timed(self, latency: float):
+        """Query time (the inference compares it with the lookups)."""
+        if self._inference is not None:
+            self._inference.add_query_time(latency)
 
 
 class OracleFunction(Oracle):
@@ -314,3 +821,83 @@ class OracleFunctionWithMeta(Oracle):
 
     def _query(self, vec: SparseSet):
         return self.func(vec)
+
+
+class OracleFunctionLazyMeta(Oracle):
+    """
+    Two-phase oracle: decide(vec) gives the (fast) boolean answer,
+    meta(vec) is evaluated only on request (get_meta),
+    e.g. for the elements stored by the learners.
+    """
+    def __init__(self, decide, meta):
+        self.decide_func = decide
+        self.meta_func = meta
+        super().__init__()
+
+    def _query(self, vec: SparseSet):
+        return bool(self.decide_func(vec)), self.LazyMeta
+
+    def _meta(self, vec: SparseSet):
+        return self.meta_func(vec)
+
+
+class OracleBatchFunction(Oracle):
+    """
+    Oracle for vectorized (NumPy) predicates.
+
+    func receives a 2-D uint8 array with one candidate per row:
+    0/1 entries of shape (k, n), or, with packed=True,
+    bitmasks packed by numpy.packbits along the rows (shape (k, ceil(n/8))).
+    It returns a boolean array of k answers (True = lower),
+    or a pair (answers, metas) with k meta values.
+
+    Batches (e.g. whole levels of LevelLearn, see Oracle.call_many)
+    are evaluated by chunks of at most batch_size rows.
+    Requires numpy (optional dependency: monolearn[numpy]).
+    """
+    def __init__(self, func, n: int, packed: bool = False,
+                 batch_size: int = 1 << 16):
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "OracleBatchFunction requires numpy "
+                "(pip install 'monolearn[numpy]')"
+            ) from None
+        self.func = func
+        self.n = int(n)
+        self.packed = packed
+        self.batch_size = int(batch_size)
+        super().__init__()
+
+    def _query(self, vec: SparseSet):
+        return self._query_many([vec])[0]
+
+    def _query_many(self, vecs):
+        rets = []
+        for start in range(0, len(vecs), self.batch_size):
+            rets.extend(self._query_chunk(vecs[start:start+self.batch_size]))
+        return rets
+
+    def to_array(self, vecs):
+        import numpy as np
+
+        arr = np.zeros((len(vecs), self.n), dtype=np.uint8)
+        rows = np.repeat(
+            np.arange(len(vecs)),
+            np.fromiter(map(len, vecs), dtype=np.int64, count=len(vecs)),
+        )
+        cols = np.fromiter(chain.from_iterable(vecs), dtype=np.int64)
+        arr[rows, cols] = 1
+        if self.packed:
+            arr = np.packbits(arr, axis=1)
+        return arr
+
+    def _query_chunk(self, vecs):
+        ret = self.func(self.to_array(vecs))
+        if isinstance(ret, tuple):
+            answers, metas = ret
+        else:
+            answers, metas = ret, [None] * len(vecs)
+        assert len(answers) == len(metas) == len(vecs)
+        return [(bool(ans), meta) for ans, meta in zip(answers, metas)]
@@ -0,0 +1,97 @@
+import time
+import logging
+
+from monolearn.SparseSet import SparseSet
+
+from .LowerSetLearn import Oracle
+
+
+class OracleCascade(Oracle):
+    """
+    Chain of partial tests ending with an exact oracle.
+
+    Each stage is a callable vec -> None (unknown) / bool / (bool, meta),
+    e.g. a cheap sufficient condition for lower
+    (returning True or None) or a cheap necessary condition for lower
+    (returning False or None).
+    The first definite answer is returned;
+    the last stage must always answer.
+    Caching and counters of Oracle apply to the whole chain.
+
+    Per-stage statistics are kept in n_stage_calls, n_stage_hits and
+    stage_time (indexed by the original stage order, see stats()).
+    With adaptive=True, the partial stages are reordered every
+    `reorder_every` queries by hits per second of evaluation
+    (the exact stage stays last).
+
+    >>> even = lambda vec: False if len(vec) % 2 else None
+    >>> oracle = OracleCascade([even, lambda vec: len(vec) < 3])
+    >>> oracle(SparseSet((0,))), oracle(SparseSet((0, 1)))
+    ((False, None), (True, None))
+    >>> [(s["calls"], s["hits"]) for s in oracle.stats()]
+    [(2, 1), (1, 1)]
+    """
+    log = logging.getLogger(f"{__name__}")
+
+    def __init__(self, stages, adaptive: bool = False,
+                 reorder_every: int = 1000):
+        super().__init__()
+        self.stages = list(stages)
+        assert self.stages, "at least the exact stage is required"
+        self.adaptive = adaptive
+        self.reorder_every = int(reorder_every)
+
+        n = len(self.stages)
+        self.order = list(range(n))
+        self.n_evaluated = 0
+        self.n_stage_calls = [0] * n
+        self.n_stage_hits = [0] * n
+        self.stage_time = [0.0] * n
+
+    def _query(self, vec: SparseSet):
+        self.n_evaluated += 1
+        if self.adaptive and self.n_evaluated % self.reorder_every == 0:
+            self.reorder()
+
+        last = len(self.stages) - 1
+        for i in self.order:
+            t0 = time.perf_counter()
+            ret = self.stages[i](vec)
+            self.stage_time[i] += time.perf_counter() - t0
+            self.n_stage_calls[i] += 1
+
+            if ret is None:
+                assert i != last, "the last stage must always answer"
+                continue
+            self.n_stage_hits[i] += 1
+            if isinstance(ret, tuple):
+                return ret
+            return bool(ret), None
+        assert 0
+
+    def efficiency(self, i):
+        """Hits per second of the stage (untried stages first)."""
+        if not self.n_stage_calls[i]:
+            return float("inf")
+        return self.n_stage_hits[i] / max(self.stage_time[i], 1e-9)
+
+    def reorder(self):
+        partial = sorted(self.order[:-1], key=self.efficiency, reverse=True)
+        order = partial + self.order[-1:]
+        if order != self.order:
+            self.log.debug(f"reordered stages: {order}")
+            self.order = order
+
+    def stats(self):
+        ret = []
+        for i in range(len(self.stages)):
+            calls = self.n_stage_calls[i]
+            ret.append(dict(
+                stage=i,
+                position=self.order.index(i),
+                calls=calls,
+                hits=self.n_stage_hits[i],
+                hit_rate=self.n_stage_hits[i] / calls if calls else 0.0,
+                latency=self.stage_time[i] / calls if calls else 0.0,
+            ))
+        return ret
@@ -0,0 +1,200 @@
+import time
+import logging
+
+from .utils import TimeStat
+from .LearnModule import LearnModule
+from .LevelLearn import LevelLearn
+from .GainanovSAT import GainanovSAT
+
+
+class Scheduler(LearnModule):
+    """
+    Adaptive combination of LevelLearn and GainanovSAT.
+
+    Strategies: next lower level, next upper level,
+    a chunk of GainanovSAT(sense="min") or GainanovSAT(sense="max") iterations.
+    Each strategy is tried once, then the one with the best
+    measured yield (new elements per oracle query,
+    ties broken by new elements per second) is run.
+    A strategy not run for `reprobe` steps is tried again
+    (its yield changes as the system grows).
+    Level generation on a side stops when the compatible fraction
+    of the last level falls below min_compatible,
+    when the side is exhausted,
+    or when the next level is estimated to be too large for the budget.
+    The SAT models are kept between chunks
+    (new elements reach them through the system listeners).
+
+    Stops when the system is complete or
+    the wall-clock (seconds) / oracle query / memory (MiB) budget
+    is exhausted (see LearnModule.set_budget).
+    All steps are recorded in self.history.
+    """
+    log = logging.getLogger(f"{__name__}")
+
+    STRATEGIES = ("levels_lower", "levels_upper", "sat_min", "sat_max")
+
+    def __init__(
+        self,
+        solver: str = None,
+        time_limit: float = None,
+        oracle_limit: int = None,
+        memory_limit: float = None,
+        min_compatible: float = 0.05,
+        chunk: int = 100,
+        max_level_size: int = 10**6,
+        save_rate: int = 100,
+        reprobe: int = 10,
+    ):
+        self.solver = solver
+        self.set_budget(
+            time=time_limit, oracle=oracle_limit, memory=memory_limit,
+        )
+        self.min_compatible = float(min_compatible)
+        self.chunk = int(chunk)
+        self.max_level_size = int(max_level_size)
+        self.save_rate = int(save_rate)
+        self.reprobe = int(reprobe)
+
+    def _learn(self):
+        self.levels = LevelLearn()
+        self.levels.init(system=self.system, oracle=self.oracle)
+        self.share_budget(self.levels)
+        self.sats = {}
+        self.disabled = set()
+        self.score = {}
+        self.scored_at = {}
+        self.history = []
+
+        try:
+            while not self.system.is_complete:
+                self.check_budget(n_queries=0)
+
+                name = self.choose()
+                if name is None:
+                    self.log.info("no strategies left")
+                    break
+                self.step(name)
+        finally:
+            for sat in self.sats.values():
+                sat.sat_snapshot()
+        return self.system.is_complete
+
+    def current_level(self):
+        for record in reversed(getattr(self, "history", ())):
+            if record.get("level") is not None:
+                return record["level"]
+
+    def available(self):
+        for name in self.STRATEGIES:
+            if name in self.disabled:
+                continue
+            if name == "levels_lower" and self.levels.exhausted_lower:
+                continue
+            if name == "levels_upper" and self.levels.exhausted_upper:
+                continue
+            yield name
+
+    def choose(self):
+        names = list(self.available())
+        if not names:
+            return
+        for name in names:
+            if name not in self.score:
+                return name
+        # stale scores are re-measured, the oldest first
+        stale = [
+            name for name in names
+            if len(self.history) - self.scored_at[name] >= self.reprobe
+        ]
+        if stale:
+            return min(stale, key=lambda name: self.scored_at[name])
+        return max(names, key=lambda name: self.score[name])
+
+    def step(self, name):
+        t0 = time.time()
+        q0 = self.n_queries()
+        p0 = self.system.n_lower() + self.system.n_upper()
+        sat_stat = TimeStat.Stat["GainanovSAT.find_new_unknown"]
+        s0 = sat_stat.total_time
+        extra = {}
+
+        if name.startswith("levels_"):
+            side = name[len("levels_"):]
+            if side == "lower":
+                stats = self.levels.step_lower()
+            else:
+                stats = self.levels.step_upper()
+            if stats is not None:
+                extra = stats
+                self.check_level(name, stats)
+        else:
+            sense = name[len("sat_"):]
+            sat = self.sats.get(sense)
+            if sat is None:
+                sat = GainanovSAT(
+                    sense=sense, solver=self.solver, save_rate=self.save_rate,
+                )
+                sat.init(system=self.system, oracle=self.oracle)
+                self.share_budget(sat)
+                self.sats[sense] = sat
+                if sat.prepare():
+                    self.disabled.add(name)
+            if name not in self.disabled:
+                itr = sat.itr
+                if sat.run(limit=self.chunk):
+                    self.disabled.add(name)
+                extra = dict(n_unknowns=sat.itr - itr, level=sat.level)
+
+        dt = time.time() - t0
+        dq = self.n_queries() - q0
+        dp = self.system.n_lower() + self.system.n_upper() - p0
+        s1 = sat_stat.total_time
+
+        self.score[name] = (dp / max(dq, 1), dp / max(dt, 1e-6))
+        self.scored_at[name] = len(self.history)
+        record = dict(
+            strategy=name,
+            primes=dp,
+            queries=dq,
+            time=dt,
+            primes_per_query=dp / dq if dq else 0,
+            sat_time=s1 - s0,
+            **extra,
+        )
+        if extra.get("n_unknowns"):
+            record["sat_time_per_unknown"] = (s1 - s0) / extra["n_unknowns"]
+        self.history.append(record)
+        self.log.info(
+            f"step {name}: +{dp} elements, {dq} queries, {dt:.2f}s "
+            f"({self.score[name][0]:.2f} el/query, "
+            f"{self.score[name][1]:.2f} el/s)"
+        )
+
+    def check_level(self, name, stats):
+        n_total = stats["n_total"]
+        n_good = stats["n_good"]
+        level = stats["level"]
+        frac = n_good / n_total if n_total else 0
+        if n_good and frac < self.min_compatible:
+            self.log.info(
+                f"{name}: compatible fraction {frac:.3f} collapsed, stopping"
+            )
+            self.disabled.add(name)
+            return
+
+        # candidates of the next level are neighbours of the compatible ones
+        if stats["side"] == "lower":
+            next_size = n_good * (self.N - level) / (level + 1)
+        else:
+            next_size = n_good * level / (self.N - level + 1)
+        limit = self.max_level_size
+        if self.oracle_limit is not None:
+            used = self.n_queries() - self._budget_start[1]
+            left = self.oracle_limit - used
+            limit = min(limit, left)
+        if next_size > limit:
+            self.log.info(
+                f"{name}: next level too large (~{next_size:.0f}), stopping"
+            )
+            self.disabled.add(name)
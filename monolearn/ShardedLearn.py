@@ -0,0 +1,234 @@
+import os
+import copy
+import logging
+import traceback
+import multiprocessing
+from itertools import product
+from multiprocessing.connection import wait
+
+from monolearn.SparseSet import SparseSet
+
+from .utils import TimeStat, maximal_sets, minimal_sets
+from .LearnModule import LearnModule
+from .LowerSetLearn import LowerSetLearn, Oracle
+
+
+class SubcubeOracle(Oracle):
+    """
+    Restriction of an oracle to the subcube given by fixed coordinates.
+    Vectors are over the free coordinates only (renumbered from 0).
+    """
+    def __init__(self, oracle, free, ones):
+        self.oracle = oracle
+        self.free = tuple(free)
+        self.ones = SparseSet(ones)
+        super().__init__()
+
+    def lift(self, vec: SparseSet):
+        return self.ones | [self.free[i] for i in vec]
+
+    def _query(self, vec: SparseSet):
+        return self.oracle(self.lift(vec))
+
+
+class ShardSystem(LowerSetLearn):
+    """
+    System of a single shard (subcube).
+    Forwards every new element (lifted to the full space) to the coordinator.
+    """
+    def __init__(self, n, oracle: SubcubeOracle, conn):
+        self.oracle = oracle
+        self.conn = conn
+        super().__init__(n=n)
+
+    def add_lower(self, vec, meta=None, is_prime=False, normalize=True):
+        if not self.is_known_lower(vec):
+            self.conn.send(("lower", self.oracle.lift(vec), meta))
+        super().add_lower(
+            vec, meta=meta, is_prime=is_prime, normalize=normalize,
+        )
+
+    def add_upper(self, vec, meta=None, is_prime=False, normalize=True):
+        if not self.is_known_upper(vec):
+            self.conn.send(("upper", self.oracle.lift(vec), meta))
+        super().add_upper(
+            vec, meta=meta, is_prime=is_prime, normalize=normalize,
+        )
+
+
+def _shard_worker(conn, system, oracle, modules, fixed):
+    free = [i for i in range(system.n) if i not in set(fixed)]
+    index = {j: i for i, j in enumerate(free)}
+
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+
+        try:
+            ones = SparseSet(j for j, v in zip(fixed, task) if v)
+            zeros = SparseSet(j for j, v in zip(fixed, task) if not v)
+
+            suboracle = SubcubeOracle(oracle, free=free, ones=ones)
+            subsystem = ShardSystem(len(free), suboracle, conn)
+
+            # restrict known elements of the full system to the subcube
+            # (silently, without sending them back)
+            for vec in system.iter_lower():
+                if ones <= vec:
+                    LowerSetLearn.add_lower(
+                        subsystem,
+                        SparseSet(index[j] for j in vec if j in index),
+                    )
+            for vec in system.iter_upper():
+                if not (zeros & vec):
+                    LowerSetLearn.add_upper(
+                        subsystem,
+                        SparseSet(index[j] for j in vec if j in index),
+                    )
+
+            for module in modules:
+                module = copy.deepcopy(module)
+                module.init(system=subsystem, oracle=suboracle)
+                module.learn()
+
+            conn.send((
+                "done", task,
+                subsystem.is_complete_lower, subsystem.is_complete_upper,
+                suboracle.n_queries,
+            ))
+        except BaseException:
+            conn.send(("error", task, traceback.format_exc()))
+            raise
+
+
+class ShardedLearn(LearnModule):
+    """
+    Coordinator splitting the cube into 2^k disjoint subcubes
+    by fixing k coordinates to 0/1.
+    Each subcube is learnt by the given modules in a worker process,
+    the discovered elements are streamed back through pipes.
+
+    The prime elements of the function are exactly the maximal (minimal)
+    elements among the lifted primes of all shards,
+    so the merged result is minimized before adding to the system.
+
+    Uses "fork" processes when available,
+    so that the oracle does not need to be picklable.
+    """
+    log = logging.getLogger(f"{__name__}")
+
+    def __init__(
+        self,
+        modules,
+        n_fixed: int = 2,
+        n_workers: int = None,
+        fixed=None,
+    ):
+        if isinstance(modules, LearnModule):
+            modules = [modules]
+        self.modules = list(modules)
+        self.fixed = None if fixed is None else tuple(map(int, fixed))
+        self.n_fixed = int(n_fixed) if fixed is None else len(self.fixed)
+        self.n_workers = int(n_workers or os.cpu_count() or 1)
+
+    @TimeStat.log
+    def _learn(self):
+        assert self.system.extra_prec is None, \
+            "sharding is not supported with extra_prec"
+        assert self.system.symmetry is None, \
+            "sharding is not supported with symmetry"
+
+        fixed = self.fixed
+        if fixed is None:
+            fixed = tuple(range(min(self.n_fixed, self.N)))
+
+        tasks = list(product(range(2), repeat=len(fixed)))
+        self.log.info(
+            f"sharding on coordinates {fixed}: {len(tasks)} subcubes, "
+            f"{self.n_workers} workers"
+        )
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context("fork")
+        else:
+            ctx = multiprocessing.get_context()
+
+        workers = {}
+        for _ in range(min(self.n_workers, len(tasks))):
+            conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(
+                target=_shard_worker,
+                args=(child_conn, self.system, self.oracle, self.modules, fixed),
+                daemon=True,
+            )
+            proc.start()
+            child_conn.close()
+            workers[conn] = proc
+
+        lower = {}
+        upper = {}
+        complete_lower = complete_upper = True
+        n_done = 0
+        try:
+            for conn in workers:
+                if tasks:
+                    conn.send(tasks.pop())
+
+            n_tasks = 2**len(fixed)
+            while n_done < n_tasks:
+                for conn in wait(list(workers)):
+                    msg = conn.recv()
+                    kind = msg[0]
+                    if kind == "lower":
+                        lower.setdefault(msg[1], msg[2])
+                    elif kind == "upper":
+                        upper.setdefault(msg[1], msg[2])
+                    elif kind == "done":
+                        _, task, is_lower, is_upper, n_queries = msg
+                        complete_lower &= is_lower
+                        complete_upper &= is_upper
+                        n_done += 1
+                        self.log.info(
+                            f"shard {task} done ({n_done}/{n_tasks}): "
+                            f"{n_queries} queries, "
+                            f"lower {len(lower)} upper {len(upper)} so far"
+                        )
+                        if tasks:
+                            conn.send(tasks.pop())
+                    elif kind == "error":
+                        raise RuntimeError(
+                            f"shard {msg[1]} failed:\n{msg[2]}"
+                        )
+        finally:
+            for conn, proc in workers.items():
+                try:
+                    conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+            for conn, proc in workers.items():
+                proc.join(timeout=1)
+                if proc.is_alive():
+                    proc.terminate()
+                conn.close()
+
+        self.merge(lower, upper)
+
+        if complete_lower:
+            self.system.set_complete_lower()
+        if complete_upper:
+            self.system.set_complete_upper()
+
+    def merge(self, lower: dict, upper: dict):
+        new_lower = maximal_sets(lower)
+        new_upper = minimal_sets(upper)
+        self.log.info(
+            f"merged shards: lower {len(lower)} -> {len(new_lower)}, "
+            f"upper {len(upper)} -> {len(new_upper)}"
+        )
+        for vec in new_lower:
+            self.n_lower += 1
+            self.system.add_lower(vec, meta=lower[vec], is_prime=True)
+        for vec in new_upper:
+            self.n_upper += 1
+            self.system.add_upper(vec, meta=upper[vec], is_prime=True)
@@ -0,0 +1,202 @@
+import time
+import threading
+
+from monolearn.SparseSet import SparseSet
+
+from .LowerSetLearn import Oracle
+from .Trace import Tracer
+
+
+class SharedOracle(Oracle):
+    """
+    Thread-safe wrapper of an oracle shared by concurrent learners.
+
+    - the caches and counters of the wrapped oracle are updated under a lock;
+    - single-flight: concurrent calls on the same vector wait for
+      one evaluation (counted in n_coalesced);
+    - micro-batching (batch_window in seconds): requests arriving within
+      the window (up to batch_size) are evaluated by one call to
+      the wrapped oracle's _query_many, by a background thread.
+    """
+    def __init__(self, oracle: Oracle, batch_window: float = None,
+                 batch_size: int = 1024):
+        super().__init__()
+        self.oracle = oracle
+        self.lock = threading.Lock()
+        self._inflight = {}
+        self._share()
+        self.n_coalesced = 0
+        self.n_batches = 0
+
+        self.batch_window = batch_window
+        self.batch_size = int(batch_size)
+        self._batch = []
+        self._batch_cond = threading.Condition(self.lock)
+        self._batcher = None
+        self._closed = False
+
+    def _share(self):
+        # the caches are the ones of the wrapped oracle (e.g. for LevelLearn)
+        self._lower_cache, self._upper_cache, self._cache = self.oracle.data
+
+    @property
+    def data(self):
+        return self.oracle.data
+
+    @data.setter
+    def data(self, data):
+        with self.lock:
+            self.oracle.data = data
+            self._share()
+
+    def get_meta_many(self, vecs):
+        with self.lock:
+            n_meta = self.oracle.n_meta
+            ret = self.oracle.get_meta_many(vecs)
+            self.n_meta += self.oracle.n_meta - n_meta
+            return ret
+
+    def disable_cache(self):
+        with self.lock:
+            self.oracle.disable_cache()
+            self._share()
+
+    def enable_inference(self, limit: int = 100000):
+        with self.lock:
+            self.oracle.enable_inference(limit=limit)
+
+    def clean(self, levels=True, main=True):
+        with self.lock:
+            self.oracle.clean(levels=levels, main=main)
+            self._share()
+
+    def add_to_level(self, is_lower: bool, vec: SparseSet, meta=None):
+        with self.lock:
+            self.oracle.add_to_level(is_lower, vec, meta)
+
+    def set_level_range(self, is_lower: bool, start: int, end: int):
+        with self.lock:
+            self.oracle.set_level_range(is_lower, start, end)
+
+    def __call__(self, vec: SparseSet):
+        return self.call_many([vec])[0]
+
+    # split calls (see Oracle.begin): the whole call is thread-safe,
+    # and counted when evaluated
+    def begin(self, vec: SparseSet):
+        return None
+
+    def evaluate(self, vec: SparseSet):
+        return self(vec)
+
+    def finish(self, vec: SparseSet, ret, latency: float = 0.0):
+        pass
+
+    def call_many(self, vecs):
+        from concurrent.futures import Future
+
+        t0 = time.perf_counter()
+        futures = []
+        owned = []
+        with self.lock:
+            for vec in vecs:
+                self.n_calls += 1
+                self.oracle.n_calls += 1
+                n_inferred = self.oracle.n_inferred
+                ret = self.oracle._lookup(vec)
+                self.n_inferred += self.oracle.n_inferred - n_inferred
+                if ret is not None:
+                    futures.append(ret)
+                    continue
+
+                future = self._inflight.get(vec)
+                if future is None:
+                    future = self._inflight[vec] = Future()
+                    owned.append((vec, future))
+                    self.n_queries += 1
+                    self.oracle.n_queries += 1
+                else:
+                    self.n_coalesced += 1
+                futures.append(future)
+
+            if owned and self.batch_window is not None:
+                self._start_batcher()
+                self._batch.extend(owned)
+                self._batch_cond.notify()
+                owned = []
+
+        if owned:
+            self._evaluate(owned)
+
+        rets = [
+            future.result() if isinstance(future, Future) else future
+            for future in futures
+        ]
+
+        tracer = Tracer.active
+        if tracer is not None:
+            latency = time.perf_counter() - t0
+            for vec, future, ret in zip(vecs, futures, rets):
+                if tracer.sample("query"):
+                    cached = not isinstance(future, Future)
+                    self._trace_query(
+                        tracer, vec, ret,
+                        latency=0.0 if cached else latency,
+                        cached=cached,
+                    )
+        return rets
+
+    def _evaluate(self, batch):
+        vecs = [vec for vec, _ in batch]
+        try:
+            rets = self.oracle._query_many(vecs)
+        except BaseException as err:
+            with self.lock:
+                for vec, future in batch:
+                    del self._inflight[vec]
+            for vec, future in batch:
+                future.set_exception(err)
+            return
+
+        with self.lock:
+            self.n_batches += 1
+            for (vec, future), ret in zip(batch, rets):
+                self.oracle._store(vec, ret)
+                del self._inflight[vec]
+        for (vec, future), ret in zip(batch, rets):
+            future.set_result(ret)
+
+    def _start_batcher(self):
+        if self._batcher is None:
+            self._batcher = threading.Thread(
+                target=self._batch_loop, daemon=True,
+            )
+            self._batcher.start()
+
+    def _batch_loop(self):
+        while True:
+            with self.lock:
+                while not self._batch and not self._closed:
+                    self._batch_cond.wait()
+                if self._closed and not self._batch:
+                    return
+
+                # collect more requests within the window
+                deadline = time.monotonic() + self.batch_window
+                while len(self._batch) < self.batch_size and not self._closed:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._batch_cond.wait(left)
+
+                batch = self._batch[:self.batch_size]
+                del self._batch[:self.batch_size]
+            self._evaluate(batch)
+
+    def close(self):
+        with self.lock:
+            self._closed = True
+            self._batch_cond.notify()
+        if self._batcher is not None:
+            self._batcher.join()
+            self._batcher = None
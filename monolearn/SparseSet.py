@@ -1,3 +1,4 @@
+from bisect import bisect_left
 from itertools import chain
 
 
@@ -13,6 +14,11 @@ class SparseSet(tuple):
                 assert a < b
         return self
 
+    @classmethod
+    def _unchecked(cls, items):
+        """Build from an already sorted duplicate-free sequence of ints."""
+        return tuple.__new__(cls, items)
+
     def _coerce(self, other):
         if isinstance(other, (list, set, tuple)):
             return SparseSet(other)
@@ -153,15 +159,164 @@ class SparseSet(tuple):
         >>> sorted(SparseSet((1, 2, 5)).neibs_down(), key=str)
         [SparseSet((1, 2)), SparseSet((1, 5)), SparseSet((2, 5))]
         """
-        for v in self:
-            yield self - v
+        new = SparseSet._unchecked
+        for k in range(len(self)):
+            yield new(self[:k] + self[k+1:])
 
     def neibs_up(self, n):
         """
         >>> sorted(SparseSet((1, 2)).neibs_up(4), key=str)
         [SparseSet((0, 1, 2)), SparseSet((1, 2, 3))]
         """
-        me = set(self)
+        new = SparseSet._unchecked
+        k = 0
+        for v in range(n):
+            if k < len(self) and self[k] == v:
+                k += 1
+                continue
+            yield new(self[:k] + (v,) + self[k:])
+
+    def iter_missing(self, n):
+        """
+        >>> list(SparseSet((1, 2, 5)).iter_missing(7))
+        [0, 3, 4, 6]
+        """
+        k = 0
         for v in range(n):
-            if v not in me:
-                yield self | v
+            if k < len(self) and self[k] == v:
+                k += 1
+                continue
+            yield v
+
+
+class WorkVector:
+    """
+    Mutable working vector for walks over the Boolean lattice.
+    Flips are done in place on a sorted list,
+    SparseSets are built only when needed (e.g. a candidate is queried
+    or a result is kept), directly from the sorted data
+    without re-sorting and validation.
+    Candidates are tried in place too: push() flips a coordinate
+    and undo() reverts the last push, so that a candidate costs one
+    copy (its SparseSet) instead of slicing and concatenating the list.
+
+    >>> w = WorkVector(SparseSet((1, 4)))
+    >>> w.flip(2); w.flip(4); w.add(7); w.add(1)
+    >>> w.freeze()
+    SparseSet((1, 2, 7))
+    >>> w.with_added(0), w.with_removed(2), 2 in w, 3 in w, len(w)
+    (SparseSet((0, 1, 2, 7)), SparseSet((1, 7)), True, False, 3)
+    >>> w.push(3); w.push(7); w.freeze()
+    SparseSet((1, 2, 3))
+    >>> w.undo(); w.undo(); w.freeze()
+    SparseSet((1, 2, 7))
+    >>> sorted(w.neibs_down(), key=str)
+    [SparseSet((1, 2)), SparseSet((1, 7)), SparseSet((2, 7))]
+    """
+    __slots__ = ("items", "_undo")
+
+    def __init__(self, vec=()):
+        if isinstance(vec, SparseSet):
+            self.items = list(vec)
+        else:
+            self.items = list(SparseSet(vec))
+        # (position, removed value or None if inserted) of the pushes
+        self._undo = []
+
+    def __contains__(self, v):
+        items = self.items
+        k = bisect_left(items, v)
+        return k < len(items) and items[k] == v
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def add(self, v):
+        items = self.items
+        k = bisect_left(items, v)
+        if k == len(items) or items[k] != v:
+            items.insert(k, v)
+
+    def discard(self, v):
+        items = self.items
+        k = bisect_left(items, v)
+        if k < len(items) and items[k] == v:
+            del items[k]
+
+    def flip(self, v):
+        items = self.items
+        k = bisect_left(items, v)
+        if k < len(items) and items[k] == v:
+            del items[k]
+        else:
+            items.insert(k, v)
+
+    def push(self, v):
+        """Flip v, revertible by undo()."""
+        items = self.items
+        k = bisect_left(items, v)
+        if k < len(items) and items[k] == v:
+            del items[k]
+            self._undo.append((k, v))
+        else:
+            items.insert(k, v)
+            self._undo.append((k, None))
+
+    def undo(self):
+        """Revert the last push()."""
+        k, v = self._undo.pop()
+        if v is None:
+            del self.items[k]
+        else:
+            self.items.insert(k, v)
+
+    def freeze(self):
+        return SparseSet._unchecked(self.items)
+
+    def with_added(self, v):
+        """Frozen upper neighbour (v must not be in the vector)."""
+        self.push(v)
+        vec = self.freeze()
+        self.undo()
+        return vec
+
+    def with_removed(self, v):
+        """Frozen lower neighbour (v must be in the vector)."""
+        self.push(v)
+        vec = self.freeze()
+        self.undo()
+        return vec
+
+    def neibs_up(self, n):
+        """
+        Upper neighbours, built in place
+        (the vector must not change during the iteration).
+
+        >>> list(WorkVector((1, 2)).neibs_up(4))
+        [SparseSet((0, 1, 2)), SparseSet((1, 2, 3))]
+        """
+        items = self.items
+        new = SparseSet._unchecked
+        k = 0
+        for v in range(n):
+            if k < len(items) and items[k] == v:
+                k += 1
+                continue
+            items.insert(k, v)
+            yield new(items)
+            del items[k]
+
+    def neibs_down(self):
+        """Lower neighbours, built in place (see neibs_up)."""
+        items = self.items
+        new = SparseSet._unchecked
+        for k in range(len(items)):
+            v = items.pop(k)
+            yield new(items)
+            items.insert(k, v)
+
+    def iter_missing(self, n):
+        return self.freeze().iter_missing(n)
@@ -0,0 +1,114 @@
+from monolearn.SparseSet import SparseSet
+from monolearn.utils import truncstr
+
+
+class OrbitTooLarge(ValueError):
+    pass
+
+
+class Symmetry:
+    """
+    Group of coordinate permutations (given by generators)
+    under which the learnt function is invariant.
+
+    Vectors are represented by canonical orbit representatives
+    (the lexicographically smallest image),
+    computed by enumerating the orbit and cached for all its elements
+    (up to cache_limit vectors).
+    Orbits are enumerated explicitly, so their size is bounded by
+    orbit_limit (OrbitTooLarge is raised beyond it): large groups
+    such as the full S_n should be given by smaller subgroups.
+
+    >>> shift = Symmetry(4, [(1, 2, 3, 0)])  # i -> i + 1 mod 4
+    >>> shift.canonical(SparseSet((2, 3)))
+    SparseSet((0, 1))
+    >>> sorted(shift.orbit(SparseSet((0, 2))), key=tuple)
+    [SparseSet((0, 2)), SparseSet((1, 3))]
+    """
+    def __init__(
+        self, n: int, generators,
+        cache_limit: int = 10**6, orbit_limit: int = 10**5,
+    ):
+        self.n = int(n)
+        self.generators = tuple(tuple(map(int, perm)) for perm in generators)
+        for perm in self.generators:
+            assert sorted(perm) == list(range(self.n)), "not a permutation"
+        self.cache_limit = int(cache_limit)
+        self.orbit_limit = int(orbit_limit)
+        self._canonical = {}
+
+    def apply(self, perm, vec: SparseSet):
+        return SparseSet._unchecked(sorted(perm[i] for i in vec))
+
+    def orbit(self, vec: SparseSet):
+        """
+        All images of vec (including vec).
+
+        >>> swap, shift = (1, 0, 2, 3, 4, 5), (1, 2, 3, 4, 5, 0)
+        >>> full = Symmetry(6, [swap, shift], orbit_limit=10)
+        >>> len(full.orbit(SparseSet((0, 1, 2, 3, 4))))
+        6
+        >>> full.orbit(SparseSet((0, 1, 2)))
+        Traceback (most recent call last):
+        ...
+        monolearn.Symmetry.OrbitTooLarge: orbit of 0,1,2 exceeds orbit_limit=10
+        """
+        seen = {vec}
+        todo = [vec]
+        while todo:
+            cur = todo.pop()
+            for perm in self.generators:
+                img = self.apply(perm, cur)
+                if img not in seen:
+                    seen.add(img)
+                    todo.append(img)
+            if len(seen) > self.orbit_limit:
+                raise OrbitTooLarge(
+                    f"orbit of {truncstr(vec)} exceeds "
+                    f"orbit_limit={self.orbit_limit}"
+                )
+        return seen
+
+    def transpositions(self):
+        """
+        Transpositions (i, j), i < j, known to be in the group:
+        the generators that are transpositions and their conjugates
+        by the generators (g (i j) g^-1 = (g(i) g(j))).
+
+        >>> swap, shift = (1, 0, 2, 3), (1, 2, 3, 0)
+        >>> sorted(Symmetry(4, [swap, shift]).transpositions())
+        [(0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3)]
+        >>> Symmetry(4, [shift]).transpositions()
+        set()
+        """
+        todo = []
+        for perm in self.generators:
+            moved = [i for i in range(self.n) if perm[i] != i]
+            if len(moved) == 2:
+                todo.append(tuple(moved))
+        seen = set(todo)
+        while todo:
+            i, j = todo.pop()
+            for perm in self.generators:
+                pair = tuple(sorted((perm[i], perm[j])))
+                if pair not in seen:
+                    seen.add(pair)
+                    todo.append(pair)
+        return seen
+
+    def canonical(self, vec: SparseSet):
+        ret = self._canonical.get(vec)
+        if ret is not None:
+            return ret
+
+        orbit = self.orbit(vec)
+        ret = min(orbit, key=tuple)
+        if len(self._canonical) + len(orbit) > self.cache_limit:
+            self._canonical.clear()
+        for img in orbit:
+            self._canonical[img] = ret
+        return ret
+
+    def key(self):
+        """Identification of the group (e.g. for caches)."""
+        return [list(perm) for perm in self.generators]
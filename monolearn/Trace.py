@@ -0,0 +1,187 @@
+import json
+import time
+import struct
+import logging
+
+
+# event: ((field, struct code), ...); "e" is an enumerated string (ENUMS)
+EVENTS = {
+    "query": (
+        ("weight", "I"), ("is_lower", "?"), ("latency", "d"), ("cached", "?"),
+    ),
+    "sat": (("assumptions", "I"), ("time", "d"), ("result", "?")),
+    "save": (("bytes", "Q"), ("time", "d")),
+    "level": (
+        ("side", "e"), ("level", "I"), ("n_total", "Q"), ("n_good", "Q"),
+    ),
+}
+ENUMS = {
+    "side": ("lower", "upper"),
+}
+
+
+class TraceSink:
+    """Destination of trace events (name, timestamp, fields)."""
+    def write(self, event: str, t: float, fields: dict):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class JSONLSink(TraceSink):
+    """One JSON object per line."""
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.f = open(filename, "w")
+
+    def write(self, event, t, fields):
+        self.f.write(json.dumps(dict(event=event, t=t, **fields)) + "\n")
+
+    def close(self):
+        self.f.close()
+
+
+class BinarySink(TraceSink):
+    """
+    Compact fixed-size records:
+    a JSON header line describing the events (see EVENTS),
+    followed by little-endian (event id: u8, t: f64, fields...) records.
+    """
+    MAGIC = "monolearn-trace"
+    VERSION = 1
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.f = open(filename, "wb")
+        self.formats = {}
+        names = sorted(EVENTS)
+        for event_id, event in enumerate(names):
+            fmt = "<Bd" + "".join(
+                "B" if code == "e" else code for _, code in EVENTS[event]
+            )
+            self.formats[event] = event_id, struct.Struct(fmt)
+        header = dict(
+            magic=self.MAGIC,
+            version=self.VERSION,
+            events=[[event, EVENTS[event]] for event in names],
+            enums=ENUMS,
+        )
+        self.f.write(json.dumps(header).encode() + b"\n")
+
+    def write(self, event, t, fields):
+        event_id, fmt = self.formats[event]
+        values = []
+        for field, code in EVENTS[event]:
+            value = fields[field]
+            if code == "e":
+                value = ENUMS[field].index(value)
+            values.append(value)
+        self.f.write(fmt.pack(event_id, t, *values))
+
+    def close(self):
+        self.f.close()
+
+
+def read_trace(filename: str):
+    """Iterate over the events (dicts) of a JSONL or binary trace file."""
+    with open(filename, "rb") as f:
+        first = f.readline()
+        if not first:
+            return
+        header = json.loads(first)
+        if header.get("magic") != BinarySink.MAGIC:
+            yield header
+            for line in f:
+                yield json.loads(line)
+            return
+
+        enums = header["enums"]
+        events = []
+        for event, fields in header["events"]:
+            fmt = "<Bd" + "".join(
+                "B" if code == "e" else code for _, code in fields
+            )
+            events.append((event, fields, struct.Struct(fmt)))
+        data = f.read()
+
+    pos = 0
+    while pos < len(data):
+        event, fields, fmt = events[data[pos]]
+        values = fmt.unpack_from(data, pos)
+        pos += fmt.size
+        ret = dict(event=event, t=values[1])
+        for (field, code), value in zip(fields, values[2:]):
+            if code == "e":
+                value = enums[field][value]
+            ret[field] = value
+        yield ret
+
+
+class Tracer:
+    """
+    Structured event stream of learning runs
+    (oracle queries, SAT solves, saves, level transitions, see EVENTS).
+
+    At most one tracer is active (Tracer.active, like TimeStat.Stat);
+    instrumented code only checks it for None,
+    so disabled tracing costs nothing.
+    `sample` maps events to rates in (0, 1]:
+    every round(1/rate)-th event of the kind is written
+    (e.g. {"query": 0.01} for cheap oracles, to keep the overhead low);
+    n_seen counts all the events.
+
+    >>> sink = TraceSink()
+    >>> sink.write = lambda event, t, fields: print(event, fields)
+    >>> with Tracer(sink, sample={"query": 0.5}) as tracer:
+    ...     for i in range(4):
+    ...         if tracer.sample("query"):
+    ...             tracer.emit("query", weight=i)
+    query {'weight': 0}
+    query {'weight': 2}
+    >>> tracer.n_seen["query"]
+    4
+    """
+    active = None
+    log = logging.getLogger(f"{__name__}")
+
+    def __init__(self, sink, sample: dict = None):
+        if isinstance(sink, str):
+            if sink.endswith(".jsonl"):
+                sink = JSONLSink(sink)
+            else:
+                sink = BinarySink(sink)
+        self.sink = sink
+        self.strides = {}
+        for event, rate in (sample or {}).items():
+            assert event in EVENTS, event
+            assert 0 < rate <= 1, rate
+            self.strides[event] = max(1, round(1 / rate))
+        self.n_seen = {event: 0 for event in EVENTS}
+
+    def start(self):
+        if Tracer.active is not None and Tracer.active is not self:
+            self.log.warning("replacing the active tracer")
+        Tracer.active = self
+        return self
+
+    def stop(self):
+        if Tracer.active is self:
+            Tracer.active = None
+        self.sink.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def sample(self, event: str):
+        """Count the event, return True if it should be emitted."""
+        n = self.n_seen[event]
+        self.n_seen[event] = n + 1
+        stride = self.strides.get(event)
+        return stride is None or n % stride == 0
+
+    def emit(self, event: str, **fields):
+        self.sink.write(event, time.time(), fields)
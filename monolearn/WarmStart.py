@@ -0,0 +1,108 @@
+import logging
+
+from .utils import TimeStat, SubsumptionIndex
+from .LearnModule import LearnModule
+from .LowerSetLearn import LowerSetLearn
+
+
+class WarmStart(LearnModule):
+    """
+    Seed the system with the elements of a previous system
+    (of a closely related function), as hypotheses:
+
+    - all previous elements are re-verified by batched oracle calls
+      (call_oracle_many, batch_size vectors at a time);
+    - confirmed elements are added as they are
+      (with maximize=True, lower ones are lifted to primes by learn_up
+      and upper ones reduced by learn_down);
+    - violated elements are repaired: a previous lower element that is
+      now upper is reduced to a minimal upper by learn_down,
+      a previous upper element that is now lower is lifted by learn_up
+      (unless already dominated by the known elements).
+
+    The following modules (e.g. GainanovSAT) start from the seeded system;
+    confirmed elements that are not primes of the new function
+    remain stored until LowerSetLearn.minimize().
+    `previous` is a LowerSetLearn or a file name of a saved system.
+    """
+    log = logging.getLogger(f"{__name__}")
+
+    def __init__(self, previous, batch_size: int = 1024,
+                 maximize: bool = False):
+        self.previous = previous
+        self.batch_size = int(batch_size)
+        self.maximize = maximize
+        self._lower_index = self._upper_index = None
+
+    @TimeStat.log
+    def _learn(self):
+        previous = self.previous
+        if isinstance(previous, str):
+            previous = LowerSetLearn(n=self.N, file=previous)
+        assert previous.n == self.N
+
+        hyps = [(True, vec) for vec in previous.iter_lower()]
+        hyps += [(False, vec) for vec in previous.iter_upper()]
+        self.log.info(
+            f"warm start: verifying {previous.n_lower()} lower, "
+            f"{previous.n_upper()} upper hypotheses"
+        )
+
+        self.n_confirmed = 0
+        self.n_violated = 0
+        todo = []
+        for i in range(0, len(hyps), self.batch_size):
+            batch = hyps[i:i+self.batch_size]
+            # query in the form used by the learners
+            vecs = [self.reduce(vec) for _, vec in batch]
+            rets = self.call_oracle_many(vecs)
+            for (was_lower, vec), (is_lower, meta) in zip(batch, rets):
+                if is_lower != was_lower:
+                    self.n_violated += 1
+                    todo.append((vec, is_lower, meta))
+                    continue
+
+                self.n_confirmed += 1
+                if self.maximize:
+                    todo.append((vec, is_lower, meta))
+                elif is_lower:
+                    self.add_lower(vec, meta)
+                else:
+                    self.add_upper(vec, meta)
+
+        # chains start from vectors not dominated by known elements
+        # (as the unknowns of the SAT model are)
+        self._lower_index = SubsumptionIndex(self.system.iter_lower_full())
+        self._upper_index = SubsumptionIndex(self.system.iter_upper_full())
+        try:
+            for vec, is_lower, meta in todo:
+                if is_lower:
+                    if not self._lower_index.has_superset(vec):
+                        self.n_lower += 1
+                        self.learn_up(vec, meta)
+                elif not self._upper_index.has_subset(vec):
+                    self.n_upper += 1
+                    self.learn_down(vec, meta)
+        finally:
+            self._lower_index = self._upper_index = None
+        # confirmed elements may be dominated by the repaired ones
+        self.system.minimize()
+
+        self.log.info(
+            f"warm start: {self.n_confirmed} confirmed, "
+            f"{self.n_violated} violated (repaired), "
+            f"system lower {self.system.n_lower()} "
+            f"upper {self.system.n_upper()}"
+        )
+
+    def _on_system_add(self, is_lower, vec):
+        super()._on_system_add(is_lower, vec)
+        index = self._lower_index if is_lower else self._upper_index
+        if index is not None:
+            for img in self.system.orbit(vec):
+                index.add(img)
+
+    def reduce(self, vec):
+        if self.use_point_prec:
+            return self.system.extra_prec.reduce(vec)
+        return vec
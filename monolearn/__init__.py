@@ -1,12 +1,64 @@
-from .LowerSetLearn import (
-    LowerSetLearn,
-    Oracle, OracleFunction, OracleFunctionWithMeta,
-    ExtraPrec, ExtraPrec_LowerSet,
-)
+"""
+The solver backends (and asyncio, thread pools) are imported
+only when used, so that e.g. reading saved systems does not load
+SAT/MILP solvers.
+
+The classes named as their submodules are imported here: the import
+system binds a loaded submodule on the package under its name,
+which would hide a class of the same name resolved on demand.
+The other exports are resolved on first access (PEP 562).
+"""
+from importlib import import_module
+
+from .LowerSetLearn import LowerSetLearn
+from .Symmetry import Symmetry
+from .OracleCascade import OracleCascade
+from .AsyncOracle import AsyncOracle
+from .SharedOracle import SharedOracle
 from .LearnModule import LearnModule
 
 from .LevelLearn import LevelLearn
 # from .RandomLearn import RandomLearn, RandomLower, RandomUpper
 from .GainanovSAT import GainanovSAT
+from .ShardedLearn import ShardedLearn
+from .Scheduler import Scheduler
+from .WarmStart import WarmStart
+from .DenseLearn import DenseLearn
 
+# learning modules, by name
 Modules = {cls.__name__: cls for cls in LearnModule.__subclasses__()}
+
+_EXPORTS = {
+    "Oracle": "LowerSetLearn",
+    "OracleFunction": "LowerSetLearn",
+    "OracleFunctionWithMeta": "LowerSetLearn",
+    "OracleFunctionLazyMeta": "LowerSetLearn",
+    "OracleBatchFunction": "LowerSetLearn",
+    "ExtraPrec": "LowerSetLearn",
+    "ExtraPrec_LowerSet": "LowerSetLearn",
+    "OrbitTooLarge": "Symmetry",
+    "Tracer": "Trace",
+    "TraceSink": "Trace",
+    "JSONLSink": "Trace",
+    "BinarySink": "Trace",
+    "read_trace": "Trace",
+    "merge_systems": "merge",
+}
+
+__all__ = sorted(set(_EXPORTS) | {
+    "LowerSetLearn", "Symmetry", "OracleCascade", "AsyncOracle",
+    "SharedOracle", "LearnModule", "Modules",
+} | set(Modules))
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = import_module(f".{_EXPORTS[name]}", __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,150 @@
+"""
+Merging of saved systems of the same function
+(e.g. runs on several machines with different seeds / time limits)
+into one minimized system:
+
+    python -m monolearn.merge -o merged.bz2 -j 4 run1.bz2 run2.bz2 ...
+
+Each file is parsed incrementally (LowerSetLearn._load_stream)
+and reduced to its own maximal lower / minimal upper elements
+(sorted-by-weight SubsumptionIndex, see maximal_sets / minimal_sets),
+in worker processes with -j > 1.
+The union of the reduced sets is then minimized again;
+completeness flags are combined by any()
+(one complete file determines the function),
+meta is taken from the first file (in the given order) that has it.
+"""
+import bz2
+import logging
+import argparse
+
+from .utils import JSONStreamReader, maximal_sets, minimal_sets
+from .LowerSetLearn import LowerSetLearn
+
+
+log = logging.getLogger(f"{__name__}")
+
+
+def read_minimized(filename: str):
+    """
+    Load a saved system as a dict,
+    keeping only its maximal lower / minimal upper elements
+    (and their meta).
+    """
+    with bz2.open(filename, "rt") as f:
+        (
+            version,
+            lower, upper,
+            is_complete_lower, is_complete_upper,
+            meta, n,
+        ) = LowerSetLearn._load_stream(JSONStreamReader(f))
+
+    n_stored = len(lower), len(upper)
+    lower = maximal_sets(lower)
+    upper = minimal_sets(upper)
+    meta = {
+        vec: meta[vec] for vec in lower + upper if meta.get(vec) is not None
+    }
+    return dict(
+        filename=filename,
+        n=n,
+        lower=lower,
+        upper=upper,
+        meta=meta,
+        is_complete_lower=is_complete_lower,
+        is_complete_upper=is_complete_upper,
+        n_stored=n_stored,
+    )
+
+
+def merge_systems(
+    filenames,
+    output: str = None,
+    processes: int = 1,
+    extra_prec=None,
+    symmetry=None,
+):
+    """
+    Merge saved systems (file names) into a new LowerSetLearn,
+    saved to `output` if given.
+    extra_prec / symmetry must be the ones used by the runs
+    (symmetric images are taken into account in the final minimization).
+    """
+    filenames = list(filenames)
+    assert filenames, "nothing to merge"
+
+    if processes > 1 and len(filenames) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(processes) as executor:
+            return _merge(
+                executor.map(read_minimized, filenames),
+                output, extra_prec, symmetry,
+            )
+    return _merge(
+        map(read_minimized, filenames), output, extra_prec, symmetry,
+    )
+
+
+def _merge(parts, output, extra_prec, symmetry):
+    system = None
+    n_conflicts = 0
+    for part in parts:
+        log.info(
+            f"{part['filename']}: lower {part['n_stored'][0]} "
+            f"-> {len(part['lower'])}, upper {part['n_stored'][1]} "
+            f"-> {len(part['upper'])}"
+        )
+        if system is None:
+            system = LowerSetLearn(
+                n=part["n"], extra_prec=extra_prec, symmetry=symmetry,
+            )
+        assert part["n"] == system.n, \
+            f"{part['filename']}: n={part['n']} != {system.n}"
+
+        system._lower.update(part["lower"])
+        system._upper.update(part["upper"])
+        for vec, meta in part["meta"].items():
+            prev = system.meta.setdefault(vec, meta)
+            if prev != meta:
+                n_conflicts += 1
+        system.is_complete_lower |= part["is_complete_lower"]
+        system.is_complete_upper |= part["is_complete_upper"]
+
+    both = system._lower & system._upper
+    if both:
+        raise ValueError(
+            f"inconsistent systems: {len(both)} elements "
+            "are both lower and upper"
+        )
+    if n_conflicts:
+        log.warning(f"{n_conflicts} elements with different meta, kept first")
+
+    system.minimize()
+    system.clean()
+    system.saved = False
+    if output:
+        system.file = output
+        system.save()
+    else:
+        system.log_info()
+    return system
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge and minimize saved LowerSetLearn systems.",
+    )
+    parser.add_argument("files", nargs="+", help="saved systems (.bz2)")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument(
+        "-j", "--processes", type=int, default=1,
+        help="number of worker processes loading the files",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    merge_systems(args.files, output=args.output, processes=args.processes)
+
+
+if __name__ == "__main__":
+    main()
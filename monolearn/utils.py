@@ -1,11 +1,12 @@
+import os
+import sys
 import json
 import math
+import inspect
 import time
 import logging
 from functools import wraps
 
-from binteger import Bin
-
 from monolearn.SparseSet import SparseSet
 
 log = logging.getLogger(__name__)
@@ -36,7 +37,9 @@ def dictify(obj):
         return {"t": type(obj).__name__, "l": tuple(map(dictify, obj))}
     if isinstance(obj, list) and not type(obj) == list:
         return {"t": type(obj).__name__, "l": list(map(dictify, obj))}
-    if isinstance(obj, Bin):
+    # binteger is imported lazily: if it is not loaded, obj is not a Bin
+    binteger = sys.modules.get("binteger")
+    if binteger is not None and isinstance(obj, binteger.Bin):
         return {"t": "Bin", "x": obj.int, "n": obj.n}
 
     if isinstance(obj, dict):
@@ -60,6 +63,7 @@ def undictify(obj):
         elif t == "set":
             return set(map(undictify, obj["l"]))
         elif t == "Bin":
+            from binteger import Bin
             return Bin(obj["x"], obj["n"])
         elif t in CLASSES:
             return CLASSES[t](obj["l"])
@@ -92,6 +96,344 @@ def loads(s):
     return undictify(json.loads(s))
 
 
+class JSONStreamReader:
+    """
+    Incremental reader of a JSON document from a text stream.
+
+    Only the outer structure is walked manually (arrays, objects),
+    the leaves are decoded one by one by the C decoder,
+    so that at most one leaf value is buffered at a time.
+
+    >>> from io import StringIO
+    >>> r = JSONStreamReader(StringIO('[1, {"a": [2, 3]}, 45]'), chunk_size=2)
+    >>> it = r.iter_array()
+    >>> next(it), r.value()
+    (None, 1)
+    >>> next(it), [(key, r.value()) for key in r.iter_object()]
+    (None, [('a', [2, 3])])
+    >>> next(it), r.value()
+    (None, 45)
+    >>> list(it)
+    []
+    """
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = int(chunk_size)
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        chunk = self.f.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            buf = self.buf
+            pos = self.pos
+            while pos < len(buf) and buf[pos] in " \t\n\r":
+                pos += 1
+            self.pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        got = self.peek()
+        if got != char:
+            raise ValueError(
+                f"JSON stream: expected {char!r}, got {got!r} at {self.pos}"
+            )
+        self.pos += 1
+
+    def value(self):
+        """Decode one complete JSON value at the current position."""
+        size = self.chunk_size
+        while True:
+            self.peek()
+            try:
+                obj, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                # value is split across chunks, grow to avoid quadratic time
+                self._fill(size)
+                size *= 2
+                continue
+            # a number may continue in the next chunk
+            if end == len(self.buf) and not self.eof and self._fill(size):
+                continue
+            self.pos = end
+            return obj
+
+    def iter_array(self):
+        """
+        Iterate over an array, yielding None before each element.
+        The caller must consume the element (value(), iter_array(), ...).
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield None
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"JSON stream: bad array separator {char!r}")
+
+    def iter_object(self):
+        """
+        Iterate over an object, yielding its keys.
+        The caller must consume the value after each key.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"JSON stream: bad object separator {char!r}")
+
+
+def iter_undictify(reader: JSONStreamReader):
+    """
+    Stream the elements of a dictified set/list/dict from the reader,
+    undictifying them one at a time
+    (dicts are yielded as (key, value) pairs).
+
+    >>> from io import StringIO
+    >>> from monolearn.SparseSet import SparseSet
+    >>> s = dumps([{SparseSet((1, 2))}, {SparseSet((3,)): 5}])
+    >>> r = JSONStreamReader(StringIO(s))
+    >>> [list(iter_undictify(r)) for _ in r.iter_array()]
+    [[SparseSet((1, 2))], [(SparseSet((3,)), 5)]]
+    """
+    if reader.peek() == "[":
+        for _ in reader.iter_array():
+            yield undictify(reader.value())
+        return
+
+    t = None
+    for key in reader.iter_object():
+        if key == "t":
+            t = reader.value()
+        elif key == "l" and t == "set":
+            for _ in reader.iter_array():
+                yield undictify(reader.value())
+        elif key == "d" and t == "dict":
+            for _ in reader.iter_array():
+                k, v = reader.value()
+                yield undictify(k), undictify(v)
+        else:
+            raise TypeError(f"Can not stream type {t} (key {key})")
+
+
+class SubsumptionIndex:
+    """
+    Set of SparseSets indexed by coordinates,
+    answering "is there a stored superset/subset of vec" queries.
+
+    >>> idx = SubsumptionIndex([(0, 1, 2), (2, 3)])
+    >>> idx.has_superset(SparseSet((0, 2))), idx.has_superset((1, 3))
+    (True, False)
+    >>> idx.has_subset(SparseSet((1, 2, 3))), idx.has_subset((0, 1, 3))
+    (True, False)
+    """
+    def __init__(self, vecs=()):
+        self.vecs = set()
+        self.by_coord = {}
+        for vec in vecs:
+            self.add(vec)
+
+    def __len__(self):
+        return len(self.vecs)
+
+    def __iter__(self):
+        return iter(self.vecs)
+
+    def __contains__(self, vec):
+        return vec in self.vecs
+
+    def add(self, vec):
+        vec = _as_sparse(vec)
+        if vec in self.vecs:
+            return
+        self.vecs.add(vec)
+        for i in vec:
+            self.by_coord.setdefault(i, set()).add(vec)
+
+    def remove(self, vec):
+        self.vecs.remove(vec)
+        for i in vec:
+            group = self.by_coord[i]
+            group.discard(vec)
+            if not group:
+                del self.by_coord[i]
+
+    def supersets(self, vec):
+        """
+        Stored supersets of vec.
+
+        >>> idx = SubsumptionIndex([(0, 1, 2), (2, 3), (1, 2)])
+        >>> sorted(idx.supersets(SparseSet((1, 2))), key=tuple)
+        [SparseSet((0, 1, 2)), SparseSet((1, 2))]
+        """
+        if not vec:
+            return set(self.vecs)
+        groups = []
+        for i in vec:
+            group = self.by_coord.get(i)
+            if not group:
+                return set()
+            groups.append(group)
+        groups.sort(key=len)
+        return groups[0].intersection(*groups[1:])
+
+    def subsets(self, vec):
+        """
+        Stored subsets of vec.
+
+        >>> idx = SubsumptionIndex([(0, 1, 2), (2, 3), (1, 2), ()])
+        >>> sorted(idx.subsets(SparseSet((1, 2, 3))), key=tuple)
+        [SparseSet(()), SparseSet((1, 2)), SparseSet((2, 3))]
+        """
+        empty = SparseSet(())
+        res = {empty} if empty in self.vecs else set()
+        counts = {}
+        for i in vec:
+            for cand in self.by_coord.get(i, ()):
+                cnt = counts.get(cand, 0) + 1
+                if cnt == len(cand):
+                    res.add(cand)
+                counts[cand] = cnt
+        return res
+
+    def has_superset(self, vec, strict=False):
+        if not vec:
+            if strict:
+                return any(self.vecs)
+            return bool(self.vecs)
+        groups = []
+        for i in vec:
+            group = self.by_coord.get(i)
+            if not group:
+                return False
+            groups.append(group)
+        groups.sort(key=len)
+        cands = groups[0]
+        for group in groups[1:]:
+            cands = cands & group
+            if not cands:
+                return False
+        if strict:
+            return any(len(cand) > len(vec) for cand in cands)
+        return bool(cands)
+
+    def has_subset(self, vec, strict=False):
+        empty = SparseSet(())
+        if empty in self.vecs and (vec or not strict):
+            return True
+        counts = {}
+        for i in vec:
+            for cand in self.by_coord.get(i, ()):
+                cnt = counts.get(cand, 0) + 1
+                if cnt == len(cand) and (cnt < len(vec) or not strict):
+                    return True
+                counts[cand] = cnt
+        return False
+
+
+def _as_sparse(vec):
+    return vec if isinstance(vec, SparseSet) else SparseSet(vec)
+
+
+def maximal_sets(vecs):
+    """
+    Maximal elements (by inclusion) of the given collection.
+
+    >>> sorted(maximal_sets([(1,), (0, 1, 2), (1, 2), (3,), ()]), key=tuple)
+    [SparseSet((0, 1, 2)), SparseSet((3,))]
+    """
+    vecs = sorted(set(map(_as_sparse, vecs)), key=len, reverse=True)
+    index = SubsumptionIndex()
+    for vec in vecs:
+        if not index.has_superset(vec):
+            index.add(vec)
+    return list(index)
+
+
+def minimal_sets(vecs):
+    """
+    Minimal elements (by inclusion) of the given collection.
+
+    >>> sorted(minimal_sets([(1,), (0, 1, 2), (1, 2), (0, 3), (2, 3)]), key=tuple)
+    [SparseSet((0, 3)), SparseSet((1,)), SparseSet((2, 3))]
+    """
+    vecs = sorted(set(map(_as_sparse, vecs)), key=len)
+    index = SubsumptionIndex()
+    for vec in vecs:
+        if not index.has_subset(vec):
+            index.add(vec)
+    return list(index)
+
+
+def binomial(n, k):
+    """
+    >>> binomial(5, 2), binomial(3, 4), binomial(4, 0)
+    (10, 0, 1)
+    """
+    if not 0 <= k <= n:
+        return 0
+    k = min(k, n - k)
+    res = 1
+    for i in range(k):
+        res = res * (n - i) // (i + 1)
+    return res
+
+
+def memory_mb():
+    """
+    Current resident memory of the process in MiB
+    (from /proc/self/statm, None if unavailable).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def peak_memory_mb():
+    """Peak resident memory of the process in MiB (None if unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    if sys.platform == "darwin":
+        return rss / 2**20
+    return rss / 2**10
+
 
 class TimeStat:
     Stat = {}
@@ -141,6 +483,17 @@ class TimeStat:
         else:
             cls.Stat[name] = cls()
 
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def time_coro(*args, **kwargs):
+                t0 = time.time()
+                ret = await func(*args, **kwargs)
+                t = time.time() - t0
+
+                cls.Stat[name].add(time=t)
+                return ret
+            return time_coro
+
         @wraps(func)
         def time_func(*args, **kwargs):
             t0 = time.time()
@@ -156,6 +509,7 @@ class TimeStat:
 
 
 if __name__ == '__main__':
+    from binteger import Bin
     o = [SparseSet((1, 2, 3)), Bin(100, 10)]
     print(o)
     o = loads(dumps(o))
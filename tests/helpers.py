@@ -0,0 +1,24 @@
+"""Helpers shared by the tests."""
+
+from random import randrange, sample
+
+from monolearn import LowerSetLearn, OracleFunction
+
+
+def random_tops(n, n_tops):
+    return [set(sample(range(n), randrange(n // 2 + 1))) for _ in range(n_tops)]
+
+
+def random_oracle(n, n_tops):
+    """Lower set generated by random maximal elements (tops)."""
+    tops = random_tops(n, n_tops)
+    return OracleFunction(lambda vec: any(set(vec) <= top for top in tops))
+
+
+def learn(n, oracle, modules):
+    """Run the modules in order on a fresh system."""
+    system = LowerSetLearn(n=n)
+    for module in modules:
+        module.init(system=system, oracle=oracle)
+        module.learn()
+    return system
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from random import seed, sample
+
+from monolearn import OracleFunction
+from monolearn import GainanovSAT, LevelLearn
+from monolearn.AsyncOracle import AsyncOracle
+from monolearn.utils import TimeStat
+
+from .helpers import learn, random_tops
+
+
+class StubServer:
+    """Local server answering "is the vector below one of the tops"."""
+
+    def __init__(self, tops, delay=0.001):
+        self.tops = tops
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run, args=(started,), daemon=True
+        )
+        self.thread.start()
+        started.wait()
+
+    def _run(self, started):
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self.handle, "127.0.0.1", 0)
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        started.set()
+        self.loop.run_forever()
+
+    async def handle(self, reader, writer):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            line = await reader.readline()
+            vec = {int(v) for v in line.decode().split()}
+            await asyncio.sleep(self.delay)
+            ans = any(vec <= top for top in self.tops)
+            writer.write(b"1\n" if ans else b"0\n")
+            await writer.drain()
+        finally:
+            self.active -= 1
+            writer.close()
+
+    async def _close(self):
+        self.server.close()
+        tasks = [
+            task for task in asyncio.all_tasks()
+            if task is not asyncio.current_task()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+class StubOracle(AsyncOracle):
+    def __init__(self, port, **kwargs):
+        self.port = port
+        super().__init__(**kwargs)
+
+    async def _query(self, vec):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(" ".join(map(str, vec)).encode() + b"\n")
+        await writer.drain()
+        line = await reader.readline()
+        writer.close()
+        return line == b"1\n", None
+
+
+def test_async_oracle():
+    seed(123)
+    n = 14
+    tops = random_tops(n, 10)
+
+    stat = TimeStat.Stat["LearnModule.aquery"]
+    n_timed = stat.n_calls
+    server = StubServer(tops)
+    try:
+        oracle = StubOracle(server.port, max_inflight=8)
+        system = learn(n, oracle, [
+            LevelLearn(levels_lower=3),
+            GainanovSAT(solver="pysat/cadical153"),
+        ])
+    finally:
+        server.stop()
+
+    ref = learn(n, OracleFunction(lambda v: any(set(v) <= t for t in tops)), [
+        GainanovSAT(solver="pysat/cadical153"),
+    ])
+    assert system.is_complete
+    assert set(system.iter_lower()) == set(ref.iter_lower())
+    assert set(system.iter_upper()) == set(ref.iter_upper())
+    assert 1 < server.max_active <= 8
+    assert not oracle._inflight
+    # the async climb queries are timed as the sync ones
+    assert stat.n_calls > n_timed
+
+
+def test_speculation_cancelled():
+    seed(321)
+    n = 12
+    tops = [set(sample(range(n), n // 2)) for _ in range(4)]
+    server = StubServer(tops, delay=0.01)
+    try:
+        oracle = StubOracle(server.port, max_inflight=n)
+        system = learn(n, oracle, [GainanovSAT(solver="pysat/cadical153")])
+    finally:
+        server.stop()
+    assert system.is_complete
+    assert oracle.n_cancelled > 0
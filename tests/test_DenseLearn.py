@@ -0,0 +1,43 @@
+from random import randrange, seed, sample
+
+import pytest
+
+from monolearn import LowerSetLearn, OracleFunction, GainanovSAT, DenseLearn
+from monolearn.SparseSet import SparseSet
+
+
+def test_int_conversion():
+    n = 10
+    d = DenseLearn()
+    d.init(system=LowerSetLearn(n=n), oracle=OracleFunction(lambda vec: True))
+    assert d.to_int(SparseSet((0,))) == 1 << (n - 1)
+    for _ in range(100):
+        vec = SparseSet(sample(range(n), randrange(n + 1)))
+        x = d.to_int(vec)
+        assert bin(x).count("1") == len(vec)
+        assert d.from_int(x) == vec
+
+
+def test_dense_learn():
+    # requires the optional dependency (monolearn[dense])
+    pytest.importorskip("subsets")
+    seed(47)
+    n = 12
+    for _ in range(5):
+        tops = [set(sample(range(n), randrange(n))) for _ in range(6)]
+        oracle = OracleFunction(lambda vec: any(set(vec) <= t for t in tops))
+
+        ref = LowerSetLearn(n=n)
+        g = GainanovSAT(solver="pysat/cadical153")
+        g.init(system=ref, oracle=oracle)
+        g.learn()
+
+        for sense in ("min", "max", None):
+            for climb in (True, False):
+                system = LowerSetLearn(n=n)
+                d = DenseLearn(sense=sense, climb=climb, batch=16)
+                d.init(system=system, oracle=oracle)
+                d.learn()
+                assert system.is_complete
+                assert set(system.iter_lower()) == set(ref.iter_lower())
+                assert set(system.iter_upper()) == set(ref.iter_upper())
@@ -3,9 +3,11 @@ logging.basicConfig(level=logging.DEBUG)
 
 from random import randrange, seed
 
+import pytest
 from binteger import Bin
 
-from subsets import DenseSet
+# optional dependency (monolearn[dense])
+DenseSet = pytest.importorskip("subsets").DenseSet
 
 from monolearn import LowerSetLearn, OracleFunction
 from monolearn import GainanovSAT
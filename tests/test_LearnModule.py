@@ -0,0 +1,605 @@
+import sys
+import copy
+import threading
+from random import randrange, seed, sample
+from itertools import combinations
+
+from monolearn import LowerSetLearn, OracleFunction, ExtraPrec_LowerSet
+from monolearn import GainanovSAT, LevelLearn, Scheduler, WarmStart
+from monolearn.SparseSet import SparseSet
+from monolearn.ClauseCache import ClauseCache, ClauseRecords
+
+from .helpers import random_oracle
+
+
+def test_sat_cache(tmp_path):
+    seed(123)
+    n = 12
+    filename = str(tmp_path / "system.bz2")
+    oracle = random_oracle(n, 10)
+
+    system = LowerSetLearn(n=n, file=filename)
+    g = GainanovSAT(solver="pysat/cadical153", limit=10)
+    g.init(system=system, oracle=oracle)
+    g.learn()
+    assert not system.is_complete
+    n_elements = system.n_lower() + system.n_upper()
+
+    system = LowerSetLearn(n=n, file=filename)
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=system, oracle=oracle)
+    g.learn()
+    assert g.n_sat_cached == n_elements
+    assert system.is_complete
+
+    ref = LowerSetLearn(n=n)
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=ref, oracle=oracle)
+    g.learn()
+    assert set(ref.iter_lower()) == set(system.iter_lower())
+    assert set(ref.iter_upper()) == set(system.iter_upper())
+
+    # snapshot updated at the end of learning
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=LowerSetLearn(n=n, file=filename), oracle=oracle)
+    g.sat_init()
+    assert g.n_sat_cached == ref.n_lower() + ref.n_upper()
+
+
+def test_clause_cache(tmp_path):
+    filename = str(tmp_path / "system.bz2.sat")
+    cache = ClauseCache(filename, header=dict(n=8))
+    a, b = SparseSet((1, 2)), SparseSet((0, 5, 7))
+    records = ClauseRecords()
+    records.add_element(True, a)
+    records.add_clause((1, 4, 5))
+    records.add_element(False, b)
+    records.add_clause((-1, -6, -8))
+    records.add_clause(())
+    cache.save(records)
+
+    # keyed by the encoded elements, in any order
+    loaded = ClauseRecords()
+    loaded.add_element(False, b)
+    loaded.add_element(True, a)
+    assert cache.load(loaded)
+    assert loaded.n_clauses == 3
+    assert list(loaded.clauses()) == [[1, 4, 5], [-1, -6, -8], []]
+
+    other = ClauseRecords()
+    other.add_element(True, a)
+    assert not cache.load(other)
+    other.add_element(True, b)
+    assert not cache.load(other)
+    other.remove_element(True, b)
+    other.add_element(False, b)
+    assert cache.load(other)
+
+    assert not ClauseCache(filename, header=dict(n=9)).load(loaded)
+    with open(filename, "rb+") as f:
+        f.truncate(f.seek(0, 2) - 16)
+    assert not cache.load(loaded)
+    with open(filename, "rb+") as f:
+        f.truncate(f.seek(0, 2) - 4)
+    assert not cache.load(loaded)
+
+
+def test_sat_cache_prec(tmp_path):
+    n, prec = point_prec_system(m=5, k=2)
+    filename = str(tmp_path / "system.bz2")
+    system = LowerSetLearn(n=n, file=filename, extra_prec=prec)
+    system.add_lower(SparseSet((3,)))
+    system.save()
+
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.use_point_prec = True
+    g.init(system=system, oracle=None)
+    g.sat_init()
+    assert g.n_sat_cached == 0
+    g.init(system=system, oracle=None)
+    g.sat_init()
+    assert g.n_sat_cached == 1
+
+    # a different point order does not reuse the cached clauses
+    pts = [
+        tuple(int(i in sub) for i in range(5))
+        for w in range(3) for sub in combinations(range(5), w)
+    ]
+    pts[1], pts[-1] = pts[-1], pts[1]
+    prec = ExtraPrec_LowerSet(pts, {pt: i for i, pt in enumerate(pts)})
+    system = LowerSetLearn(n=n, file=filename, extra_prec=prec)
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.use_point_prec = True
+    g.init(system=system, oracle=None)
+    g.sat_init()
+    assert g.n_sat_cached == 0
+
+
+def test_incremental_clauses():
+    seed(321)
+    n = 10
+    oracle = random_oracle(n, 5)
+    system = LowerSetLearn(n=n)
+
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=system, oracle=oracle)
+    g.sat_init()
+    n_clauses = g.sat.n_clauses
+
+    # another learner adds elements, the running model receives them
+    level = LevelLearn(levels_lower=3)
+    level.init(system=system, oracle=oracle)
+    level.learn()
+    assert system.n_upper()
+    assert g.sat.n_clauses == n_clauses + system.n_upper()
+
+
+def test_minimize_init():
+    n = 8
+    system = LowerSetLearn(n=n)
+    system.add_lower(SparseSet((0, 1, 2)), meta="a")
+    system.add_lower(SparseSet((0, 1)), meta="b")
+    system.add_lower(SparseSet((2,)))
+    system.add_lower(SparseSet((3, 4)))
+    system.add_upper(SparseSet((5,)), meta="c")
+    system.add_upper(SparseSet((5, 6)), meta="d")
+    system.add_upper(SparseSet((3, 6, 7)))
+
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=system, oracle=None)
+    g.sat_init()
+    assert g.n_init_eliminated == 3
+    assert set(system.iter_lower()) == {
+        SparseSet((0, 1, 2)), SparseSet((3, 4)),
+    }
+    assert set(system.iter_upper()) == {
+        SparseSet((5,)), SparseSet((3, 6, 7)),
+    }
+    assert system.meta == {SparseSet((0, 1, 2)): "a", SparseSet((5,)): "c"}
+
+
+def test_speculative_climb():
+    seed(777)
+    n = 14
+    oracle = random_oracle(n, 12)
+
+    ref = LowerSetLearn(n=n)
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=ref, oracle=oracle)
+    g.learn()
+
+    oracle.clean()
+    system = LowerSetLearn(n=n)
+    g = GainanovSAT(solver="pysat/cadical153").set_speculation(4)
+    g.init(system=system, oracle=oracle)
+    g.learn()
+    assert system.is_complete
+    assert set(system.iter_lower()) == set(ref.iter_lower())
+    assert set(system.iter_upper()) == set(ref.iter_upper())
+    assert g.n_mispredicted > 0
+
+
+def test_speculative_climb_bookkeeping():
+    seed(778)
+    n = 14
+    tops = [set(sample(range(n), randrange(n // 2 + 1))) for _ in range(12)]
+    main = threading.current_thread()
+    threads = set()
+
+    class Recording(OracleFunction):
+        def _store(self, vec, ret):
+            # caches are updated by the learner's thread only
+            assert threading.current_thread() is main
+            super()._store(vec, ret)
+
+    def func(vec):
+        threads.add(threading.current_thread())
+        return any(set(vec) <= top for top in tops)
+
+    oracle = Recording(func)
+    system = LowerSetLearn(n=n)
+    g = GainanovSAT(solver="pysat/cadical153").set_speculation(4)
+    g.set_budget(oracle=30)
+    g.init(system=system, oracle=oracle)
+    g.learn()
+    assert g.budget_exceeded
+    assert threads - {main}
+    assert oracle.n_queries <= 30
+
+
+def test_scheduler():
+    seed(555)
+    n = 14
+    oracle = random_oracle(n, 15)
+
+    ref = LowerSetLearn(n=n)
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=ref, oracle=oracle)
+    g.learn()
+
+    oracle.clean()
+    system = LowerSetLearn(n=n)
+    s = Scheduler(solver="pysat/cadical153", chunk=10)
+    s.init(system=system, oracle=oracle)
+    s.learn()
+    assert system.is_complete
+    assert set(system.iter_lower()) == set(ref.iter_lower())
+    assert set(system.iter_upper()) == set(ref.iter_upper())
+    assert {step["strategy"] for step in s.history} >= {
+        "levels_lower", "sat_min",
+    }
+
+    oracle.clean()
+    system = LowerSetLearn(n=n)
+    s = Scheduler(solver="pysat/cadical153", chunk=5, oracle_limit=50)
+    q0 = oracle.n_queries
+    s.init(system=system, oracle=oracle)
+    s.learn()
+    assert not system.is_complete
+    assert sum(step["queries"] for step in s.history) <= 50
+    assert oracle.n_queries - q0 <= 50
+
+
+def test_scheduler_choose():
+    s = Scheduler(reprobe=3)
+    s.disabled = set()
+    s.levels = LevelLearn()
+    s.levels.exhausted_lower = s.levels.exhausted_upper = True
+    s.history = [{}] * 3
+    # per query first, per second only breaks ties
+    s.score = {"sat_min": (2.0, 10.0), "sat_max": (3.0, 1.0)}
+    s.scored_at = {"sat_min": 2, "sat_max": 1}
+    assert s.choose() == "sat_max"
+    s.score["sat_min"] = (3.0, 10.0)
+    assert s.choose() == "sat_min"
+    # not run for 3 steps
+    s.history = [{}] * 4
+    assert s.choose() == "sat_max"
+
+
+def test_budget(tmp_path):
+    seed(777)
+    n = 14
+    filename = str(tmp_path / "system.bz2")
+    oracle = random_oracle(n, 15)
+
+    reports = []
+    system = LowerSetLearn(n=n, file=filename)
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.set_budget(oracle=30).set_progress(0, callback=reports.append)
+    g.init(system=system, oracle=oracle)
+    assert g.learn() is False
+    assert g.budget_exceeded
+    assert oracle.n_queries <= 30
+    assert not system.is_complete
+    assert reports and 0 < reports[-1]["unknown"] < 1
+    assert reports[-1]["queries"] == oracle.n_queries
+    # the estimate uses indexes kept up to date between reports
+    lower, upper = g._progress_index
+    assert set(lower) >= set(system.iter_lower())
+    assert set(upper) >= set(system.iter_upper())
+
+    # saved on stop, continued without a budget
+    system = LowerSetLearn(n=n, file=filename)
+    assert system.n_lower() + system.n_upper() > 0
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=system, oracle=oracle)
+    g.learn()
+    assert system.is_complete
+    # progress is off by default
+    assert g._progress_index is None
+    assert g.estimate_unknown() == 0
+
+    system = LowerSetLearn(n=n)
+    lv = LevelLearn(levels_lower=n).set_budget(time=0)
+    lv.init(system=system, oracle=oracle)
+    lv.learn()
+    assert lv.budget_exceeded.startswith("time")
+
+
+
+def test_memory_budget(monkeypatch):
+    seed(778)
+    n = 12
+    oracle = random_oracle(n, 10)
+    module = sys.modules["monolearn.LearnModule"]
+    rss = [500.0]
+    calls = []
+
+    def memory_mb():
+        calls.append(1)
+        return rss[0]
+    monkeypatch.setattr(module, "memory_mb", memory_mb)
+
+    system = LowerSetLearn(n=n)
+    lv = LevelLearn(levels_lower=n).set_budget(memory=400)
+    lv.init(system=system, oracle=oracle)
+    assert lv.learn() is False
+    assert lv.budget_exceeded.startswith("memory")
+
+    # memory freed: the next module is not stopped by the earlier peak;
+    # memory is measured periodically, not on every query
+    rss[0] = 300.0
+    del calls[:]
+    g = GainanovSAT(solver="pysat/cadical153").set_budget(memory=400)
+    g.init(system=system, oracle=oracle)
+    g.learn()
+    assert not g.budget_exceeded
+    assert system.is_complete
+    assert 1 <= len(calls) < oracle.n_queries
+
+def point_prec_system(m, k):
+    pts = [
+        tuple(int(i in sub) for i in range(m))
+        for w in range(k + 1) for sub in combinations(range(m), w)
+    ]
+    prec = ExtraPrec_LowerSet(pts, {pt: i for i, pt in enumerate(pts)})
+    return len(pts), prec
+
+
+def test_implications():
+    n, prec = point_prec_system(m=6, k=3)
+
+    def func(vec):
+        # union of the points (closure invariant, monotone)
+        union = set().union(*(prec.int2point[i] for i in vec))
+        return len(union) <= 3 and not {0, 1} <= union
+
+    calls = []
+    prec = copy.copy(prec)
+    for name in ("expand", "reduce"):
+        def wrapped(vec, func=getattr(prec, name)):
+            calls.append(vec)
+            return func(vec)
+        setattr(prec, name, wrapped)
+
+    systems = []
+    for use_implications in (False, True):
+        del calls[:]
+        system = LowerSetLearn(n=n, extra_prec=prec)
+        g = GainanovSAT(solver="pysat/cadical153")
+        g.use_implications = use_implications
+        g.init(system=system, oracle=OracleFunction(func))
+        g.learn()
+        assert system.is_complete
+        systems.append(system)
+    # the closed models need no expand / reduce
+    assert not calls
+
+    # the same lower primes; upper primes are minimal among closed sets,
+    # so the implications mode does not store redundant ones
+    assert set(systems[0].iter_lower()) == set(systems[1].iter_lower())
+    assert systems[1].n_upper() < systems[0].n_upper()
+
+    def is_lower(system, vec):
+        vec = prec.expand(vec)
+        lower = any(vec <= v for v in system.iter_lower())
+        upper = any(v <= vec for v in system.iter_upper())
+        assert lower != upper
+        return lower
+
+    seed(99)
+    for _ in range(200):
+        vec = SparseSet(sample(range(n), randrange(5)))
+        assert is_lower(systems[0], vec) == is_lower(systems[1], vec) \
+            == func(vec)
+
+
+def test_segment_encoding(tmp_path):
+    seed(404)
+    n = 100
+    tops = [set(sample(range(n), randrange(1, 6))) for _ in range(10)]
+    oracle = OracleFunction(lambda vec: any(set(vec) <= top for top in tops))
+
+    systems = []
+    for encoding in ("direct", "segment"):
+        system = LowerSetLearn(n=n, file=str(tmp_path / f"{encoding}.bz2"))
+        g = GainanovSAT(sense="min", solver="pysat/cadical153")
+        g.lower_encoding = encoding
+        g.init(system=system, oracle=oracle)
+        g.learn()
+        assert system.is_complete
+        systems.append(system)
+
+        size = sum(len(g.clause_exclude_sub(v)) for v in system.iter_lower())
+        if encoding == "direct":
+            direct_size = size
+    assert set(systems[0].iter_lower()) == set(systems[1].iter_lower())
+    assert set(systems[0].iter_upper()) == set(systems[1].iter_upper())
+    assert size * 4 < direct_size
+
+    # clauses reused from the cache with the same encoding
+    system = LowerSetLearn(n=n, file=str(tmp_path / "segment.bz2"))
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.lower_encoding = "segment"
+    g.init(system=system, oracle=oracle)
+    g.sat_init()
+    assert g.n_sat_cached == system.n_lower() + system.n_upper()
+    assert g.sat.solve() is False
+
+
+def test_warm_start():
+    seed(45)
+    n = 24
+    tops = [set(sample(range(n), randrange(4, 12))) for _ in range(12)]
+
+    def learn(tops, *modules):
+        oracle = OracleFunction(lambda vec: any(set(vec) <= t for t in tops))
+        system = LowerSetLearn(n=n)
+        for module in modules:
+            module.init(system=system, oracle=oracle)
+            module.learn()
+        assert system.is_complete
+        return system, oracle.n_queries
+
+    system1, _ = learn(tops, GainanovSAT(solver="pysat/cadical153"))
+
+    # change one of the tops
+    tops2 = tops[1:] + [set(sample(range(n), 8))]
+    cold, cold_calls = learn(tops2, GainanovSAT(solver="pysat/cadical153"))
+    warm = WarmStart(previous=system1, batch_size=16)
+    system2, warm_calls = learn(
+        tops2, warm, GainanovSAT(solver="pysat/cadical153"),
+    )
+    assert warm.n_violated > 0
+    system2.minimize()
+    assert set(system2.iter_lower()) == set(cold.iter_lower())
+    assert set(system2.iter_upper()) == set(cold.iter_upper())
+    assert warm_calls < cold_calls
+
+
+def test_level_search():
+    n = 20
+    big = set(range(15))
+    oracle = OracleFunction(lambda vec: not big <= set(vec))
+
+    n_solves = {}
+    for level_search in ("linear", "gallop"):
+        # lower elements known, the only unknowns are far from level 0
+        system = LowerSetLearn(n=n)
+        for i in big:
+            system.add_lower(SparseSet(set(range(n)) - {i}))
+        g = GainanovSAT(
+            sense="min", solver="pysat/cadical153", level_search=level_search,
+        )
+        g.init(system=system, oracle=oracle)
+        calls = []
+
+        def sat_solve(assumptions=(), solve=g.sat_solve):
+            calls.append(len(assumptions))
+            return solve(assumptions=assumptions)
+        g.sat_solve = sat_solve
+        g.learn()
+        assert system.is_complete
+        assert set(system.iter_upper()) == {SparseSet(big)}
+        n_solves[level_search] = len(calls)
+    assert n_solves["gallop"] * 2 < n_solves["linear"]
+
+    seed(49)
+    oracle = random_oracle(16, 6)
+    for sense in ("min", "max"):
+        systems = []
+        for level_search in ("linear", "gallop"):
+            system = LowerSetLearn(n=16)
+            g = GainanovSAT(
+                sense=sense, solver="pysat/cadical153",
+                level_search=level_search,
+            )
+            g.init(system=system, oracle=oracle)
+            g.learn()
+            systems.append(system)
+        assert set(systems[0].iter_lower()) == set(systems[1].iter_lower())
+        assert set(systems[0].iter_upper()) == set(systems[1].iter_upper())
+
+
+def test_level_window():
+    seed(50)
+    n = 14
+    oracle = random_oracle(n, 10)
+
+    ref = LowerSetLearn(n=n)
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=ref, oracle=oracle)
+    g.learn()
+    ref_lower = set(ref.iter_lower())
+    ref_upper = set(ref.iter_upper())
+
+    for window in (dict(window_lower=(3, 6)), dict(window_upper=(4, 9))):
+        oracle.clean()
+        system = LowerSetLearn(n=n)
+        # a few known elements to filter the levels with
+        g = GainanovSAT(solver="pysat/cadical153", limit=3)
+        g.init(system=system, oracle=oracle)
+        g.learn()
+        n_known = system.n_lower() + system.n_upper()
+
+        q0 = oracle.n_queries
+        lv = LevelLearn(solver="pysat/cadical153", window_batch=16, **window)
+        lv.init(system=system, oracle=oracle)
+        lv.learn()
+        assert system.n_lower() + system.n_upper() > n_known
+        assert [s["level"] for s in lv.level_stats] == (
+            [3, 4, 5, 6] if "window_lower" in window else [9, 8, 7, 6, 5, 4]
+        )
+        assert oracle.n_queries - q0 < sum(
+            s["n_total"] for s in lv.level_stats
+        )
+        for vec in system.iter_lower():
+            assert any(vec <= top for top in ref_lower)
+        for vec in system.iter_upper():
+            assert any(bot <= vec for bot in ref_upper)
+        # primes found inside the window
+        assert ref_lower & set(system.iter_lower()) \
+            or ref_upper & set(system.iter_upper())
+
+        g = GainanovSAT(solver="pysat/cadical153")
+        g.init(system=system, oracle=oracle)
+        g.learn()
+        system.minimize()
+        assert set(system.iter_lower()) == ref_lower
+        assert set(system.iter_upper()) == ref_upper
+
+
+def test_level_window_seed():
+    seed(51)
+    n = 14
+    oracle = random_oracle(n, 10)
+    system = LowerSetLearn(n=n)
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=system, oracle=oracle)
+    g.learn()
+
+    # the first level comes from the known elements, without queries
+    # and without visiting the vectors known to be on the other side
+    # (above window_seed_limit, the dominated vectors come from SAT too)
+    for lower, l, limit in (
+        (True, 3, 10**5), (False, 6, 10**5), (True, 3, 0), (False, 6, 0),
+    ):
+        q0 = oracle.n_queries
+        lv = LevelLearn(solver="pysat/cadical153", window_seed_limit=limit)
+        lv.init(system=system, oracle=oracle)
+        if lower:
+            lv.learn_lower_window(l, l)
+        else:
+            lv.learn_upper_window(l, l)
+        assert oracle.n_queries == q0
+        n_level = sum(
+            oracle.func(SparseSet(c)) == lower
+            for c in combinations(range(n), l)
+        )
+        assert 0 < n_level < len(list(combinations(range(n), l)))
+        assert lv.level_stats[0]["n_total"] == n_level
+        assert lv.level_stats[0]["n_good"] == n_level
+
+
+def test_level_window_seed_primes():
+    seed(52)
+    n = 12
+    tops = [set(sample(range(n), 7)) for _ in range(12)]
+    oracle = OracleFunction(lambda vec: any(set(vec) <= t for t in tops))
+    for lower, l in ((True, 4), (False, 7)):
+        oracle.clean()
+        system = LowerSetLearn(n=n)
+        g = GainanovSAT(solver="pysat/cadical153", limit=2)
+        g.init(system=system, oracle=oracle)
+        g.learn()
+
+        added = []
+        lv = LevelLearn(solver="pysat/cadical153")
+        lv.init(system=system, oracle=oracle)
+        if lower:
+            lv.add_upper = lambda vec, meta, is_prime: added.append(
+                (vec, is_prime))
+            lv.learn_lower_window(l, l)
+            neibs = [vec.neibs_down() for vec, _ in added]
+        else:
+            lv.add_lower = lambda vec, meta, is_prime: added.append(
+                (vec, is_prime))
+            lv.learn_upper_window(l, l)
+            neibs = [vec.neibs_up(n) for vec, _ in added]
+        assert any(is_prime for _, is_prime in added)
+        for (vec, is_prime), nbs in zip(added, neibs):
+            assert oracle.func(vec) != lower
+            # prime: all the neighbours towards the level are on its side
+            if is_prime:
+                assert all(oracle.func(nb) == lower for nb in nbs)
@@ -0,0 +1,25 @@
+from monolearn import LowerSetLearn, OracleFunction, LevelLearn
+from monolearn.LevelLearn import LevelCache
+from monolearn.SparseSet import SparseSet
+
+
+def test_level_cache_beyond_stored():
+    cache = LevelCache()
+    cache.set_range(0, 0)
+    # nothing stored (the empty vector is upper)
+    assert cache.has(SparseSet(())) is False
+
+    cache.add(SparseSet((1,)))
+    cache.set_range(0, 3)
+    assert cache.has(SparseSet((1,)))
+    assert cache.has(SparseSet((1, 2, 3))) is False
+    assert cache.has(SparseSet((1, 2, 3, 4))) is None
+
+
+def test_levels_trivial_lower():
+    n = 6
+    system = LowerSetLearn(n=n)
+    lv = LevelLearn(levels_lower=3)
+    lv.init(system=system, oracle=OracleFunction(lambda vec: False))
+    lv.learn()
+    assert system.n_lower() == 0
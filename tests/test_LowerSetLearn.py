@@ -0,0 +1,78 @@
+import bz2
+import tracemalloc
+from io import StringIO
+from random import randrange, seed, sample
+
+from monolearn import LowerSetLearn
+from monolearn.SparseSet import SparseSet
+from monolearn.utils import dumps, loads, JSONStreamReader
+
+
+def random_system(n, size, file=None):
+    system = LowerSetLearn(n=n, file=file)
+    for i in range(size):
+        vec = SparseSet(sample(range(n), randrange(n + 1)))
+        if i % 2:
+            system.add_lower(vec, meta=(i, [str(vec)]))
+        else:
+            system.add_upper(vec, meta=None if i % 4 else {"i": i})
+    system.set_complete_lower()
+    return system
+
+
+def test_save_load(tmp_path):
+    seed(123)
+    filename = str(tmp_path / "system.bz2")
+
+    system = random_system(20, 200, file=filename)
+    system.save()
+
+    system2 = LowerSetLearn(n=20, file=filename)
+    assert system2._lower == system._lower
+    assert system2._upper == system._upper
+    assert system2.is_complete_lower
+    assert not system2.is_complete_upper
+    assert system2.meta == loads(dumps(system.meta))
+
+
+def test_load_stream_chunks():
+    seed(321)
+    system = random_system(100, 50)
+    data = (
+        system.DATA_VERSION,
+        system._lower, system._upper,
+        system.is_complete_lower, system.is_complete_upper,
+        system.meta, system.n,
+    )
+    s = dumps(data)
+    for chunk_size in (1, 2, 3, 7, 64, len(s)):
+        reader = JSONStreamReader(StringIO(s), chunk_size=chunk_size)
+        assert system._load_stream(reader) == tuple(loads(s))
+
+
+def test_load_peak_memory(tmp_path):
+    seed(26)
+    n = 64
+    filename = str(tmp_path / "system.bz2")
+    system = LowerSetLearn(n=n, file=filename)
+    for _ in range(5000):
+        system.add_lower(SparseSet(sample(range(n), randrange(10, 30))))
+    system.save()
+
+    def peak(func):
+        tracemalloc.start()
+        try:
+            ret = func()
+            return tracemalloc.get_traced_memory()[1], ret
+        finally:
+            tracemalloc.stop()
+
+    def load_whole():
+        with bz2.open(filename, "rt") as f:
+            return loads(f.read())
+
+    peak_stream, loaded = peak(lambda: LowerSetLearn(n=n, file=filename))
+    peak_whole, _ = peak(load_whole)
+    assert loaded._lower == system._lower
+    # the whole JSON document is never held in memory
+    assert peak_stream < 0.6 * peak_whole
@@ -0,0 +1,241 @@
+import sys
+from random import seed
+from itertools import chain
+
+import pytest
+
+from monolearn import LowerSetLearn, OracleFunction, OracleBatchFunction
+from monolearn import OracleFunctionLazyMeta, OracleCascade
+from monolearn.LowerSetLearn import OracleInference
+from monolearn import GainanovSAT, LevelLearn
+from monolearn.SparseSet import SparseSet
+from monolearn.utils import maximal_sets, minimal_sets
+
+from .helpers import learn, random_tops
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_batch_function(packed):
+    np = pytest.importorskip("numpy")
+
+    n = 12
+    weights = np.arange(1, n + 1)
+    calls = []
+
+    def func(arr):
+        calls.append(len(arr))
+        if packed:
+            arr = np.unpackbits(arr, axis=1, count=n)
+        return arr.astype(np.int64) @ weights <= 20
+
+    oracle = OracleBatchFunction(func, n=n, packed=packed)
+    system = learn(n, oracle, [
+        LevelLearn(levels_lower=4),
+        GainanovSAT(solver="pysat/cadical153"),
+    ])
+
+    ref = learn(n, OracleFunction(lambda v: sum(i + 1 for i in v) <= 20), [
+        GainanovSAT(solver="pysat/cadical153"),
+    ])
+    assert system.is_complete
+    assert set(system.iter_lower()) == set(ref.iter_lower())
+    assert set(system.iter_upper()) == set(ref.iter_upper())
+    # whole levels are evaluated at once
+    assert max(calls) > 100
+
+
+def test_batch_function_requires_numpy(monkeypatch):
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    with pytest.raises(ImportError, match="monolearn\\[numpy\\]"):
+        OracleBatchFunction(lambda arr: arr, n=4)
+
+
+def test_batch_function_meta():
+    pytest.importorskip("numpy")
+
+    def func(arr):
+        sums = arr.sum(axis=1)
+        return sums <= 1, [int(s) for s in sums]
+
+    oracle = OracleBatchFunction(func, n=4, batch_size=2)
+    vecs = [SparseSet(()), SparseSet((1,)), SparseSet((0, 3)), SparseSet((1,))]
+    assert oracle.call_many(vecs) == [
+        (True, 0), (True, 1), (False, 2), (True, 1),
+    ]
+    assert oracle.n_queries == 3
+
+
+def test_inference():
+    tops = [{0, 1, 2}, {2, 3}]
+    oracle = OracleFunction(lambda v: any(set(v) <= t for t in tops))
+    oracle.enable_inference(limit=3)
+
+    assert oracle(SparseSet((0, 1, 2))) == (True, None)
+    assert oracle(SparseSet((3, 4))) == (False, None)
+    assert oracle.n_queries == 2
+
+    assert oracle(SparseSet((0, 2))) == (True, oracle.UnknownMeta)
+    assert oracle(SparseSet((1, 3, 4))) == (False, oracle.UnknownMeta)
+    assert oracle(SparseSet((2, 3))) == (True, None)
+    assert oracle.n_queries == 3
+    assert oracle.n_inferred == 2
+
+    # the oldest answer (0, 1, 2) is evicted
+    assert oracle(SparseSet((5,))) == (False, None)
+    oracle._cache.clear()
+    assert oracle(SparseSet((0, 1))) == (True, None)
+    assert oracle.n_queries == 5
+    assert oracle.n_calls == 7
+
+
+def test_inference_antichain():
+    tops = [{0, 1, 2}, {2, 3}]
+    oracle = OracleFunction(lambda v: any(set(v) <= t for t in tops))
+    oracle.enable_inference(limit=3)
+    lower, upper = oracle._inference.lower, oracle._inference.upper
+
+    oracle(SparseSet((0,)))
+    oracle(SparseSet((0, 1)))
+    oracle(SparseSet((2,)))
+    # (0,) is implied by (0, 1)
+    assert set(lower) == {SparseSet((0, 1)), SparseSet((2,))}
+    oracle(SparseSet((0, 1, 2)))
+    assert set(lower) == {SparseSet((0, 1, 2))}
+
+    oracle(SparseSet((0, 3, 4)))
+    oracle(SparseSet((0, 3)))
+    assert set(upper) == {SparseSet((0, 3))}
+    # implied answers are not added (here, from the cache)
+    oracle(SparseSet((0, 3, 4)))
+    assert set(upper) == {SparseSet((0, 3))}
+    assert len(oracle._inference.order) == 2
+
+
+def test_inference_cost():
+    for latency, active in ((0.0, False), (1.0, True)):
+        inference = OracleInference(limit=100)
+        inference.check_every = 10
+        inference.store(SparseSet((0, 1)), True)
+        inference.store(SparseSet((2, 3)), False)
+        inference.add_query_time(latency)
+        for _ in range(10):
+            assert inference.lookup(SparseSet((1,))) is True
+        # the lookups are slower than free queries
+        assert inference.active is active
+        assert len(inference.lower) == int(active)
+        assert inference.lookup(SparseSet((2, 3, 4))) is (False if active else None)
+
+def test_inference_learning():
+    n = 12
+    tops = [set(range(0, n, 2)), set(range(1, n, 2)), {0, 1, 2, 3}]
+    oracle = OracleFunction(lambda v: any(set(v) <= t for t in tops))
+    oracle.enable_inference()
+    system = learn(n, oracle, [
+        LevelLearn(levels_lower=2),
+        GainanovSAT(solver="pysat/cadical153"),
+    ])
+    assert system.is_complete
+    assert set(system.iter_lower()) == {SparseSet(t) for t in tops}
+    assert oracle.n_inferred > 0
+    assert oracle.UnknownMeta not in system.meta.values()
+    # the kept answers are antichains
+    lower, upper = oracle._inference.lower, oracle._inference.upper
+    assert len(maximal_sets(lower)) == len(lower)
+    assert len(minimal_sets(upper)) == len(upper)
+    assert len(oracle._inference.order) == len(lower) + len(upper)
+
+
+def test_lazy_meta():
+    seed(31)
+    n = 12
+    tops = random_tops(n, 8)
+
+    def decide(vec):
+        return any(set(vec) <= top for top in tops)
+
+    def meta(vec):
+        return ("cert", len(vec))
+
+    oracle = OracleFunctionLazyMeta(decide, meta)
+    system = LowerSetLearn(n=n)
+    lv = LevelLearn(levels_upper=2)
+    lv.init(system=system, oracle=oracle)
+    lv.learn()
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=system, oracle=oracle)
+    g.learn()
+    assert system.is_complete
+
+    # meta requested only for the stored elements
+    n_stored = system.n_lower() + system.n_upper()
+    assert oracle.n_meta == n_stored < oracle.n_queries
+    for vec in chain(system.iter_lower(), system.iter_upper()):
+        assert system.meta[vec] == ("cert", len(vec))
+    assert not system.meta_pending
+
+    # deferred: filled afterwards in batches
+    oracle = OracleFunctionLazyMeta(decide, meta)
+    system = LowerSetLearn(n=n)
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.lazy_meta = True
+    g.init(system=system, oracle=oracle)
+    g.learn()
+    assert oracle.n_meta == 0
+    assert len(system.meta_pending) == system.n_lower() + system.n_upper()
+
+    vec = next(system.iter_lower())
+    assert system.get_meta(vec) is None
+    assert system.get_meta(vec, oracle=oracle) == ("cert", len(vec))
+    n_pending = len(system.meta_pending)
+    assert system.fill_meta(oracle, batch_size=5) == n_pending
+    assert not system.meta_pending
+    assert oracle.n_meta == system.n_lower() + system.n_upper()
+
+
+def test_cascade():
+    seed(77)
+    n = 12
+    tops = random_tops(n, 8)
+    max_top = max(map(len, tops))
+
+    def exact(vec):
+        return any(set(vec) <= top for top in tops)
+
+    def small(vec):
+        # sufficient for lower
+        return True if not vec else None
+
+    def large(vec):
+        # necessary for lower
+        return False if len(vec) > max_top else None
+
+    solver = "pysat/cadical153"
+    ref = learn(n, OracleFunction(exact), [GainanovSAT(solver=solver)])
+
+    oracle = OracleCascade(
+        [small, large, exact], adaptive=True, reorder_every=10,
+    )
+    system = learn(n, oracle, [GainanovSAT(solver=solver)])
+    assert set(system.iter_lower()) == set(ref.iter_lower())
+    assert set(system.iter_upper()) == set(ref.iter_upper())
+
+    stats = oracle.stats()
+    assert sum(s["hits"] for s in stats) == oracle.n_queries
+    assert stats[2]["position"] == 2
+    assert stats[1]["hits"] > 0
+    # the useless "small" stage is tried after "large"
+    assert stats[0]["position"] == 1
+
+
+def test_split_call():
+    oracle = OracleFunction(lambda vec: len(vec) <= 2)
+    vec = SparseSet((1, 2))
+    assert oracle.begin(vec) is None
+    ret = oracle.evaluate(vec)
+    assert ret == (True, None)
+    assert oracle.n_queries == 0
+    oracle.finish(vec, ret)
+    assert oracle.begin(vec) == ret
+    assert oracle(vec) == ret
+    assert oracle.n_calls == 3
+    assert oracle.n_queries == 1
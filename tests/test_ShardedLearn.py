@@ -0,0 +1,28 @@
+from random import seed
+
+from monolearn import GainanovSAT, LevelLearn, ShardedLearn
+
+from .helpers import learn, random_oracle
+
+
+def test_sharded_vs_sequential():
+    seed(123)
+    for n, n_fixed in [(6, 1), (10, 2), (12, 3)]:
+        oracle = random_oracle(n, 8)
+        seq = learn(n, oracle, [
+            GainanovSAT(sense="min", solver="pysat/cadical153"),
+        ])
+
+        sharded = learn(n, oracle, [
+            ShardedLearn(
+                [
+                    LevelLearn(levels_lower=2),
+                    GainanovSAT(sense="min", solver="pysat/cadical153"),
+                ],
+                n_fixed=n_fixed,
+                n_workers=3,
+            ),
+        ])
+        assert sharded.is_complete
+        assert set(sharded.iter_lower()) == set(seq.iter_lower())
+        assert set(sharded.iter_upper()) == set(seq.iter_upper())
@@ -0,0 +1,101 @@
+import time
+import threading
+from itertools import combinations
+from concurrent.futures import ThreadPoolExecutor
+
+from monolearn import LowerSetLearn, OracleFunction, GainanovSAT, LevelLearn
+from monolearn.SparseSet import SparseSet
+from monolearn.SharedOracle import SharedOracle
+
+
+class SlowOracle(OracleFunction):
+    def __init__(self, func, delay=0.01):
+        self.delay = delay
+        self.batches = []
+        self.lock = threading.Lock()
+        super().__init__(func)
+
+    def _query_many(self, vecs):
+        with self.lock:
+            self.batches.append(len(vecs))
+        time.sleep(self.delay)
+        return [(self.func(vec), None) for vec in vecs]
+
+
+def is_lower(vec):
+    return len(vec) <= 3
+
+
+def test_single_flight():
+    inner = SlowOracle(is_lower)
+    oracle = SharedOracle(inner)
+    vecs = [SparseSet(range(i % 5)) for i in range(100)]
+    with ThreadPoolExecutor(16) as pool:
+        rets = list(pool.map(oracle, vecs))
+    assert rets == [(is_lower(vec), None) for vec in vecs]
+    assert oracle.n_calls == 100
+    assert inner.n_queries == oracle.n_queries == 5
+    assert oracle.n_coalesced > 0
+
+
+def test_batching():
+    inner = SlowOracle(is_lower, delay=0.001)
+    oracle = SharedOracle(inner, batch_window=0.05, batch_size=64)
+    vecs = [SparseSet((i, i + 1)) for i in range(32)]
+    with ThreadPoolExecutor(32) as pool:
+        rets = list(pool.map(oracle, vecs))
+    oracle.close()
+    assert rets == [(True, None)] * 32
+    assert sum(inner.batches) == 32
+    assert len(inner.batches) < 32
+
+
+def test_shared_learners():
+    n = 10
+    tops = [set(range(0, n, 2)), set(range(1, n, 2)), {0, 1, 2, 3}]
+    inner = SlowOracle(lambda v: any(set(v) <= t for t in tops), delay=0)
+    oracle = SharedOracle(inner)
+
+    def run(speculate):
+        system = LowerSetLearn(n=n)
+        g = GainanovSAT(solver="pysat/cadical153").set_speculation(speculate)
+        g.init(system=system, oracle=oracle)
+        g.learn()
+        return system
+
+    with ThreadPoolExecutor(4) as pool:
+        systems = list(pool.map(run, [2, 3, 4, 5]))
+    for system in systems:
+        assert system.is_complete
+        assert set(system.iter_lower()) == {SparseSet(t) for t in tops}
+
+
+def test_shared_levels():
+    n = 8
+    inner = SlowOracle(is_lower, delay=0)
+    oracle = SharedOracle(inner)
+    assert oracle._inference is None
+
+    def run(side):
+        system = LowerSetLearn(n=n)
+        if side == "lower":
+            lv = LevelLearn(levels_lower=5)
+        else:
+            lv = LevelLearn(levels_upper=n - 2)
+        lv.init(system=system, oracle=oracle)
+        lv.learn()
+        return system
+
+    with ThreadPoolExecutor(2) as pool:
+        lower, upper = pool.map(run, ["lower", "upper"])
+    # the level caches are the wrapped oracle's
+    assert inner._lower_cache.range == (0, 4)
+    assert inner._upper_cache.range == (3, n)
+    assert oracle._lower_cache is inner._lower_cache
+    assert set(upper.iter_lower()) == {
+        SparseSet(c) for c in combinations(range(n), 3)
+    }
+
+    oracle.clean()
+    assert oracle._lower_cache is inner._lower_cache
+    assert oracle._lower_cache.range is None
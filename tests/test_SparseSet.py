@@ -0,0 +1,61 @@
+from random import Random
+
+from monolearn.SparseSet import SparseSet, WorkVector
+
+
+def test_work_vector_ops():
+    rng = Random(2025)
+    n = 20
+    for _ in range(50):
+        ref = set(rng.sample(range(n), rng.randrange(n)))
+        work = WorkVector(SparseSet(ref))
+        for _ in range(100):
+            v = rng.randrange(n)
+            op = rng.choice(("add", "discard", "flip"))
+            getattr(work, op)(v)
+            if op == "add":
+                ref.add(v)
+            elif op == "discard":
+                ref.discard(v)
+            else:
+                ref ^= {v}
+            assert work.freeze() == SparseSet(ref)
+            assert len(work) == len(ref)
+            assert (v in work) == (v in ref)
+
+
+def test_work_vector_undo():
+    rng = Random(2026)
+    n = 20
+    work = WorkVector(rng.sample(range(n), 7))
+    states = []
+    for _ in range(200):
+        if states and rng.random() < 0.4:
+            work.undo()
+            assert work.freeze() == states.pop()
+        else:
+            states.append(work.freeze())
+            v = rng.randrange(n)
+            work.push(v)
+            assert work.freeze() == SparseSet(set(states[-1]) ^ {v})
+    while states:
+        work.undo()
+        assert work.freeze() == states.pop()
+
+
+def test_work_vector_neighbours():
+    rng = Random(2027)
+    for n in (0, 1, 5, 30):
+        for _ in range(20):
+            vec = SparseSet(rng.sample(range(n), rng.randrange(n + 1)))
+            work = WorkVector(vec)
+            assert list(work.neibs_up(n)) == list(vec.neibs_up(n))
+            assert list(work.neibs_down()) == list(vec.neibs_down())
+            # built in place, the vector is restored
+            assert work.freeze() == vec
+            for i in range(n):
+                if i in vec:
+                    assert work.with_removed(i) == vec - i
+                else:
+                    assert work.with_added(i) == vec | i
+                assert work.freeze() == vec
@@ -0,0 +1,140 @@
+from random import seed
+
+import pytest
+
+from monolearn import LowerSetLearn, OracleFunction, Symmetry, OrbitTooLarge
+from monolearn import GainanovSAT, LevelLearn
+from monolearn.SparseSet import SparseSet
+
+from .helpers import random_tops
+
+
+def cyclic_oracle(n, n_tops):
+    """Lower set generated by random sets and all their cyclic shifts."""
+    tops = random_tops(n, n_tops)
+    tops = [{(i + k) % n for i in top} for top in tops for k in range(n)]
+    return OracleFunction(lambda vec: any(set(vec) <= top for top in tops))
+
+
+def test_symmetry_canonical():
+    n = 6
+    shift = Symmetry(n, [[(i + 1) % n for i in range(n)]])
+    vec = SparseSet((1, 4))
+    orbit = shift.orbit(vec)
+    assert len(orbit) == 3
+    assert {shift.canonical(img) for img in orbit} == {SparseSet((0, 3))}
+
+    # full symmetric group: the orbit is the whole level
+    swap = [1, 0] + list(range(2, n))
+    full = Symmetry(n, [swap, [(i + 1) % n for i in range(n)]])
+    assert len(full.orbit(vec)) == 15
+    assert full.canonical(SparseSet((3, 5))) == SparseSet((0, 1))
+
+
+def test_symmetry_learn():
+    seed(2024)
+    n = 12
+    oracle = cyclic_oracle(n, 3)
+
+    ref = LowerSetLearn(n=n)
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=ref, oracle=oracle)
+    g.learn()
+    n_ref = oracle.n_queries
+
+    oracle.clean()
+    oracle.n_queries = 0
+    shift = Symmetry(n, [[(i + 1) % n for i in range(n)]])
+    system = LowerSetLearn(n=n, symmetry=shift)
+    lv = LevelLearn(levels_lower=2)
+    lv.init(system=system, oracle=oracle)
+    lv.learn()
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=system, oracle=oracle)
+    g.learn()
+
+    assert system.is_complete
+    assert all(shift.canonical(vec) == vec for vec in system.iter_lower())
+    assert set(system.iter_lower_full()) == set(ref.iter_lower())
+    assert set(system.iter_upper_full()) == set(ref.iter_upper())
+    assert system.n_lower() < ref.n_lower()
+    assert oracle.n_queries < n_ref
+
+    # images are known
+    for vec in ref.iter_upper():
+        assert system.is_known_upper(vec)
+
+
+def test_symmetry_estimate_unknown():
+    seed(2025)
+    n = 12
+    oracle = cyclic_oracle(n, 3)
+    shift = Symmetry(n, [[(i + 1) % n for i in range(n)]])
+    system = LowerSetLearn(n=n, symmetry=shift)
+    lv = LevelLearn(levels_lower=5)
+    lv.init(system=system, oracle=oracle)
+    # indexes built before learning, the images come from the listener
+    assert lv.estimate_unknown(500) == 1.0
+    lv.learn()
+
+    plain = LowerSetLearn(n=n)
+    for vec in system.iter_lower_full():
+        plain.add_lower(vec)
+    for vec in system.iter_upper_full():
+        plain.add_upper(vec)
+    ref = LevelLearn()
+    ref.init(system=plain, oracle=oracle)
+    assert 0 < lv.estimate_unknown(500) == ref.estimate_unknown(500) < 1
+
+
+def full_symmetry(n):
+    swap = [1, 0] + list(range(2, n))
+    return Symmetry(n, [swap, [(i + 1) % n for i in range(n)]])
+
+
+@pytest.mark.parametrize("symmetry_breaking", [False, True])
+def test_symmetry_breaking(symmetry_breaking):
+    seed(2026)
+    n = 12
+    oracle = cyclic_oracle(n, 3)
+    ref = LowerSetLearn(n=n)
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=ref, oracle=oracle)
+    g.learn()
+
+    shift = Symmetry(n, [[(i + 1) % n for i in range(n)]])
+    system = LowerSetLearn(n=n, symmetry=shift)
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.symmetry_breaking = symmetry_breaking
+    g.init(system=system, oracle=oracle)
+    g.learn()
+    assert set(system.iter_lower_full()) == set(ref.iter_lower())
+    assert set(system.iter_upper_full()) == set(ref.iter_upper())
+    if not symmetry_breaking:
+        assert g.n_sat_images == 0
+
+
+def test_symmetry_breaking_full():
+    # full S_n: all images of the threshold elements would be encoded
+    n = 14
+    oracle = OracleFunction(lambda vec: len(vec) <= 5)
+    system = LowerSetLearn(n=n, symmetry=full_symmetry(n))
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=system, oracle=oracle)
+    g.learn()
+    assert system.is_complete
+    assert list(system.iter_lower()) == [SparseSet(range(5))]
+    assert list(system.iter_upper()) == [SparseSet(range(6))]
+    # C(14, 5) + C(14, 6) clauses without symmetry breaking
+    assert g.n_sat_images <= 10
+
+
+def test_orbit_limit():
+    n = 14
+    symmetry = full_symmetry(n)
+    symmetry.orbit_limit = 1000
+    system = LowerSetLearn(n=n, symmetry=symmetry)
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=system, oracle=OracleFunction(lambda vec: len(vec) <= 5))
+    with pytest.raises(OrbitTooLarge):
+        g.learn()
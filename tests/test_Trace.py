@@ -0,0 +1,68 @@
+from random import seed
+
+import pytest
+
+from monolearn import LowerSetLearn
+from monolearn import GainanovSAT, LevelLearn
+from monolearn import Tracer, read_trace
+
+from .helpers import random_oracle
+
+
+@pytest.mark.parametrize("ext", ["jsonl", "trace"])
+def test_trace(tmp_path, ext):
+    seed(42)
+    n = 12
+    oracle = random_oracle(n, 10)
+    filename = str(tmp_path / f"run.{ext}")
+
+    system = LowerSetLearn(n=n, file=str(tmp_path / "system.bz2"))
+    with Tracer(filename) as tracer:
+        lv = LevelLearn(levels_lower=3)
+        lv.init(system=system, oracle=oracle)
+        lv.learn()
+        g = GainanovSAT(sense="min", solver="pysat/cadical153")
+        g.init(system=system, oracle=oracle)
+        g.learn()
+    assert Tracer.active is None
+    assert system.is_complete
+
+    events = list(read_trace(filename))
+    by_kind = {}
+    for event in events:
+        by_kind.setdefault(event["event"], []).append(event)
+
+    queries = by_kind["query"]
+    assert len(queries) == tracer.n_seen["query"] == oracle.n_calls
+    assert sum(not e["cached"] for e in queries) == oracle.n_queries
+    assert all(e["latency"] >= 0 for e in queries)
+
+    sats = by_kind["sat"]
+    assert len(sats) == tracer.n_seen["sat"]
+    assert sats[-1]["result"] is False
+
+    levels = by_kind["level"]
+    # LevelLearn levels, then the levels exhausted by GainanovSAT
+    assert [e["level"] for e in levels[:2]] == [1, 2]
+    sat_levels = [e["level"] for e in levels[2:]]
+    assert sat_levels == sorted(sat_levels)
+    assert all(e["side"] == "lower" for e in levels)
+
+    assert by_kind["save"][-1]["bytes"] > 0
+
+
+def test_trace_sampling(tmp_path):
+    seed(43)
+    n = 10
+    oracle = random_oracle(n, 5)
+    filename = str(tmp_path / "run.jsonl")
+
+    system = LowerSetLearn(n=n)
+    with Tracer(filename, sample={"query": 0.1}) as tracer:
+        g = GainanovSAT(solver="pysat/cadical153")
+        g.init(system=system, oracle=oracle)
+        g.learn()
+
+    n_queries = sum(e["event"] == "query" for e in read_trace(filename))
+    assert tracer.n_seen["query"] == oracle.n_calls
+    assert n_queries == (oracle.n_calls + 9) // 10
@@ -0,0 +1,69 @@
+import sys
+import subprocess
+
+# loaded only when learning with solvers / async oracles
+HEAVY = ("optisolveapi", "pysat", "binteger", "asyncio", "concurrent.futures")
+
+
+def import_profile(code):
+    """Run code in a fresh interpreter, return (loaded modules, import times)."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         code + "\nimport sys; print(' '.join(sys.modules))"],
+        capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if cumulative_us.strip().isdigit():
+            times[name.strip()] = int(cumulative_us)
+    return set(out.stdout.split()), times
+
+
+def test_import_light():
+    modules, times = import_profile(
+        "import monolearn\n"
+        "from monolearn import LowerSetLearn, OracleFunction\n"
+        "from monolearn.SparseSet import SparseSet\n"
+        "from monolearn.utils import loads, dumps\n"
+    )
+    assert "monolearn.LowerSetLearn" in modules
+    loaded = [
+        name for name in modules
+        if any(name == m or name.startswith(m + ".") for m in HEAVY)
+    ]
+    assert loaded == []
+    # coarse guard (microseconds), the solver backends alone take more
+    assert times["monolearn"] < 500_000
+
+
+def test_import_lazy_modules():
+    modules, _ = import_profile(
+        "import monolearn\n"
+        "assert monolearn.GainanovSAT.__name__ == 'GainanovSAT'\n"
+        "assert set(monolearn.Modules) >= {'LevelLearn', 'GainanovSAT'}\n"
+        "from monolearn import LevelLearn, LearnModule, Tracer\n"
+        "assert isinstance(LevelLearn, type) and isinstance(LearnModule, type)\n"
+        "assert isinstance(Tracer, type)\n"
+    )
+    assert "monolearn.GainanovSAT" in modules
+    assert "monolearn.merge" not in modules
+    assert "optisolveapi" not in modules
+
+
+def test_import_shadowing():
+    # submodules imported directly do not hide the classes
+    import monolearn
+    from monolearn.AsyncOracle import AsyncOracle
+    from monolearn.merge import merge_systems
+
+    assert monolearn.AsyncOracle is AsyncOracle
+    assert monolearn.merge_systems is merge_systems
+    for name in monolearn.__all__:
+        assert not isinstance(getattr(monolearn, name), type(monolearn))
+    assert set(monolearn.Modules) == {
+        "LevelLearn", "GainanovSAT", "ShardedLearn", "Scheduler",
+        "WarmStart", "DenseLearn",
+    }
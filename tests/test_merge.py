@@ -0,0 +1,63 @@
+import subprocess
+import sys
+from random import randrange, seed, sample
+
+from monolearn import LowerSetLearn, OracleFunction, GainanovSAT
+from monolearn import merge_systems
+from monolearn.SparseSet import SparseSet
+
+
+def test_merge(tmp_path):
+    seed(46)
+    n = 16
+    tops = [set(sample(range(n), randrange(3, 10))) for _ in range(8)]
+
+    def is_lower(vec):
+        return any(set(vec) <= top for top in tops)
+
+    full = LowerSetLearn(n=n)
+    g = GainanovSAT(solver="pysat/cadical153")
+    g.init(system=full, oracle=OracleFunction(is_lower))
+    g.learn()
+    assert full.is_complete
+    lower = sorted(full.iter_lower(), key=tuple)
+    upper = sorted(full.iter_upper(), key=tuple)
+
+    # partial runs: halves of the primes plus dominated elements
+    filenames = []
+    for part in range(3):
+        system = LowerSetLearn(n=n, file=str(tmp_path / f"part{part}.bz2"))
+        for vec in lower[part % 2::2]:
+            system.add_lower(vec, meta=["lower", part])
+            system.add_lower(SparseSet(list(vec)[1:]))
+        for vec in upper[part % 2::2]:
+            system.add_upper(vec, meta=["upper", part])
+            rest = sorted(set(range(n)) - set(vec))
+            system.add_upper(SparseSet(sorted(set(vec) | set(rest[:2]))))
+        if part == 2:
+            system.set_complete()
+        system.save()
+        filenames.append(system.file)
+
+    output = str(tmp_path / "merged.bz2")
+    for processes in (1, 2):
+        merged = merge_systems(filenames, output=output, processes=processes)
+        assert set(merged.iter_lower()) == set(lower)
+        assert set(merged.iter_upper()) == set(upper)
+        assert merged.is_complete
+        # meta of the first file having the element
+        assert merged.meta[lower[0]] == ["lower", 0]
+        assert merged.meta[lower[1]] == ["lower", 1]
+
+        loaded = LowerSetLearn(n=n, file=output)
+        assert set(loaded.iter_lower()) == set(lower)
+        assert loaded.meta == merged.meta
+
+    output2 = str(tmp_path / "merged2.bz2")
+    subprocess.check_call(
+        [sys.executable, "-m", "monolearn.merge", "-o", output2, "-j", "2"]
+        + filenames[:2]
+    )
+    loaded = LowerSetLearn(n=n, file=output2)
+    assert set(loaded.iter_upper()) == set(upper)
+    assert not loaded.is_complete